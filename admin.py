@@ -0,0 +1,94 @@
+import hmac
+import os
+import re
+
+from inference import MODEL_PATH, get_engine
+from registry import BudgetExceeded, checkpoint_name
+from responses import loads
+
+# Checkpoint management endpoints, shared by main.py and main_fastapi.py:
+#   GET    /admin/models         resident checkpoints, routing, shadow agreement
+#   POST   /admin/models         {"path": "results/checkpoint-381", "name": ..., "promote": true}
+#                                loads in the background (202) while the current model serves
+#   POST   /admin/routing        {"primary": name, "split": {name: fraction}, "shadow": [names],
+#                                 "shadow_sample": fraction}; omitted keys stay as they are
+#   DELETE /admin/models/<name>  drops a checkpoint that takes no traffic
+# Disabled unless ADMIN_TOKEN is set; calls send "Authorization: Bearer <token>".
+# Paths are relative to MODEL_ROOT and may not leave it. With
+# SERVER_MODE=prefork every worker has its own engine and a call reaches only
+# one of them, so use MODEL_WATCH_DIR (see registry.py) there instead.
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+MODEL_ROOT = os.environ.get("MODEL_ROOT", os.path.dirname(os.path.normpath(MODEL_PATH)))
+# Checkpoint names end up in URLs (DELETE /admin/models/<name>) and metric labels
+CHECKPOINT_NAME = re.compile(r"[A-Za-z0-9._-]+")
+
+
+class AdminError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def authorize(authorization, token=None):
+    token = ADMIN_TOKEN if token is None else token
+    if not token:
+        raise AdminError("Not found", 404)
+    scheme, _, given = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), token.encode()):
+        raise AdminError("Invalid admin token", 401)
+
+
+def checkpoint_path(path, root=None):
+    root = os.path.realpath(root or MODEL_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise AdminError(f"Checkpoint path must be inside {root}")
+    return resolved
+
+
+def _json_object(body):
+    try:
+        data = loads(body or b"{}")
+    except ValueError as e:
+        raise AdminError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise AdminError("Expected a JSON object")
+    return data
+
+
+def handle(method, path, body, authorization, engine=None, token=None, root=None):
+    # Returns (status, payload)
+    authorize(authorization, token)
+    engine = engine or get_engine()
+    try:
+        if path == "/admin/models" and method == "GET":
+            return 200, engine.models_status()
+        if path == "/admin/models" and method == "POST":
+            data = _json_object(body)
+            if not isinstance(data.get("path"), str):
+                raise AdminError("'path' (a checkpoint directory) is required")
+            path = checkpoint_path(data["path"], root)
+            name = data.get("name") or checkpoint_name(path)
+            if not isinstance(name, str) or not CHECKPOINT_NAME.fullmatch(name):
+                raise AdminError("Checkpoint names may only contain letters, digits, '.', '_' and '-'")
+            name = engine.load_checkpoint_async(path, name, bool(data.get("promote")))
+            return 202, {"name": name, "status": "loading", "promote": bool(data.get("promote"))}
+        if path == "/admin/routing" and method == "POST":
+            data = _json_object(body)
+            return 200, engine.route(data.get("primary"), data.get("split"), data.get("shadow"),
+                                     data.get("shadow_sample"))
+        if path.startswith("/admin/models/") and method == "DELETE":
+            name = path[len("/admin/models/"):]
+            remaining = engine.unload(name)
+            return 200, {"name": name, "status": "unloaded", "still_running": remaining}
+    except AdminError:
+        raise
+    except FileNotFoundError as e:
+        raise AdminError(str(e), 404)
+    except BudgetExceeded as e:
+        raise AdminError(str(e), 507)
+    except (ValueError, TypeError, AttributeError) as e:
+        # Unknown or busy checkpoints, bad fractions, wrongly typed fields
+        raise AdminError(str(e))
+    raise AdminError("Not found", 404)
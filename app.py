@@ -1,177 +1,76 @@
-import os#!/usr/bin/env python3#!/usr/bin/env python3
-
+#!/usr/bin/env python3
+import os
 import json
+from http.server import BaseHTTPRequestHandler
 
-from http.server import HTTPServer, BaseHTTPRequestHandlerimport osimport os
-
+from batch import predict_one
+from inference import get_engine
+from server import KEEPALIVE_TIMEOUT, BodyError, read_body, serve
 
+class CivicTextHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
 
-class CivicHandler(BaseHTTPRequestHandler):import jsonimport json
+    def log_message(self, format, *args):
+        print(f"[{self.address_string()}] {format % args}")
 
     def do_GET(self):
+        if self.path == '/':
+            self.send_json_response({
+                "status": "healthy",
+                "message": "Civic Text Classifier API",
+                "version": "1.0",
+                "endpoints": ["/", "/health", "/ready", "/predict"],
+                "port": os.environ.get("PORT", "8000")
+            })
+        elif self.path == '/health':
+            self.send_json_response({
+                "status": "healthy",
+                "message": "OK",
+                "port": os.environ.get("PORT", "8000")
+            })
+        elif self.path == '/ready':
+            engine = get_engine()
+            self.send_json_response(engine.status(), 200 if engine.is_ready else 503)
+        else:
+            self.send_json_response({"error": "Not found"}, 404)
 
-        if self.path in ['/', '/health']:from http.server import HTTPServer, BaseHTTPRequestHandlerimport urllib.parse
-
-            self.send_response(200)
-
-            self.send_header('Content-Type', 'application/json')from http.server import HTTPServer, BaseHTTPRequestHandler
-
-            self.end_headers()
-
-            response = {"status": "healthy", "message": "Civic Text Classifier"}class CivicTextHandler(BaseHTTPRequestHandler):
-
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-
-        else:    def log_message(self, format, *args):class CivicTextHandler(BaseHTTPRequestHandler):
-
-            self.send_response(404)
-
-            self.send_header('Content-Type', 'application/json')        print(f"[{self.address_string()}] {format % args}")    def log_message(self, format, *args):
-
-            self.end_headers()
-
-            self.wfile.write(json.dumps({"error": "Not found"}).encode('utf-8'))            print(f"[{self.address_string()}] {format % args}")
-
-    
-
-    def do_POST(self):    def do_GET(self):    
+    def do_POST(self):
+        try:
+            post_data = read_body(self)
+        except BodyError as e:
+            self.send_json_response({"error": str(e)}, e.status)
+            return
 
         if self.path == '/predict':
+            try:
+                data = json.loads(post_data.decode('utf-8'))
 
-            try:        if self.path == '/':    def do_GET(self):
-
-                content_length = int(self.headers.get('Content-Length', 0))
-
-                post_data = self.rfile.read(content_length).decode('utf-8')            self.send_json_response({    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-
-                data = json.loads(post_data)
-
-                text = data.get('text', '').lower()                "status": "healthy",    with torch.no_grad():
-
-                
-
-                # Simple classification                "message": "Civic Text Classifier API",        outputs = model(**inputs)
-
-                if any(word in text for word in ['light', 'lamp', 'bulb', 'streetlight']):
-
-                    result = {"predicted_class": 0, "predicted_label": "streetlight", "confidence": 0.85}                "version": "1.0",        predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
-
-                elif any(word in text for word in ['garbage', 'trash', 'waste']):
-
-                    result = {"predicted_class": 1, "predicted_label": "garbage", "confidence": 0.88}                "endpoints": ["/", "/health", "/predict"],        predicted_class = torch.argmax(predictions, dim=1).item()
-
-                else:
-
-                    result = {"predicted_class": 2, "predicted_label": "potholes", "confidence": 0.82}                "port": os.environ.get("PORT", "8000")        confidence = predictions[0][predicted_class].item()
-
-                
-
-                result['text'] = data.get('text', '')            })    return {"predicted_class": int(predicted_class), "confidence": float(confidence)}
-
-                
-
-                self.send_response(200)        elif self.path == '/health':
-
-                self.send_header('Content-Type', 'application/json')
-
-                self.end_headers()            self.send_json_response({# Gradio UI
-
-                self.wfile.write(json.dumps(result).encode('utf-8'))
-
-                                "status": "healthy",demo = gr.Interface(
-
-            except Exception as e:
-
-                self.send_response(500)                "message": "OK",    fn=predict,
-
-                self.send_header('Content-Type', 'application/json') 
-
-                self.end_headers()                "port": os.environ.get("PORT", "8000")    inputs="text",
-
-                self.wfile.write(json.dumps({"error": str(e)}).encode('utf-8'))
-
-        else:            })    outputs="json",
-
-            self.send_response(404)
-
-            self.send_header('Content-Type', 'application/json')        else:    title="Text Classifier",
-
-            self.end_headers()
-
-            self.wfile.write(json.dumps({"error": "Not found"}).encode('utf-8'))            self.send_json_response({"error": "Not found"}, 404)    description="Enter text to get predicted class"
-
-
-
-if __name__ == '__main__':    )
-
-    port = int(os.environ.get('PORT', 8000))
-
-    server = HTTPServer(('0.0.0.0', port), CivicHandler)    def do_POST(self):
-
-    print(f"🚀 Civic Text Classifier running on port {port}")
-
-    print(f"🌐 Endpoints: /, /health, /predict")        if self.path == '/predict':if __name__ == "__main__":
-
-    try:
-
-        server.serve_forever()            try:    demo.launch()
-
-    except KeyboardInterrupt:
-
-        print("Server stopped")                content_length = int(self.headers.get('Content-Length', 0))
+                result = predict_one(data.get('text', ''))
 
-        server.server_close()                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
-                
-                text = data.get('text', '').lower()
-                
-                # Rule-based classification
-                if any(word in text for word in ['light', 'lamp', 'bulb', 'lighting', 'streetlight', 'street light']):
-                    result = {
-                        "predicted_class": 0,
-                        "predicted_label": "streetlight",
-                        "confidence": 0.85
-                    }
-                elif any(word in text for word in ['garbage', 'trash', 'waste', 'litter', 'bin']):
-                    result = {
-                        "predicted_class": 1,
-                        "predicted_label": "garbage", 
-                        "confidence": 0.88
-                    }
-                else:
-                    result = {
-                        "predicted_class": 2,
-                        "predicted_label": "potholes",
-                        "confidence": 0.82
-                    }
-                
-                result['text'] = data.get('text', '')
-                result['model_type'] = 'rule_based'
-                
                 self.send_json_response(result)
-                
+
             except Exception as e:
                 self.send_json_response({"error": str(e)}, 500)
         else:
             self.send_json_response({"error": "Not found"}, 404)
-    
+
     def send_json_response(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        if self.close_connection or getattr(self.server, 'draining', False):
+            self.send_header('Connection', 'close')
+            self.close_connection = True
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     print(f"Starting Civic Text Classifier on port {port}")
-    
-    server = HTTPServer(('0.0.0.0', port), CivicTextHandler)
-    print(f"Server running at http://0.0.0.0:{port}")
-    print("Endpoints: /, /health, /predict")
-    
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\nShutting down server...")
-        server.shutdown()
\ No newline at end of file
+    print("Endpoints: /, /health, /ready, /predict")
+
+    serve(CivicTextHandler, port, on_start=get_engine().start)
+    print("\nShutting down server...")
@@ -0,0 +1,124 @@
+import os
+
+# Interchangeable forward-pass backends for the inference engine, picked with
+# INFERENCE_BACKEND at startup:
+#   pytorch - plain fp32 PyTorch (default)
+#   int8    - PyTorch dynamic INT8 quantization of the nn.Linear layers
+#   onnx    - the same model exported to ONNX and run with onnxruntime on CPU
+# Every backend takes padded input_ids/attention_mask lists and returns
+# (predicted class ids, confidences).
+
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "pytorch")
+BACKENDS = ["pytorch", "int8", "onnx"]
+ONNX_OPSET = 14
+
+
+class TorchBackend:
+    name = "pytorch"
+
+    def __init__(self, model, num_threads):
+        self.model = model
+
+    def predict(self, input_ids, attention_mask):
+        import torch
+
+        with torch.inference_mode():
+            logits = self.model(
+                input_ids=torch.tensor(input_ids), attention_mask=torch.tensor(attention_mask)
+            ).logits
+            confidence, predicted = torch.softmax(logits, dim=-1).max(dim=-1)
+        return predicted.tolist(), confidence.tolist()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = "int8"
+
+    def __init__(self, model, num_threads):
+        import torch
+
+        # In place, so the fp32 Linear weights are released rather than kept alongside
+        quantized = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+        super().__init__(quantized.eval(), num_threads)
+
+
+def logits_module(model):
+    # (input_ids, attention_mask) -> logits tensor, the form that ONNX export
+    # and TorchScript tracing need
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    return LogitsOnly(model)
+
+
+def _export_onnx(model, path):
+    import torch
+
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    tmp = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            logits_module(model).eval(),
+            (dummy, dummy),
+            tmp,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+    os.replace(tmp, path)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model, num_threads, onnx_path, source_mtime=0):
+        import onnxruntime
+
+        # Export once and reuse; re-export whenever the weights are newer
+        if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < source_mtime:
+            _export_onnx(model, onnx_path)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+
+    def predict(self, input_ids, attention_mask):
+        import numpy as np
+
+        logits = self.session.run(
+            ["logits"],
+            {
+                "input_ids": np.asarray(input_ids, dtype=np.int64),
+                "attention_mask": np.asarray(attention_mask, dtype=np.int64),
+            },
+        )[0]
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=-1, keepdims=True)
+        return probs.argmax(axis=-1).tolist(), probs.max(axis=-1).tolist()
+
+
+def make_backend(name, model, num_threads, onnx_path=None, source_mtime=0):
+    if name == "pytorch":
+        return TorchBackend(model, num_threads)
+    if name == "int8":
+        return QuantizedTorchBackend(model, num_threads)
+    if name == "onnx":
+        return OnnxBackend(model, num_threads, onnx_path, source_mtime)
+    raise ValueError(f"Unknown inference backend '{name}', expected one of {BACKENDS}")
@@ -0,0 +1,84 @@
+import os
+
+from cache import get_cache, normalize_key
+from inference import get_engine
+from responses import loads
+
+# Largest number of texts accepted by one /predict/batch call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+
+
+class BatchError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _item_text(item):
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return item["text"]
+    raise BatchError("Each item must be a string or an object with a 'text' field")
+
+
+def _ndjson(body):
+    try:
+        return [loads(line) for line in body.splitlines() if line.strip()]
+    except ValueError as e:
+        raise BatchError(f"Invalid JSON: {e}")
+
+
+def parse_batch(body, content_type="", max_size=None):
+    # Accepts a JSON array of strings / {"text": ...} objects, {"texts": [...]},
+    # or NDJSON with one string or object per line.
+    max_size = MAX_BATCH_SIZE if max_size is None else max_size
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = _ndjson(body)
+    else:
+        try:
+            items = loads(body)
+        except ValueError:
+            items = _ndjson(body)
+        if isinstance(items, dict):
+            items = items.get("texts")
+        if not isinstance(items, list):
+            raise BatchError("Expected a JSON array of texts")
+
+    if len(items) > max_size:
+        raise BatchError(f"Batch of {len(items)} exceeds the maximum of {max_size}", 413)
+    return [_item_text(item) for item in items]
+
+
+def predict_batch(texts, timer=None):
+    engine = get_engine()
+    keys = [normalize_key(text) for text in texts]
+    if timer:
+        timer.mark("normalize")
+    results = get_cache().predict_batch(texts, engine.version, engine.predict_batch, keys)
+    if timer:
+        timer.mark("classify")
+    for text, result in zip(texts, results):
+        result["text"] = text
+    return results
+
+
+def predict_one(text, timer=None):
+    # Same as predict_batch([text]) without the per-call list bookkeeping
+    engine = get_engine()
+    cache = get_cache()
+    version = engine.version
+    key = normalize_key(text)
+    if timer:
+        timer.mark("normalize")
+    result = cache.get(text, version, key)
+    if result is None:
+        result = engine.predict(text)
+        cache.put(text, version, result, key)
+    if timer:
+        timer.mark("classify")
+    result["text"] = text
+    return result
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import BACKENDS
+from dataset import holdout_split, load_rows
+
+# Load time, latency, throughput, RSS and accuracy of each inference backend
+# on the held-out split of data/textdata.csv. Each backend runs in its own
+# process so load time and RSS are not polluted by the others; predictions
+# are compared against the fp32 backend for a parity check.
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def measure(backend):
+    from inference import InferenceEngine
+
+    _, test = holdout_split(load_rows())
+    texts = [text for text, _ in test]
+
+    engine = InferenceEngine(backend=backend)
+    engine.load()
+    if engine.state != "ready":
+        sys.exit(f"Model unavailable: {engine.error}")
+
+    latencies = []
+    for text in texts[:200]:
+        start = time.perf_counter()
+        engine.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    results = engine.predict_batch(texts)
+    elapsed = time.perf_counter() - start
+
+    labels = [result["predicted_label"] for result in results]
+    return {
+        "backend": engine.status()["backend"],
+        "load_seconds": engine.load_seconds,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99)],
+        "texts_per_sec": len(texts) / elapsed,
+        "rss_mb": rss_mb(),
+        "accuracy": sum(label == gold for label, (_, gold) in zip(labels, test)) / len(test),
+        "labels": labels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child)))
+        return
+
+    reports = []
+    for backend in args.backends:
+        proc = subprocess.run([sys.executable, __file__, "--child", backend], capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"❌ {backend}: {proc.stderr.strip() or proc.stdout.strip()}")
+            continue
+        reports.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    reference = next((r for r in reports if r["backend"] == "pytorch"), None)
+    print(f"{'backend':>8} {'load s':>7} {'p50 ms':>7} {'p99 ms':>7} {'texts/s':>8} {'RSS MB':>7} {'acc':>6} {'agree':>6}")
+    for r in reports:
+        agree = ""
+        if reference:
+            same = sum(a == b for a, b in zip(r["labels"], reference["labels"]))
+            agree = f"{same / len(r['labels']):.1%}"
+        print(f"{r['backend']:>8} {r['load_seconds']:>7.2f} {r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} "
+              f"{r['texts_per_sec']:>8.0f} {r['rss_mb']:>7.0f} {r['accuracy']:>6.1%} {agree:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import contextlib
+import http.client
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset import load_texts
+from main import RailwayHandler
+
+# Throughput of N single POST /predict calls vs POST /predict/batch against a
+# local main.py server.
+
+BATCH_SIZES = [10, 100, 1000]
+
+
+def post(port, path, payload):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    assert response.status == 200, body
+    return body
+
+
+def main():
+    texts = load_texts()
+    server = HTTPServer(("127.0.0.1", 0), RailwayHandler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Keep the handler's per-request log line out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for text in texts:
+            post(port, "/predict", {"text": text})
+        single = len(texts) / (time.perf_counter() - start)
+
+        batched = {}
+        for size in BATCH_SIZES:
+            start = time.perf_counter()
+            for i in range(0, len(texts), size):
+                post(port, "/predict/batch", texts[i:i + size])
+            batched[size] = len(texts) / (time.perf_counter() - start)
+
+    server.shutdown()
+    print(f"📊 {len(texts)} texts from data/textdata.csv")
+    print(f"{'mode':>14} {'texts/sec':>12} {'speedup':>8}")
+    print(f"{'single':>14} {single:>12.0f} {'1.0x':>8}")
+    for size, rate in batched.items():
+        print(f"{'batch ' + str(size):>14} {rate:>12.0f} {rate / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
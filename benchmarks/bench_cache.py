@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import PredictionCache
+from dataset import load_texts
+from inference import InferenceEngine
+
+# Replays data/textdata.csv with a Zipfian popularity distribution and reports
+# cache hit rate and per-request latency with and without the cache.
+# --model-ms adds a simulated model cost per miss so the saving for the
+# DistilBERT path can be seen without weights.
+
+
+def zipf_stream(texts, count, s, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (rank ** s) for rank in range(1, len(texts) + 1)]
+    shuffled = texts[:]
+    rng.shuffle(shuffled)
+    return rng.choices(shuffled, weights=weights, k=count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--model-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    engine = InferenceEngine().start()
+    engine.wait()
+
+    def predict_batch(texts):
+        if args.model_ms:
+            time.sleep(args.model_ms / 1000)
+        return engine.predict_batch(texts)
+
+    stream = zipf_stream(load_texts(), args.requests, args.zipf)
+    print(f"📊 {args.requests} requests, zipf s={args.zipf}, model={engine.model_type}, "
+          f"simulated model cost {args.model_ms} ms")
+
+    start = time.perf_counter()
+    for text in stream:
+        predict_batch([text])
+    baseline_us = (time.perf_counter() - start) / len(stream) * 1e6
+
+    print(f"{'entries':>8} {'hit rate':>9} {'us/req':>9} {'no cache':>9} {'saving':>7}")
+    for entries in args.entries:
+        cache = PredictionCache(max_entries=entries, max_bytes=1 << 30)
+        start = time.perf_counter()
+        for text in stream:
+            cache.predict_batch([text], engine.version, predict_batch)
+        cached_us = (time.perf_counter() - start) / len(stream) * 1e6
+        stats = cache.stats()
+        print(f"{entries:>8} {stats['hit_rate']:>9.1%} {cached_us:>9.1f} {baseline_us:>9.1f} "
+              f"{1 - cached_us / baseline_us:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cascade import STAGES, make_stage
+from dataset import holdout_split, load_rows
+from inference import InferenceEngine
+
+# Cost/accuracy curve of the cascade on the held-out split: for each
+# threshold, the fraction of inputs escalated to DistilBERT, the accuracy of
+# the answers stage 1 keeps, the end-to-end accuracy and the mean cost per
+# request. Stage 1 is fitted on the training split only. Without weights the
+# DistilBERT columns use --model-ms as its cost and accuracy is left blank.
+
+THRESHOLDS = [0.0, 0.5, 0.7, 0.8, 0.9, 0.95, 0.99, 1.01]
+
+
+def per_text_us(classify_batch, texts):
+    start = time.perf_counter()
+    results = [classify_batch([text])[0] for text in texts]
+    return results, (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stage1", choices=STAGES, nargs="+", default=STAGES)
+    parser.add_argument("--model-ms", type=float, default=30.0, help="DistilBERT cost when the weights are missing")
+    args = parser.parse_args()
+
+    train_rows, test_rows = holdout_split(load_rows())
+    texts = [text for text, _ in test_rows]
+    gold = [label for _, label in test_rows]
+
+    engine = InferenceEngine()
+    engine.load()
+    if engine.model_type == "distilbert":
+        model_results, model_us = per_text_us(engine.predict_batch, texts)
+        model_correct = [r["predicted_label"] == label for r, label in zip(model_results, gold)]
+    else:
+        model_correct, model_us = None, args.model_ms * 1000
+        print(f"⚠️ DistilBERT unavailable ({engine.error}); assuming {args.model_ms} ms per call")
+
+    print(f"📊 {len(test_rows)} held-out rows, DistilBERT {model_us:.0f} us/request")
+    for name in args.stage1:
+        stage = make_stage(name).fit(train_rows)
+        results, stage_us = per_text_us(stage.classify_batch, texts)
+        correct = [r["predicted_label"] == label for r, label in zip(results, gold)]
+        print(f"\nstage 1 = {name}: {sum(correct) / len(correct):.1%} alone, {stage_us:.0f} us/request")
+        print(f"{'threshold':>9} {'escalated':>10} {'kept acc':>9} {'end-to-end':>11} {'us/request':>11}")
+        for threshold in THRESHOLDS:
+            escalate = [r["confidence"] < threshold for r in results]
+            escalated = sum(escalate) / len(escalate)
+            kept = [ok for ok, up in zip(correct, escalate) if not up]
+            kept_accuracy = f"{sum(kept) / len(kept):.1%}" if kept else "-"
+            end_to_end = "-"
+            if model_correct is not None:
+                final = [m if up else ok for ok, m, up in zip(correct, model_correct, escalate)]
+                end_to_end = f"{sum(final) / len(final):.1%}"
+            cost = stage_us + escalated * model_us
+            print(f"{threshold:>9} {escalated:>10.1%} {kept_accuracy:>9} {end_to_end:>11} {cost:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
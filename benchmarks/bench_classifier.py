@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier import DEFAULT_LEXICON, KeywordClassifier
+from dataset import load_texts
+
+# Per-request cost of the compiled keyword matcher vs the old chained
+# `any(word in text ...)` scans as the lexicon grows.
+
+LEXICON_SIZES = [100, 1000, 2500, 5000]
+
+
+def synthetic_lexicon(size, seed=0):
+    rng = random.Random(seed)
+    lexicon = {label: {"weight": 1.0, "terms": dict(cat["terms"])} for label, cat in DEFAULT_LEXICON.items()}
+    labels = list(lexicon)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    i = 0
+    while sum(len(cat["terms"]) for cat in lexicon.values()) < size:
+        term = "".join(rng.choice(alphabet) for _ in range(rng.randint(4, 10)))
+        lexicon[labels[i % len(labels)]]["terms"][term] = 1.0
+        i += 1
+    return lexicon
+
+
+def naive_classify(lexicon, text):
+    text = text.lower()
+    for label, category in lexicon.items():
+        if any(word in text for word in category["terms"]):
+            return label
+    return "potholes"
+
+
+def time_per_call(fn, texts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def main():
+    texts = load_texts()
+    print(f"📊 {len(texts)} texts from data/textdata.csv")
+    print(f"{'terms':>8} {'naive us/req':>14} {'compiled us/req':>16} {'compile ms':>11} {'speedup':>8}")
+    for size in LEXICON_SIZES:
+        lexicon = synthetic_lexicon(size)
+        start = time.perf_counter()
+        matcher = KeywordClassifier(lexicon)
+        compile_ms = (time.perf_counter() - start) * 1e3
+        naive = time_per_call(lambda t: naive_classify(lexicon, t), texts)
+        compiled = time_per_call(matcher.classify, texts)
+        print(f"{len(matcher):>8} {naive:>14.1f} {compiled:>16.1f} {compile_ms:>11.1f} {naive / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
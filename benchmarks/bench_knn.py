@@ -0,0 +1,77 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier import KeywordClassifier
+from dataset import holdout_split, load_rows
+from inference import MODEL_PATH, TORCH_THREADS, InferenceEngine
+from knn import HashedNgramEmbedder, KnnIndex, make_embedder
+
+# Latency and held-out accuracy of the classifier modes: keyword rules,
+# kNN over hashed n-grams, kNN over DistilBERT embeddings and the fine-tuned
+# DistilBERT classifier (the last two only when torch and the weights are
+# available). kNN indexes are built from the training split only.
+
+
+def evaluate(name, classify_batch, test_rows, batch_size):
+    texts = [text for text, _ in test_rows]
+    start = time.perf_counter()
+    for text in texts:
+        classify_batch([text])
+    single_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+    start = time.perf_counter()
+    predicted = []
+    for i in range(0, len(texts), batch_size):
+        predicted += [r["predicted_label"] for r in classify_batch(texts[i:i + batch_size])]
+    batch_rate = len(texts) / (time.perf_counter() - start)
+
+    accuracy = sum(p == label for p, (_, label) in zip(predicted, test_rows)) / len(test_rows)
+    print(f"{name:>16} {accuracy:>9.1%} {single_us:>11.0f} {batch_rate:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    train_rows, test_rows = holdout_split(load_rows())
+    print(f"📊 {len(train_rows)} training rows indexed, {len(test_rows)} held out, k={args.k}")
+    print(f"{'mode':>16} {'accuracy':>9} {'us/request':>11} {'texts/sec':>11}")
+
+    evaluate("keyword", KeywordClassifier().classify_batch, test_rows, args.batch_size)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "train.csv")
+        with open(data_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["text", "label"])
+            writer.writerows(train_rows)
+
+        embedders = [HashedNgramEmbedder()]
+        embedder = make_embedder(MODEL_PATH, TORCH_THREADS)
+        if not isinstance(embedder, HashedNgramEmbedder):
+            embedders.append(embedder)
+        for embedder in embedders:
+            start = time.perf_counter()
+            index = KnnIndex(embedder, os.path.join(tmp, embedder.name), data_path, k=args.k,
+                             refresh_seconds=0).load()
+            print(f"   (built {embedder.name} index in {time.perf_counter() - start:.2f}s)")
+            evaluate(f"knn {embedder.name}", index.classify_batch, test_rows, args.batch_size)
+
+    engine = InferenceEngine()
+    engine.load()
+    if engine.model_type == "distilbert":
+        evaluate("distilbert", engine.predict_batch, test_rows, args.batch_size)
+    else:
+        print(f"{'distilbert':>16} skipped: {engine.error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import AccessLog, Metrics, MetricsMiddleware, StageTimer
+
+# Per-request cost of the instrumentation added to the /predict path: a stage
+# timer with four marks, the counter/histogram update and an access-log
+# record, at a few sample rates; then the same through the ASGI middleware
+# main_fastapi.py uses, over a bare ASGI app and measured against that app
+# called directly.
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--samples", type=float, nargs="+", default=[0.0, 0.01, 1.0])
+    args = parser.parse_args()
+
+    print(f"📊 {args.requests} simulated requests")
+    print(f"{'sample':>7} {'us/req':>8}")
+    for sample in args.samples:
+        metrics = Metrics()
+        log = AccessLog(io.StringIO(), sample=sample, flush_seconds=0.05, max_buffer=10**6)
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            timer = StageTimer()
+            metrics.request_started()
+            for stage in ("body_read", "json_decode", "classify", "serialize"):
+                timer.mark(stage)
+            elapsed = timer.elapsed()
+            metrics.request_finished("/predict", 200, elapsed, timer.stages, ("garbage",))
+            log.record("POST", "/predict", 200, elapsed, "127.0.0.1")
+        per_request_us = (time.perf_counter() - start) / args.requests * 1e6
+        log.flush()
+        print(f"{sample:>7} {per_request_us:>8.2f}")
+
+    print(f"{'sample':>7} {'asgi us/req':>11}")
+    for sample in args.samples:
+        log = AccessLog(io.StringIO(), sample=sample, flush_seconds=0.05, max_buffer=10**6)
+        middleware = MetricsMiddleware(endpoint, route=lambda path: path, registry=Metrics(), log=log)
+        bare = asyncio.run(drive(endpoint, args.requests))
+        wrapped = asyncio.run(drive(middleware, args.requests))
+        log.flush()
+        print(f"{sample:>7} {(wrapped - bare) / args.requests * 1e6:>11.2f}")
+
+
+async def endpoint(scope, receive, send):
+    # Stands in for a FastAPI route: stage marks, labels, a two-message response
+    state = scope.setdefault("state", {})
+    if "timer" in state:
+        for stage in ("body_read", "json_decode", "classify", "serialize"):
+            state["timer"].mark(stage)
+        state["labels"] = ("garbage",)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def drive(app, requests):
+    async def send(message):
+        pass
+
+    client = ("127.0.0.1", 40000)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "POST", "path": "/predict", "client": client}, None, send)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
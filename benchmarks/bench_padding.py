@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer, DistilBertConfig
+
+from dataset import load_texts
+from inference import INFERENCE_BATCH_SIZE, MODEL_PATH, InferenceEngine, has_weights
+
+# Tokens processed and wall time on data/textdata.csv: the notebook's fixed
+# padding="max_length", max_length=128 vs length-bucketed dynamic padding.
+# Without trained weights a randomly initialised model of the same size is
+# used; the cost per token is identical.
+
+
+def load_model():
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
+    if has_weights(MODEL_PATH):
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH)
+    else:
+        print("⚠️ No trained weights, timing a randomly initialised model")
+        model = AutoModelForSequenceClassification.from_config(DistilBertConfig.from_pretrained(MODEL_PATH))
+    return model.eval(), tokenizer
+
+
+def fixed_padding(model, tokenizer, texts):
+    tokens = 0
+    for i in range(0, len(texts), INFERENCE_BATCH_SIZE):
+        encoded = tokenizer(texts[i:i + INFERENCE_BATCH_SIZE], padding="max_length", truncation=True,
+                            max_length=128, return_tensors="pt")
+        tokens += encoded["input_ids"].numel()
+        with torch.inference_mode():
+            model(**encoded)
+    return tokens
+
+
+def main():
+    texts = load_texts()
+    model, tokenizer = load_model()
+    engine = InferenceEngine()
+    engine.set_model(model, tokenizer)
+    engine.tokens_real = engine.tokens_padded = 0
+
+    start = time.perf_counter()
+    fixed_tokens = fixed_padding(model, tokenizer, texts)
+    fixed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.predict_batch(texts)
+    bucketed_seconds = time.perf_counter() - start
+
+    print(f"📊 {len(texts)} texts from data/textdata.csv, batch size {INFERENCE_BATCH_SIZE}")
+    print(f"{'padding':>16} {'tokens':>10} {'wall s':>8} {'texts/s':>9}")
+    print(f"{'fixed 128':>16} {fixed_tokens:>10} {fixed_seconds:>8.2f} {len(texts) / fixed_seconds:>9.0f}")
+    print(f"{'bucketed':>16} {engine.tokens_padded:>10} {bucketed_seconds:>8.2f} {len(texts) / bucketed_seconds:>9.0f}")
+    print(f"real (unpadded) tokens: {engine.tokens_real}, speedup {fixed_seconds / bucketed_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
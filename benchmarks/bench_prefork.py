@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loadtest import parse_args, run
+
+# main.py in SERVER_MODE=prefork as the worker count grows, with the model
+# loaded once in the parent and shared by the workers (PREFORK_PRELOAD=1)
+# against every worker loading its own copy (PREFORK_PRELOAD=0). For each it
+# prints throughput and p99 of a closed loop with --clients-per-worker
+# clients per worker, next to the whole process tree's peak RSS and PSS.
+# RSS counts a shared page once in every worker that maps it, PSS splits it
+# between them, so with preloading RSS grows by a model per worker and PSS
+# by a worker's own heap only. Each worker gets cpus/workers intra-op
+# threads unless TORCH_THREADS is set.
+#
+#   python benchmarks/bench_prefork.py --workers 1 2 4 --duration 10
+
+VARIANTS = {
+    "shared": {"PREFORK_PRELOAD": "1"},
+    "per_worker": {"PREFORK_PRELOAD": "0"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--variant", choices=list(VARIANTS), nargs="+", default=list(VARIANTS))
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--path", default="/predict")
+    parser.add_argument("--batch-size", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="server environment")
+    args = parser.parse_args()
+
+    print(f"{'variant':>11} {'workers':>7} {'req/s':>8} {'texts/s':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'RSS MB':>8} {'PSS MB':>8} {'PSS/worker':>10}")
+    for name in args.variant:
+        for workers in args.workers:
+            env = {**VARIANTS[name], "SERVER_MODE": "prefork", "WORKERS": str(workers)}
+            argv = ["--server", "main", "--wait-ready", "--path", args.path, "--batch-size", str(args.batch_size),
+                    "--concurrency", str(workers * args.clients_per_worker), "--duration", str(args.duration)]
+            for item in [f"{key}={value}" for key, value in env.items()] + args.env:
+                argv += ["--env", item]
+            result = run(parse_args(argv))
+            print(f"{name:>11} {workers:>7} {result['throughput_rps']:>8.0f} {result['texts_per_sec']:>8.0f} "
+                  f"{result['latency_ms']['p99']:>8.2f} {result['error_rate']:>7.2%} "
+                  f"{result['server_rss_mb_peak']:>8.0f} {result['server_pss_mb_peak']:>8.0f} "
+                  f"{result['server_pss_mb_peak'] / workers:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Requests/sec per route against a main.py server started in a subprocess.
+# Clients are separate processes holding keep-alive connections, so the client
+# side doesn't share a GIL with the server. Run it on two checkouts to compare
+# before/after, or point --port at a server that is already running.
+
+ROUTES = [
+    ("GET", "/", None),
+    ("GET", "/health", None),
+    ("GET", "/docs", None),
+    ("GET", "/predict", None),
+    ("POST", "/predict", {"text": "The street light near the park is not working"}),
+    ("POST", "/predict/batch", ["Garbage not collected", "Big pothole on main road"] * 16),
+]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def client(job):
+    port, method, path, payload, seconds, headers = job
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = dict(headers, **({"Content-Type": "application/json"} if body else {}))
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    count = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        count += 1
+        errors += response.status >= 400
+    conn.close()
+    return count, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, help="benchmark an already running server instead")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        port = 18000 + os.getpid() % 1000
+        env = dict(os.environ, PORT=str(port), ACCESS_LOG_SAMPLE="0")
+        server = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+        print(f"📊 {args.concurrency} keep-alive clients, {args.seconds}s per route")
+        print(f"{'route':>20} {'req/sec':>9} {'errors':>7}")
+        with Pool(args.concurrency) as pool:
+            for method, path, payload in ROUTES:
+                jobs = [(port, method, path, payload, args.seconds, headers)] * args.concurrency
+                counts = pool.map(client, jobs)
+                total = sum(count for count, _ in counts)
+                errors = sum(error for _, error in counts)
+                print(f"{method + ' ' + path:>20} {total / args.seconds:>9.0f} {errors:>7}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loadtest import free_port
+
+# Cold start of main.py, phase by phase: seconds from process start to the
+# port being bound, the tokenizer loaded, torch imported, the weights loaded
+# and the model warmed up, as reported in /ready, next to the times this
+# client saw /health and /ready answer. Each variant is started --runs times
+# from scratch; the medians are printed. The snapshot variant starts once
+# untimed first, so the snapshot exists before it is measured.
+
+VARIANTS = {
+    "snapshot": {"STARTUP_SNAPSHOT": "1"},
+    "from_pretrained": {"STARTUP_SNAPSHOT": "0"},
+}
+PHASES = ["port_bound", "tokenizer_ready", "torch_imported", "weights_loaded", "model_ready", "fallback_ready"]
+
+
+def get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except OSError:
+        return None, None
+
+
+def start_once(env, timeout):
+    port = free_port()
+    start = time.time()
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env={**os.environ, **env, "PORT": str(port)},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    seen = {}
+    try:
+        while time.time() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"main.py exited with status {process.returncode}")
+            if "health" not in seen:
+                if get(port, "/health")[0] == 200:
+                    seen["health"] = time.time() - start
+            else:
+                status, body = get(port, "/ready")
+                if status == 200:
+                    seen["ready"] = time.time() - start
+                    ready = json.loads(body)
+                    return seen, ready["startup"], ready["load_source"]
+            time.sleep(0.005)
+        raise RuntimeError(f"main.py not ready within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--variant", choices=list(VARIANTS), nargs="+", default=list(VARIANTS))
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{'variant':>16} {'source':>11} " + " ".join(f"{phase:>15}" for phase in PHASES)
+          + f" {'client /health':>15} {'client /ready':>14}")
+    for name in args.variant:
+        env = {**VARIANTS[name], "SERVER_MODE": "threaded"}
+        if name == "snapshot":
+            start_once(env, args.timeout)
+        runs = [start_once(env, args.timeout) for _ in range(args.runs)]
+        phases = [
+            f"{statistics.median(run[1][phase] for run in runs):>15.3f}" if phase in runs[0][1] else f"{'-':>15}"
+            for phase in PHASES
+        ]
+        health = statistics.median(run[0]["health"] for run in runs)
+        ready = statistics.median(run[0]["ready"] for run in runs)
+        source = runs[0][2] or "keyword"
+        print(f"{name:>16} {source:>11} " + " ".join(phases) + f" {health:>15.3f} {ready:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
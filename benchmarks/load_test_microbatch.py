@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset import load_texts
+from microbatch import MicroBatcher
+
+# p50/p99 latency vs throughput of the micro-batcher for several batching
+# windows. Uses the real DistilBERT engine when it can load; otherwise
+# --simulate models a forward pass as fixed overhead + per-item cost, which is
+# the shape that makes batching pay off on CPU.
+
+WINDOWS_MS = [0, 2, 5, 10]
+
+
+def simulated_predict_batch(overhead_ms, per_item_ms):
+    def predict_batch(texts):
+        time.sleep((overhead_ms + per_item_ms * len(texts)) / 1000)
+        return [{"predicted_label": "potholes"} for _ in texts]
+    return predict_batch
+
+
+def model_predict_batch():
+    from inference import get_engine
+
+    engine = get_engine().start()
+    engine.wait()
+    if engine.state != "ready":
+        sys.exit(f"Model not available ({engine.error}); rerun with --simulate")
+    return engine.predict_batch
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(predict_batch, texts, window_ms, concurrency, requests):
+    batcher = MicroBatcher(predict_batch, window_ms=window_ms)
+    latencies = []
+    pending = iter(random.Random(0).choices(texts, k=requests))
+
+    async def client():
+        for text in pending:
+            start = time.perf_counter()
+            await batcher.submit(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    await batcher.stop()
+    return requests / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), stats["mean_batch_size"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--simulate", action="store_true", help="use a synthetic model cost instead of DistilBERT")
+    parser.add_argument("--overhead-ms", type=float, default=8.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.simulate:
+        predict_batch = simulated_predict_batch(args.overhead_ms, args.per_item_ms)
+    else:
+        predict_batch = model_predict_batch()
+    texts = load_texts()
+
+    print(f"{'window ms':>10} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>10}")
+    for window in WINDOWS_MS:
+        for concurrency in args.concurrency:
+            rate, p50, p99, mean_batch = asyncio.run(run(predict_batch, texts, window, concurrency, args.requests))
+            print(f"{window:>10} {concurrency:>8} {rate:>9.0f} {p50:>8.1f} {p99:>8.1f} {mean_batch:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import argparse
+import codecs
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+from inference import InferenceEngine, TORCH_THREADS
+
+# Streaming bulk classification: read -> normalize -> batch -> classify -> write.
+# Every stage is a generator and at most a few batches are in flight, so memory
+# stays flat however large the input is.
+#
+#   python bulk_classify.py data/textdata.csv -o labeled.jsonl
+#   python bulk_classify.py requests.jsonl --text-field body -o - --format csv
+#   zcat big.csv.gz | python bulk_classify.py - -o out.jsonl --workers 4
+#
+# With -o FILE a checkpoint (FILE.ckpt) records the input byte offset after
+# every flushed batch; --resume continues an interrupted run from there.
+
+PREDICTION_FIELDS = ["predicted_class", "predicted_label", "confidence", "model_type", "model_version"]
+
+
+class OffsetReader:
+    # Yields decoded lines while tracking the byte offset (of the uncompressed
+    # stream) just past the last line handed out
+    def __init__(self, raw, offset=0):
+        self.raw = raw
+        self.offset = offset
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig" if offset == 0 else "utf-8")()
+
+    def __iter__(self):
+        for line in self.raw:
+            self.offset += len(line)
+            yield self.decoder.decode(line)
+
+
+def open_input(path):
+    if path == "-":
+        raw = sys.stdin.buffer
+    else:
+        raw = open(path, "rb")
+    # Sniff gzip from the magic bytes so .gz without the extension still works
+    if isinstance(raw, io.BufferedReader) and raw.peek(2)[:2] == b"\x1f\x8b":
+        raw = gzip.GzipFile(fileobj=raw)
+    return raw
+
+
+def detect_format(path, explicit):
+    if explicit:
+        return explicit
+    name = path[:-3] if path.endswith(".gz") else path
+    return "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_records(path, fmt, text_field, offset=0):
+    # Yields (record, text, offset_after_record)
+    raw = open_input(path)
+    try:
+        if fmt == "csv":
+            header_line = raw.readline()
+            fieldnames = next(csv.reader([header_line.decode("utf-8-sig")]))
+            start = max(offset, len(header_line))
+            if start > len(header_line):
+                raw.seek(start)
+            lines = OffsetReader(raw, start)
+            for row in csv.reader(lines):
+                record = dict(zip(fieldnames, row))
+                yield record, record.get(text_field, ""), lines.offset
+        else:
+            if offset:
+                raw.seek(offset)
+            lines = OffsetReader(raw, offset)
+            for line in lines:
+                if line.strip():
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        record = {text_field: record}
+                    yield record, record.get(text_field, ""), lines.offset
+    finally:
+        if raw is not sys.stdin.buffer:
+            raw.close()
+
+
+def normalize(records, text_field):
+    for record, text, offset in records:
+        text = " ".join(str(text or "").split())
+        # Skip blank rows and the header copies that concatenated CSVs contain
+        if not text or text == text_field:
+            continue
+        yield record, text, offset
+
+
+def batched(records, size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_engine = None
+
+
+def _init_worker(num_threads):
+    global _engine
+    _engine = InferenceEngine(num_threads=num_threads)
+    _engine.load()
+
+
+def _classify_texts(texts):
+    return _engine.predict_batch(texts)
+
+
+def classify(batches, workers):
+    # Yields (batch, results) in input order
+    if workers <= 1:
+        _init_worker(TORCH_THREADS)
+        for batch in batches:
+            yield batch, _classify_texts([text for _, text, _ in batch])
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with Pool(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        # Pool.imap would drain the whole input up front; keep a small window
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.apply_async(_classify_texts, ([text for _, text, _ in batch],))))
+            if len(pending) >= workers * 2:
+                done, result = pending.popleft()
+                yield done, result.get()
+        while pending:
+            done, result = pending.popleft()
+            yield done, result.get()
+
+
+class Writer:
+    def __init__(self, stream, fmt, write_header=True):
+        self.stream = stream
+        self.fmt = fmt
+        self.write_header = write_header
+        self.csv = None
+
+    def write(self, record, result):
+        row = dict(record)
+        row.update({field: result[field] for field in PREDICTION_FIELDS})
+        if self.fmt == "jsonl":
+            self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+            return
+        if self.csv is None:
+            self.csv = csv.DictWriter(self.stream, fieldnames=list(row), extrasaction="ignore")
+            if self.write_header:
+                self.csv.writeheader()
+        self.csv.writerow(row)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run(args):
+    fmt = detect_format(args.input, args.format)
+    out_fmt = args.output_format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    checkpoint_path = args.output + ".ckpt" if args.output != "-" else None
+
+    state = {"input": args.input, "input_offset": 0, "output_offset": 0, "rows": 0}
+    if args.resume:
+        if checkpoint_path is None or args.input == "-":
+            sys.exit("--resume needs a file input and a file output")
+        state = load_checkpoint(checkpoint_path) or state
+
+    if args.output == "-":
+        out = sys.stdout
+    else:
+        out = open(args.output, "r+" if state["output_offset"] else "w", encoding="utf-8", newline="")
+        # Drop anything written after the last checkpoint
+        out.seek(state["output_offset"])
+        out.truncate()
+    writer = Writer(out, out_fmt, write_header=state["output_offset"] == 0)
+
+    records = normalize(read_records(args.input, fmt, args.text_field, state["input_offset"]), args.text_field)
+    start = time.perf_counter()
+    last_report = start
+    rows = 0
+    try:
+        for batch, results in classify(batched(records, args.batch_size), args.workers):
+            for (record, _, _), result in zip(batch, results):
+                writer.write(record, result)
+            rows += len(batch)
+            if checkpoint_path:
+                out.flush()
+                state.update(input_offset=batch[-1][2], output_offset=out.tell(), rows=state["rows"] + len(batch))
+                save_checkpoint(checkpoint_path, state)
+            now = time.perf_counter()
+            if now - last_report >= args.progress_every:
+                print(f"📈 {rows} rows, {rows / (now - start):.0f} rows/sec", file=sys.stderr)
+                last_report = now
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/sec)", file=sys.stderr)
+    if checkpoint_path and os.path.exists(checkpoint_path) and not args.keep_checkpoint:
+        os.remove(checkpoint_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream-classify a CSV or JSONL file of civic complaints")
+    parser.add_argument("input", help="CSV/JSONL path (optionally .gz), or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output path, or - for stdout (default)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: from extension)")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="output format (default: from extension)")
+    parser.add_argument("--text-field", default="text", help="column/field holding the complaint text")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1, help="processes for the model path")
+    parser.add_argument("--resume", action="store_true", help="continue from OUTPUT.ckpt")
+    parser.add_argument("--keep-checkpoint", action="store_true", help="keep OUTPUT.ckpt after finishing")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between rows/sec reports")
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
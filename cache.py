@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Prediction cache shared by the /predict handlers. Complaint traffic repeats
+# the same phrasing constantly, so results are keyed on the normalized text
+# plus the model version that produced them.
+
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 0))  # seconds, 0 = no expiry
+
+
+def normalize_key(text):
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def _entry_size(key, result):
+    return sys.getsizeof(key) + sys.getsizeof(result) + sum(sys.getsizeof(v) for v in result.values())
+
+
+class PredictionCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (result, size, expires_at)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_version(self, version):
+        # A different model version means the model was reloaded: drop
+        # everything the old one produced
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get(self, text, version, key=None):
+        if not self.enabled:
+            return None
+        key = key or normalize_key(text)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            result, size, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(result)
+
+    def put(self, text, version, result, key=None):
+        if not self.enabled:
+            return
+        key = key or normalize_key(text)
+        result = {k: v for k, v in result.items() if k != "text"}
+        size = _entry_size(key, result)
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (result, size, expires_at)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def predict_batch(self, texts, version, predict_batch, keys=None):
+        # Serve hits from the cache and send only the misses to the model,
+        # in one call, keeping input order
+        keys = keys or [normalize_key(text) for text in texts]
+        results = [self.get(text, version, key) for text, key in zip(texts, keys)]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            computed = predict_batch([texts[i] for i in misses])
+            for i, result in zip(misses, computed):
+                self.put(texts[i], version, result, keys[i])
+                results[i] = result
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "model_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PredictionCache()
+        return _cache
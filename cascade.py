@@ -0,0 +1,151 @@
+import os
+from bisect import bisect_left
+
+from classifier import LABEL2ID, LABELS, get_classifier
+
+# First stage of the cascade classifier (CLASSIFIER_MODE=cascade). A cheap
+# model answers every input with a calibrated confidence; the engine sends
+# only the inputs below CASCADE_THRESHOLD on to DistilBERT. Both stages are
+# fitted on labelled rows when the engine loads:
+#   keyword - the keyword matcher, with confidence taken from how often its
+#             answers were right on the labelled rows, binned by the margin
+#             between the best and second-best label scores
+#   logreg  - hashed char n-gram TF-IDF + logistic regression (scikit-learn),
+#             with probabilities calibrated by isotonic regression on
+#             out-of-fold predictions
+
+CASCADE_STAGE1 = os.environ.get("CASCADE_STAGE1", "keyword")
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", 0.9))
+STAGES = ["keyword", "logreg"]
+
+# Upper edges of the keyword margin bins; margin 0 covers ties and no match
+MARGIN_BINS = [0.0, 0.5, 1.0, 2.0, 3.0, 5.0]
+
+
+def _result(label, confidence, model_type):
+    return {
+        "predicted_class": LABEL2ID.get(label, len(LABELS)),
+        "predicted_label": label,
+        "confidence": round(confidence, 4),
+        "model_type": model_type,
+    }
+
+
+class KeywordStage:
+    name = "keyword"
+    model_type = "rule_based"
+
+    def __init__(self, classifier=None):
+        self.classifier = classifier or get_classifier()
+        self.bin_accuracy = [0.5] * (len(MARGIN_BINS) + 1)
+
+    def _predict(self, texts):
+        # Returns [(label, margin bin)]
+        predictions = []
+        for scores in self.classifier.batch_scores(texts):
+            label = self.classifier.label_for(scores)
+            top = sorted(scores.values(), reverse=True)[:2] + [0.0, 0.0]
+            predictions.append((label, bisect_left(MARGIN_BINS, top[0] - top[1])))
+        return predictions
+
+    def fit(self, rows):
+        counts = [[0, 0] for _ in self.bin_accuracy]
+        for (label, bin_index), (_, gold) in zip(self._predict([text for text, _ in rows]), rows):
+            counts[bin_index][0] += label == gold
+            counts[bin_index][1] += 1
+        # Laplace-smoothed, so a sparse bin doesn't claim certainty
+        self.bin_accuracy = [(correct + 1) / (total + 2) for correct, total in counts]
+        return self
+
+    def classify_batch(self, texts):
+        return [
+            _result(label, self.bin_accuracy[bin_index], self.model_type)
+            for label, bin_index in self._predict(texts)
+        ]
+
+
+class LogisticStage:
+    name = "logreg"
+    model_type = "logreg"
+
+    def __init__(self, n_features=2 ** 16, ngram_range=(2, 4), C=10.0):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=ngram_range, n_features=n_features,
+                                            alternate_sign=False, norm=None)
+        self.C = C
+
+    def _features(self, texts):
+        # Sublinear TF-IDF with l2-normalised rows, applied to the CSR arrays
+        # in place: sklearn's transformer and scipy's elementwise ops cost
+        # more per call than the arithmetic itself
+        import numpy as np
+
+        features = self.vectorizer.transform(texts)
+        data = features.data
+        np.log(data, out=data)
+        data += 1
+        data *= self.idf[features.indices]
+        row_lengths = np.diff(features.indptr)
+        norms = np.sqrt(np.bincount(np.repeat(np.arange(len(row_lengths)), row_lengths), data * data,
+                                    minlength=len(row_lengths)))
+        norms[norms == 0] = 1.0
+        data /= np.repeat(norms, row_lengths)
+        return features
+
+    def _probabilities(self, features):
+        import numpy as np
+
+        logits = features @ self.coef + self.intercept
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def fit(self, rows):
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfTransformer
+        from sklearn.isotonic import IsotonicRegression
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import cross_val_predict
+
+        texts = [text for text, _ in rows]
+        labels = np.array([label for _, label in rows])
+        counts = self.vectorizer.transform(texts)
+        self.idf = TfidfTransformer(sublinear_tf=True).fit(counts).idf_.astype(np.float32)
+        features = self._features(texts)
+        model = LogisticRegression(C=self.C, max_iter=1000)
+
+        # Out-of-fold probabilities show how often an answer given with a raw
+        # probability p is right; isotonic regression maps p to that rate
+        held_out = cross_val_predict(model, features, labels, cv=5, method="predict_proba")
+        classes = np.unique(labels)
+        correct = classes[held_out.argmax(axis=1)] == labels
+        isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(held_out.max(axis=1), correct)
+        self.calibration = (isotonic.X_thresholds_, isotonic.y_thresholds_)
+
+        model.fit(features, labels)
+        self.classes = list(model.classes_)
+        self.coef = model.coef_.T.astype(np.float32)
+        self.intercept = model.intercept_.astype(np.float32)
+        return self
+
+    def classify_batch(self, texts):
+        import numpy as np
+
+        if not texts:
+            return []
+        probabilities = self._probabilities(self._features(list(texts)))
+        best = probabilities.argmax(axis=1)
+        confidence = np.interp(probabilities.max(axis=1), *self.calibration)
+        return [
+            _result(self.classes[index], float(score), self.model_type)
+            for index, score in zip(best, confidence)
+        ]
+
+
+def make_stage(name):
+    if name == "keyword":
+        return KeywordStage()
+    if name == "logreg":
+        return LogisticStage()
+    raise ValueError(f"Unknown cascade stage '{name}', expected one of {STAGES}")
@@ -0,0 +1,184 @@
+import re
+
+# Shared keyword classifier used by every server (main.py, app.py, main_fastapi.py).
+# The lexicon is compiled once into a single trie-shaped regex so each request
+# is one left-to-right pass over the text, however many terms there are.
+
+LABELS = ["streetlight", "garbage", "potholes"]
+LABEL2ID = {label: idx for idx, label in enumerate(LABELS)}
+
+# Anything the lexicon does not recognise is reported as a road issue, same as
+# the original if/elif handlers did.
+DEFAULT_LABEL = "potholes"
+
+# Confidences reported by the original rule-based handlers
+LABEL_CONFIDENCE = {"streetlight": 0.85, "garbage": 0.88, "potholes": 0.82}
+
+# Terms are lowercase and matched on word boundaries. Multi-word phrases are
+# matched as a unit and win over their individual words ("light kharab" scores
+# as one strong hit rather than a plain "light").
+DEFAULT_LEXICON = {
+    "streetlight": {
+        "weight": 1.0,
+        "terms": {
+            "light": 1.0, "lights": 1.0, "lighting": 1.0, "lamp": 1.0, "lamps": 1.0,
+            "bulb": 1.0, "bulbs": 1.0, "streetlight": 1.5, "streetlights": 1.5,
+            "street light": 1.5, "street lights": 1.5, "lamp post": 1.5, "light pole": 1.5,
+            "flickering": 0.8, "dark": 0.5, "darkness": 0.5, "wire": 0.3, "pole": 0.8,
+            "lightwa": 1.0,
+            "batti": 1.0, "battiya": 1.0, "batiya": 1.0, "khamba": 0.8, "polewa": 0.8,
+            "andhera": 0.8, "anhaar": 0.8,
+            "light kharab": 2.0, "light band": 2.0, "light naikhe": 2.0,
+            "batti gul": 2.0, "batti kharab": 2.0, "batti naikhe": 2.0,
+        },
+    },
+    "garbage": {
+        "weight": 1.0,
+        "terms": {
+            "garbage": 1.0, "trash": 1.0, "waste": 1.0, "litter": 1.0, "rubbish": 1.0,
+            "dustbin": 1.0, "dustbins": 1.0, "bin": 0.8, "bins": 0.8, "dump": 0.6,
+            "dumped": 0.6, "filth": 1.0, "dirty": 0.6, "unclean": 0.6, "stink": 0.6,
+            "smell": 0.4, "dumping": 0.6, "debris": 0.6, "clean": 0.6, "cleaning": 0.6,
+            "cleanliness": 0.8, "sanitation": 0.8, "unhygienic": 0.6, "garbage van": 1.5,
+            "kachra": 1.0, "kachre": 1.0, "kooda": 1.0, "kuda": 1.0, "kudedaan": 1.0,
+            "gandagi": 1.0, "safai": 0.8, "saaf": 0.6, "badbu": 0.6,
+            "kachra gaadi": 2.0, "kachre ka dher": 2.0, "kachra ka dher": 2.0,
+        },
+    },
+    "potholes": {
+        "weight": 1.0,
+        "terms": {
+            "pothole": 1.0, "potholes": 1.0, "road": 0.3, "roads": 0.3, "crater": 0.8,
+            "sinkhole": 0.8, "broken road": 1.5, "road broken": 1.5, "damaged road": 1.5,
+            "gaddha": 1.0, "gaddhe": 1.0, "gaddho": 1.0, "gadhha": 1.0, "gadha": 0.8,
+            "khadda": 1.0, "sadak": 0.5, "sarak": 0.5, "rasta": 0.4,
+            "road kharab": 2.0, "sadak kharab": 2.0, "sarak kharab": 2.0,
+            "rasta kharab": 2.0, "rasta tutal": 2.0, "road tutal": 2.0,
+        },
+    },
+}
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+def _build_trie(terms):
+    root = {}
+    for term in terms:
+        node = root
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    return root
+
+
+def _trie_pattern(node):
+    # Turn a character trie into a regex so the re engine walks the trie
+    # instead of trying every alternative at every position.
+    alternatives = [re.escape(ch) + _trie_pattern(node[ch]) for ch in sorted(node) if ch != ""]
+    if not alternatives:
+        return ""
+    optional = "" in node
+    if len(alternatives) == 1 and not optional:
+        return alternatives[0]
+    pattern = "(?:" + "|".join(alternatives) + ")"
+    return pattern + "?" if optional else pattern
+
+
+def compile_lexicon(terms, word_boundary=True):
+    terms = [normalize_text(term) for term in terms]
+    pattern = _trie_pattern(_build_trie(term for term in terms if term))
+    if not pattern:
+        return None
+    if word_boundary:
+        pattern = r"(?<!\w)" + pattern + r"(?!\w)"
+    return re.compile(pattern)
+
+
+class KeywordClassifier:
+    def __init__(self, lexicon=None, word_boundary=True, default_label=DEFAULT_LABEL):
+        lexicon = DEFAULT_LEXICON if lexicon is None else lexicon
+        self.labels = [label for label in LABELS if label in lexicon]
+        self.labels += [label for label in lexicon if label not in LABEL2ID]
+        self.default_label = default_label
+
+        # term -> [(label, weighted score)]; a term may belong to several categories
+        self.term_scores = {}
+        for label in self.labels:
+            category = lexicon[label]
+            category_weight = category.get("weight", 1.0)
+            for term, weight in category["terms"].items():
+                term = normalize_text(term)
+                self.term_scores.setdefault(term, []).append((label, weight * category_weight))
+
+        self.pattern = compile_lexicon(self.term_scores, word_boundary=word_boundary)
+
+    def __len__(self):
+        return len(self.term_scores)
+
+    def matches(self, text):
+        if self.pattern is None:
+            return []
+        return self.pattern.findall(normalize_text(text))
+
+    def scores(self, text):
+        scores = {}
+        term_scores = self.term_scores
+        for term in self.matches(text):
+            for label, score in term_scores[term]:
+                scores[label] = scores.get(label, 0.0) + score
+        return scores
+
+    def batch_scores(self, texts):
+        # Normalized texts never contain a newline, so joining on "\n" lets one
+        # scan cover the whole batch without a match spanning two texts.
+        scores = [{} for _ in texts]
+        if self.pattern is None or not texts:
+            return scores
+        joined = "\n".join(normalize_text(text) for text in texts)
+        term_scores = self.term_scores
+        index = 0
+        line_end = joined.find("\n")
+        for match in self.pattern.finditer(joined):
+            while line_end != -1 and match.start() > line_end:
+                index += 1
+                line_end = joined.find("\n", line_end + 1)
+            text_scores = scores[index]
+            for label, score in term_scores[match.group()]:
+                text_scores[label] = text_scores.get(label, 0.0) + score
+        return scores
+
+    def label_for(self, scores):
+        if not scores:
+            return self.default_label
+        # Ties go to the earlier label, matching the old if/elif priority
+        return max(self.labels, key=lambda name: scores.get(name, 0.0))
+
+    def _result(self, scores):
+        label = self.label_for(scores)
+        return {
+            "predicted_class": LABEL2ID.get(label, len(LABELS)),
+            "predicted_label": label,
+            "confidence": LABEL_CONFIDENCE.get(label, 0.5),
+        }
+
+    def classify(self, text):
+        return self._result(self.scores(text))
+
+    def classify_batch(self, texts):
+        return [self._result(scores) for scores in self.batch_scores(texts)]
+
+
+_default_classifier = None
+
+
+def get_classifier():
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = KeywordClassifier()
+    return _default_classifier
+
+
+def classify(text):
+    return get_classifier().classify(text)
@@ -0,0 +1,36 @@
+import csv
+import os
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "textdata.csv")
+
+
+def load_rows(path=DATA_PATH):
+    # textdata.csv was built by concatenating exports, so the header row
+    # shows up again part-way through; skip those copies.
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            (row["text"], row["label"])
+            for row in csv.DictReader(f)
+            if row.get("text") and row["label"] != "label"
+        ]
+
+
+def load_texts(path=DATA_PATH):
+    return [text for text, _ in load_rows(path)]
+
+
+def holdout_split(rows, test_size=0.2, seed=42):
+    # Same split as the training notebook (sklearn, random_state=42) so the
+    # held-out rows really are unseen by model/saved_model
+    try:
+        from sklearn.model_selection import train_test_split
+    except ImportError:
+        import math
+        import random
+
+        print("⚠️ scikit-learn not installed; held-out split differs from the notebook's")
+        rows = list(rows)
+        random.Random(seed).shuffle(rows)
+        cut = len(rows) - math.ceil(len(rows) * test_size)
+        return rows[:cut], rows[cut:]
+    return train_test_split(list(rows), test_size=test_size, random_state=seed)
@@ -0,0 +1,645 @@
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from backends import INFERENCE_BACKEND, make_backend
+from cascade import CASCADE_STAGE1, CASCADE_THRESHOLD, make_stage
+from classifier import LABEL2ID, get_classifier
+from metrics import startup
+from padding import pad_batch, plan_buckets, truncate_ids
+from registry import (MODEL_MEMORY_BUDGET_MB, MODEL_WATCH_DIR, SHADOW_QUEUE, BudgetExceeded, CheckpointWatcher,
+                      LoadedModel, Routing, checkpoint_name, has_weights, weights_bytes, weights_mtime)
+from snapshot import SNAPSHOT_FILE, STARTUP_SNAPSHOT, load_snapshot, load_tokenizer, save_snapshot
+
+# DistilBERT inference engine. The model is loaded in a background thread so
+# the server can bind its port and answer /health straight away; /ready turns
+# green once the model is warmed up (or once we've given up and fallen back to
+# the keyword classifier because the weights are missing). Nothing heavy is
+# imported until that thread runs; see snapshot.py for the fast load path.
+# More checkpoints can be loaded, promoted, split or shadowed while it serves;
+# see registry.py.
+
+MODEL_PATH = os.environ.get(
+    "MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "saved_model"),
+)
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", os.cpu_count() or 1))
+MAX_LENGTH = 512  # max_position_embeddings in model/saved_model/config.json
+# Inputs are bucketed by token length; a forward pass holds at most this many
+# texts and this many (padded) tokens
+INFERENCE_BATCH_SIZE = int(os.environ.get("INFERENCE_BATCH_SIZE", 32))
+INFERENCE_MAX_TOKENS = int(os.environ.get("INFERENCE_MAX_TOKENS", 8192))
+ONNX_PATH = os.environ.get("ONNX_PATH")  # default: model.onnx next to the weights
+# "distilbert" serves the fine-tuned classifier; "knn" serves nearest-neighbour
+# votes over data/textdata.csv (see knn.py); "cascade" answers with a cheap
+# first stage and runs DistilBERT only on low-confidence inputs (see cascade.py)
+CLASSIFIER_MODE = os.environ.get("CLASSIFIER_MODE", "distilbert")
+WARMUP_TEXTS = [
+    "The street light is not working",
+    "There is garbage everywhere",
+    "The road has many potholes",
+    "road me gadhha hai",
+]
+
+
+class InferenceEngine:
+    def __init__(self, model_path=MODEL_PATH, num_threads=TORCH_THREADS, fallback=None,
+                 backend=INFERENCE_BACKEND, onnx_path=ONNX_PATH, mode=CLASSIFIER_MODE,
+                 stage1=CASCADE_STAGE1, cascade_threshold=CASCADE_THRESHOLD, use_snapshot=STARTUP_SNAPSHOT,
+                 memory_budget_mb=MODEL_MEMORY_BUDGET_MB, watch_dir=MODEL_WATCH_DIR):
+        self.model_path = model_path
+        self.use_snapshot = use_snapshot
+        self.mode = mode
+        self.stage1_name = stage1
+        self.cascade_threshold = cascade_threshold
+        self.num_threads = num_threads
+        self.fallback = fallback or get_classifier()
+        self.backend_name = backend
+        self.onnx_path = onnx_path or os.path.join(model_path, "model.onnx")
+        self.memory_budget_mb = memory_budget_mb
+        self.watch_dir = watch_dir
+        self.watcher = None
+        self.models = {}          # name -> LoadedModel, every resident checkpoint
+        self.routing = None       # registry.Routing, replaced whole on every change
+        self.loading = {}         # name -> path of checkpoints being loaded
+        self.reload_error = None
+        self.shadow_stats = {}    # shadow version -> agreement counters
+        self.shadow_dropped = 0
+        self.knn = None
+        self.stage1 = None
+        self.cascade_inputs = 0
+        self.cascade_escalated = 0
+        self.state = "not_loaded"
+        self.error = None
+        self.load_seconds = None
+        self.tokens_real = 0
+        self.tokens_padded = 0
+        self.truncated = 0
+        self._loaded = threading.Event()
+        self._start_lock = threading.Lock()
+        self._models_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._shadow_queue = None
+        self._thread = None
+        self.preloaded = False
+
+    def start(self):
+        # Idempotent: every server calls this once its port is bound (in each
+        # worker for prefork, after preload() ran in the parent)
+        with self._start_lock:
+            if self.preloaded:
+                self._use_threads()
+            elif self._thread is None:
+                self.state = "loading"
+                self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+                self._thread.start()
+            if self.watcher is None and self.watch_dir and self.mode != "knn":
+                current = (weights_mtime(self.model_path), os.path.realpath(self.model_path))
+                self.watcher = CheckpointWatcher(self.watch_dir, self._watched_checkpoint,
+                                                 current=current if current[0] else None).start()
+        return self
+
+    def preload(self, workers, load=True):
+        # Called once in the prefork parent. The workers split the cores
+        # between them, and with load=True the model is loaded here, before
+        # the fork, so its weights are shared copy-on-write by every worker
+        # rather than loaded into each. Loading runs on one intra-op thread
+        # so no OpenMP pool exists at fork time; each worker sizes its own in
+        # start(). Checkpoints loaded later are still per worker. No snapshot
+        # is traced here: that would keep the port closed even longer.
+        if "TORCH_THREADS" not in os.environ:
+            self.num_threads = max(1, (os.cpu_count() or 1) // workers)
+        if not load:
+            return
+        if self.backend_name == "onnx" and self.mode != "knn":
+            # onnxruntime's thread pools don't survive a fork
+            print("⚠️ INFERENCE_BACKEND=onnx: every worker loads its own session")
+            return
+        # Rust tokenizers refuse to use their thread pool after a fork anyway
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        num_threads, self.num_threads = self.num_threads, 1
+        try:
+            self.load(snapshot=False)
+        finally:
+            self.num_threads = num_threads
+        self.preloaded = True
+
+    def _use_threads(self):
+        if "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(self.num_threads)
+
+    def load(self, snapshot=True):
+        start = time.perf_counter()
+        try:
+            if self.mode == "knn":
+                self.load_knn()
+                return
+            if self.mode == "cascade":
+                self.load_stage1()
+            if not has_weights(self.model_path):
+                raise FileNotFoundError(f"No model weights in {self.model_path}")
+
+            with self._reload_lock:
+                self.install(self._load_checkpoint(self.model_path), promote=True)
+            print(f"🤖 DistilBERT ready from {self.model_path} ({self.load_source})")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "fallback"
+            print(f"⚠️ Model unavailable ({e}), using keyword classifier")
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            startup.mark("model_ready" if self.state == "ready" else "fallback_ready")
+            self._loaded.set()
+        if snapshot and self.primary:
+            self.write_snapshot(self.primary)
+
+    @property
+    def _snapshot_backend(self):
+        # The snapshot is a traced fp32 graph: int8 needs the nn.Linear
+        # modules to quantize and onnx exports from the full model
+        return self.use_snapshot and self.backend_name == "pytorch"
+
+    def _load_checkpoint(self, path, name=None):
+        name = name or checkpoint_name(path)
+        # Before any weights are read, so going over budget fails cleanly
+        self._make_room(weights_bytes(path))
+        tokenizer = load_tokenizer(path)
+        startup.mark("tokenizer_ready")
+        import torch
+
+        torch.set_num_threads(self.num_threads)
+        startup.mark("torch_imported")
+        model, source = self._load_model(path)
+        startup.mark("weights_loaded")
+        return self._build(model, tokenizer, path, name, source)
+
+    def _load_model(self, path):
+        if self._snapshot_backend:
+            try:
+                model = load_snapshot(os.path.join(path, SNAPSHOT_FILE), weights_mtime(path))
+            except Exception as e:
+                print(f"⚠️ Startup snapshot unreadable ({e}), loading the full model")
+                model = None
+            if model is not None:
+                return model, "snapshot"
+        from transformers import AutoModelForSequenceClassification
+
+        return AutoModelForSequenceClassification.from_pretrained(path), "pretrained"
+
+    def write_snapshot(self, loaded):
+        # After the checkpoint is serving, so loading it isn't slowed down;
+        # the next load of it uses the snapshot
+        if loaded.source != "pretrained" or not self._snapshot_backend:
+            return
+        path = os.path.join(loaded.path, SNAPSHOT_FILE)
+        try:
+            start = time.perf_counter()
+            save_snapshot(loaded.backend.model, path)
+            print(f"📦 Startup snapshot written to {path} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"⚠️ Startup snapshot not written ({e})")
+
+    def load_knn(self):
+        from knn import KnnIndex, make_embedder
+
+        self.knn = KnnIndex(make_embedder(self.model_path, self.num_threads)).load()
+        self.state = "ready"
+        print(f"🧭 kNN classifier ready ({len(self.knn)} examples, {self.knn.embedder.name})")
+
+    def load_stage1(self):
+        # Answers on its own until (or unless) DistilBERT is ready; trouble
+        # here only costs the cascade, never the model
+        try:
+            stage = make_stage(self.stage1_name)
+        except ImportError as e:
+            print(f"⚠️ Cascade stage '{self.stage1_name}' unavailable ({e}), using keyword")
+            stage = make_stage("keyword")
+        try:
+            from dataset import load_rows
+
+            self.stage1 = stage.fit(load_rows())
+            print(f"🪜 Cascade stage 1 ({stage.name}) ready, threshold {self.cascade_threshold}")
+        except (ImportError, OSError) as e:
+            print(f"⚠️ Cascade stage 1 not fitted ({e}); serving without the cascade")
+
+    def _build(self, model, tokenizer, path, name, source=None):
+        model.eval()
+        # Only the configured checkpoint uses ONNX_PATH; others export next to their weights
+        onnx_path = self.onnx_path if path == self.model_path else os.path.join(path, "model.onnx")
+        mtime = weights_mtime(path)
+        try:
+            backend = make_backend(self.backend_name, model, self.num_threads, onnx_path, mtime)
+        except Exception as e:
+            # Missing onnxruntime, a failed export or an unwritable .onnx:
+            # fp32 PyTorch still serves
+            print(f"⚠️ Backend '{self.backend_name}' unavailable ({e}), using pytorch")
+            backend = make_backend("pytorch", model, self.num_threads)
+        # Versioned by the weights' mtime, so a checkpoint has the same version
+        # in every worker and across restarts
+        version = f"{name}-{int(mtime or time.time())}"
+        loaded = LoadedModel(name, path, backend, tokenizer, dict(model.config.id2label), version,
+                             weights_bytes(path), source)
+        self._forward(WARMUP_TEXTS, loaded)
+        return loaded
+
+    def set_model(self, model, tokenizer):
+        self.install(self._build(model, tokenizer, self.model_path, checkpoint_name(self.model_path)),
+                     promote=True)
+
+    def install(self, loaded, promote=False):
+        # Makes a built checkpoint resident. It becomes the primary when
+        # promoted or when nothing is serving yet, and replaces a checkpoint
+        # of the same name wherever the routing used that one.
+        with self._models_lock:
+            replaced = self.models.get(loaded.name)
+            self.models[loaded.name] = loaded
+            routing = self.routing
+            if routing is None:
+                self.routing = Routing(loaded)
+            else:
+                def swap(model):
+                    return loaded if model is replaced else model
+
+                self.routing = Routing(
+                    loaded if promote else swap(routing.primary),
+                    [(swap(model), fraction) for model, fraction in routing.split],
+                    [swap(model) for model in routing.shadow],
+                    routing.shadow_sample,
+                )
+        self.state = "ready"
+        self._loaded.set()
+        self._drain_dropped(routing, replaced)
+        return loaded
+
+    def route(self, primary=None, split=None, shadow=None, shadow_sample=None):
+        # Checkpoint names; None keeps that part of the current routing.
+        # split maps names to the fraction of texts they take from the primary.
+        with self._models_lock:
+            routing = self.routing
+            if routing is None:
+                raise ValueError("No checkpoint is serving yet")
+
+            def resident(name):
+                if name not in self.models:
+                    raise ValueError(f"Unknown checkpoint '{name}', resident: {sorted(self.models)}")
+                return self.models[name]
+
+            self.routing = Routing(
+                routing.primary if primary is None else resident(primary),
+                routing.split if split is None else [(resident(name), f) for name, f in split.items()],
+                routing.shadow if shadow is None else [resident(name) for name in shadow],
+                routing.shadow_sample if shadow_sample is None else float(shadow_sample),
+            )
+        self._drain_dropped(routing)
+        return self.routing.status()
+
+    def promote(self, name):
+        return self.route(primary=name)
+
+    def _drain_dropped(self, previous, replaced=None):
+        # The swap is done; wait for batches still running on checkpoints the
+        # new routing no longer sends traffic to
+        dropped = set(previous.members - self.routing.members) if previous else set()
+        if replaced is not None and replaced is not self.models.get(replaced.name):
+            dropped.add(replaced)
+        for model in dropped:
+            remaining = model.drain()
+            if remaining:
+                print(f"⚠️ Checkpoint {model.name} still has {remaining} batch(es) running")
+
+    def unload(self, name):
+        with self._models_lock:
+            model = self.models.get(name)
+            if model is None:
+                raise ValueError(f"Unknown checkpoint '{name}', resident: {sorted(self.models)}")
+            if model in self.routing.members:
+                raise ValueError(f"Checkpoint '{name}' still takes traffic; route it out first")
+            del self.models[name]
+        # Memory is released once the last batch holding it finishes
+        return model.drain()
+
+    def _make_room(self, nbytes):
+        # Drops checkpoints that take no traffic, least recently used first,
+        # until nbytes more fit in the budget
+        budget = self.memory_budget_mb * 2 ** 20
+        if not budget:
+            return
+        evicted = []
+        with self._models_lock:
+            routing = self.routing
+            resident = sum(model.nbytes for model in self.models.values())
+            idle = [model for model in self.models.values() if not routing or model not in routing.members]
+            for model in sorted(idle, key=lambda model: model.last_used):
+                if resident + nbytes <= budget:
+                    break
+                resident -= model.nbytes
+                evicted.append(model)
+            if resident + nbytes > budget:
+                raise BudgetExceeded(f"{nbytes / 2 ** 20:.0f} MB more does not fit in MODEL_MEMORY_BUDGET_MB="
+                                     f"{self.memory_budget_mb:g} with {resident / 2 ** 20:.0f} MB taking traffic")
+            for model in evicted:
+                del self.models[model.name]
+        for model in evicted:
+            print(f"♻️ Unloaded idle checkpoint {model.name} to stay within the memory budget")
+            model.drain()
+
+    def load_checkpoint(self, path, name=None, promote=False):
+        # Blocks until loaded and warmed up; whatever is serving keeps serving
+        if self.mode == "knn":
+            raise ValueError("CLASSIFIER_MODE=knn serves no checkpoints")
+        if not has_weights(path):
+            raise FileNotFoundError(f"No model weights in {path}")
+        name = name or checkpoint_name(path)
+        with self._reload_lock:
+            self.loading[name] = path
+            try:
+                start = time.perf_counter()
+                loaded = self.install(self._load_checkpoint(path, name), promote)
+            finally:
+                self.loading.pop(name, None)
+        role = "primary" if loaded is self.primary else "standby"
+        print(f"🔁 Checkpoint {loaded.version} loaded as {role} in {time.perf_counter() - start:.1f}s "
+              f"({loaded.source})")
+        self.write_snapshot(loaded)
+        return loaded
+
+    def load_checkpoint_async(self, path, name=None, promote=False):
+        if self.mode == "knn":
+            raise ValueError("CLASSIFIER_MODE=knn serves no checkpoints")
+        if not has_weights(path):
+            raise FileNotFoundError(f"No model weights in {path}")
+        name = name or checkpoint_name(path)
+        self.loading[name] = path
+
+        def run():
+            try:
+                self.load_checkpoint(path, name, promote)
+                self.reload_error = None
+            except Exception as e:
+                self.reload_error = f"{name}: {e}"
+                print(f"⚠️ Checkpoint {name} not loaded ({e})")
+
+        threading.Thread(target=run, name=f"model-loader-{name}", daemon=True).start()
+        return name
+
+    def _watched_checkpoint(self, path):
+        self.wait()
+        try:
+            self.load_checkpoint(path, promote=True)
+            self.reload_error = None
+        except Exception as e:
+            self.reload_error = f"{path}: {e}"
+            print(f"⚠️ Watched checkpoint {path} not loaded ({e})")
+
+    def wait(self, timeout=None):
+        return self._loaded.wait(timeout)
+
+    @property
+    def is_ready(self):
+        return self._loaded.is_set()
+
+    @property
+    def primary(self):
+        routing = self.routing
+        return routing.primary if routing else None
+
+    @property
+    def backend(self):
+        return self.primary.backend if self.primary else None
+
+    @property
+    def model(self):
+        # The ONNX backend doesn't keep the torch module once exported
+        return getattr(self.backend, "model", None)
+
+    @property
+    def tokenizer(self):
+        return self.primary.tokenizer if self.primary else None
+
+    @property
+    def id2label(self):
+        return self.primary.id2label if self.primary else None
+
+    @property
+    def load_source(self):
+        return self.primary.source if self.primary else None
+
+    @property
+    def model_version(self):
+        routing = self.routing
+        return routing.version if routing else None
+
+    @property
+    def model_type(self):
+        if self.stage1:
+            return "cascade"
+        if self.state != "ready":
+            return "rule_based"
+        return "knn" if self.knn else "distilbert"
+
+    @property
+    def version(self):
+        # Cache key component; changes whenever a different model is serving
+        # or the routing changes (for kNN, whenever rows are added to the index)
+        if self.stage1:
+            model = self.model_version if self.state == "ready" else "rule_based"
+            return f"cascade-{self.stage1.name}-{self.cascade_threshold}-{model}"
+        if self.state != "ready":
+            return "rule_based"
+        return self.knn.version if self.knn else self.model_version
+
+    def status(self):
+        return {
+            "status": self.state,
+            "ready": self.is_ready,
+            "mode": self.mode,
+            "model_type": self.model_type,
+            "model_version": self.version,
+            "backend": self.backend.name if self.backend else None,
+            "model_path": self.model_path,
+            "load_seconds": self.load_seconds,
+            "load_source": self.load_source,
+            "preloaded": self.preloaded,
+            "threads": self.num_threads,
+            "startup": startup.phases,
+            "error": self.error,
+            "tokens_real": self.tokens_real,
+            "tokens_padded": self.tokens_padded,
+            "truncated_inputs": self.truncated,
+            "cascade": self.cascade_status() if self.stage1 else None,
+            "checkpoints": self.models_status() if self.models else None,
+        }
+
+    def cascade_status(self):
+        return {
+            "stage1": self.stage1.name,
+            "threshold": self.cascade_threshold,
+            "inputs": self.cascade_inputs,
+            "escalated": self.cascade_escalated,
+            "escalated_fraction": self.cascade_escalated / self.cascade_inputs if self.cascade_inputs else 0.0,
+        }
+
+    def models_status(self):
+        routing = self.routing
+        models = list(self.models.values())
+        return {
+            "resident": [model.status() for model in models],
+            "resident_mb": round(sum(model.nbytes for model in models) / 2 ** 20, 1),
+            "budget_mb": self.memory_budget_mb,
+            "routing": routing.status() if routing else None,
+            "loading": dict(self.loading),
+            "last_error": self.reload_error,
+            "shadow": {version: dict(stats) for version, stats in self.shadow_stats.items()},
+            "shadow_dropped": self.shadow_dropped,
+            "watch_dir": self.watch_dir,
+        }
+
+    def _encode(self, texts, tokenizer):
+        # Tokenize without padding; anything past max_position_embeddings is
+        # cut here rather than left to the model to fail on
+        id_lists = tokenizer(list(texts), add_special_tokens=True, truncation=False)["input_ids"]
+        encoded = []
+        for ids in id_lists:
+            ids, truncated = truncate_ids(ids, MAX_LENGTH)
+            self.truncated += truncated
+            encoded.append(ids)
+        return encoded
+
+    def _forward_ids(self, id_lists, served):
+        pad_id = served.tokenizer.pad_token_id or 0
+        input_ids, attention_mask = pad_batch(id_lists, pad_id, max_length=MAX_LENGTH)
+        self.tokens_real += sum(len(ids) for ids in id_lists)
+        self.tokens_padded += len(input_ids) * len(input_ids[0])
+        return served.backend.predict(input_ids, attention_mask)
+
+    def _forward(self, texts, served):
+        id_lists = self._encode(texts, served.tokenizer)
+        predicted = [0] * len(id_lists)
+        confidence = [0.0] * len(id_lists)
+        lengths = [len(ids) for ids in id_lists]
+        for bucket in plan_buckets(lengths, INFERENCE_BATCH_SIZE, INFERENCE_MAX_TOKENS):
+            bucket_predicted, bucket_confidence = self._forward_ids([id_lists[i] for i in bucket], served)
+            for index, class_id, score in zip(bucket, bucket_predicted, bucket_confidence):
+                predicted[index] = class_id
+                confidence[index] = score
+        return predicted, confidence
+
+    def predict_batch(self, texts):
+        if self.stage1 and texts:
+            return self._predict_cascade(texts)
+        if self.state != "ready" or not texts:
+            results = self.fallback.classify_batch(texts)
+            for result in results:
+                result["model_type"] = "rule_based"
+                result["model_version"] = "rule_based"
+            return results
+        if self.knn:
+            results = self.knn.classify_batch(texts)
+            version = self.knn.version
+            for result in results:
+                result["model_version"] = version
+            return results
+        return self._model_results(texts)
+
+    def _model_results(self, texts):
+        # One read of the routing: a swap mid-call applies from the next call
+        routing = self.routing
+        if not routing.split:
+            results = self._checkpoint_results(routing.primary, texts)
+        else:
+            groups = {}
+            for i, text in enumerate(texts):
+                groups.setdefault(routing.route(text), []).append(i)
+            results = [None] * len(texts)
+            for served, indices in groups.items():
+                for i, result in zip(indices, self._checkpoint_results(served, [texts[i] for i in indices])):
+                    results[i] = result
+        if routing.shadow:
+            self._queue_shadow(routing, texts, results)
+        return results
+
+    def _checkpoint_results(self, served, texts):
+        with served.use(len(texts)):
+            predicted, confidence = self._forward(texts, served)
+        id2label = served.id2label
+        version = served.version
+        results = []
+        for class_id, score in zip(predicted, confidence):
+            label = id2label[class_id]
+            results.append({
+                "predicted_class": LABEL2ID.get(label, class_id),
+                "predicted_label": label,
+                "confidence": round(score, 4),
+                "model_type": "distilbert",
+                "model_version": version,
+            })
+        return results
+
+    def _queue_shadow(self, routing, texts, results):
+        # Shadows run on their own thread; when it falls behind, copies are
+        # dropped instead of slowing down the answers
+        if routing.shadow_sample < 1 and random.random() >= routing.shadow_sample:
+            return
+        if self._shadow_queue is None:
+            with self._start_lock:
+                if self._shadow_queue is None:
+                    self._shadow_queue = queue.Queue(SHADOW_QUEUE)
+                    threading.Thread(target=self._run_shadow, name="shadow", daemon=True).start()
+        try:
+            self._shadow_queue.put_nowait((routing.shadow, list(texts), [r["predicted_label"] for r in results]))
+        except queue.Full:
+            self.shadow_dropped += 1
+
+    def _run_shadow(self):
+        while True:
+            shadows, texts, labels = self._shadow_queue.get()
+            for shadow in shadows:
+                stats = self.shadow_stats.setdefault(
+                    shadow.version, {"name": shadow.name, "texts": 0, "agreed": 0, "errors": 0, "agreement": None}
+                )
+                try:
+                    with shadow.use(len(texts)):
+                        predicted, _ = self._forward(texts, shadow)
+                except Exception as e:
+                    stats["errors"] += 1
+                    print(f"⚠️ Shadow checkpoint {shadow.name} failed ({e})")
+                    continue
+                stats["texts"] += len(texts)
+                stats["agreed"] += sum(shadow.id2label[c] == label for c, label in zip(predicted, labels))
+                stats["agreement"] = round(stats["agreed"] / stats["texts"], 4)
+
+    def _predict_cascade(self, texts):
+        results = self.stage1.classify_batch(texts)
+        version = self.stage1.name
+        for result in results:
+            result["model_version"] = version
+            result["stage"] = 1
+        escalate = []
+        if self.state == "ready":
+            threshold = self.cascade_threshold
+            escalate = [i for i, result in enumerate(results) if result["confidence"] < threshold]
+        if escalate:
+            for i, result in zip(escalate, self._model_results([texts[i] for i in escalate])):
+                result["stage"] = 2
+                results[i] = result
+        self.cascade_inputs += len(texts)
+        self.cascade_escalated += len(escalate)
+        return results
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = InferenceEngine()
+        return _engine
@@ -0,0 +1,240 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bulk_classify import Writer, batched, normalize, read_records
+from inference import get_engine
+
+# Background classification jobs for uploads too large for /predict/batch.
+# Uploads are written to JOBS_DIR as they arrive, a small worker pool streams
+# each one through the bulk_classify pipeline, and job state lives in SQLite:
+# after every batch the input/output offsets are committed, so a restart
+# resumes unfinished jobs where they stopped instead of starting over.
+#
+# Job workers run the same model as /predict, so they yield to it: a worker
+# waits (up to JOB_YIELD_MAX_SECONDS) before each batch while busy() reports
+# interactive requests queued. Assumes one server process owns JOBS_DIR.
+
+JOBS_DIR = os.environ.get("JOBS_DIR", "jobs")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", 32))
+JOB_MAX_UPLOAD_BYTES = int(os.environ.get("JOB_MAX_UPLOAD_MB", 1024)) * 1024 * 1024
+JOB_YIELD_MAX_SECONDS = float(os.environ.get("JOB_YIELD_MAX_SECONDS", 1.0))
+
+UPLOAD_CHUNK = 64 * 1024
+OUTPUT_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    format TEXT NOT NULL,
+    output_format TEXT NOT NULL,
+    text_field TEXT NOT NULL,
+    input_bytes INTEGER NOT NULL DEFAULT 0,
+    input_offset INTEGER NOT NULL DEFAULT 0,
+    output_offset INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class JobStore:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+
+    def insert(self, job):
+        with self._lock:
+            columns = ", ".join(job)
+            self._db.execute(
+                f"INSERT INTO jobs ({columns}) VALUES ({', '.join('?' * len(job))})", list(job.values())
+            )
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def with_status(self, *statuses):
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(statuses))}) ORDER BY created_at",
+                statuses,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete(self, job_id):
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobManager:
+    def __init__(self, directory=JOBS_DIR, workers=JOB_WORKERS, batch_size=JOB_BATCH_SIZE,
+                 engine=None, busy=None, max_upload_bytes=JOB_MAX_UPLOAD_BYTES):
+        self.directory = directory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.engine = engine
+        self.busy = busy
+        self.max_upload_bytes = max_upload_bytes
+        self.store = None
+        self._executor = None
+        self._stopping = threading.Event()
+
+    def input_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.input")
+
+    def output_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.output")
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.store = JobStore(os.path.join(self.directory, "jobs.sqlite3"))
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job-worker")
+        # Uploads cut off by the restart can't be resumed; everything else can
+        for job in self.store.with_status("uploading"):
+            self.discard(job["id"])
+        for job in self.store.with_status("queued", "running"):
+            self._executor.submit(self._run, job["id"])
+        return self
+
+    def stop(self):
+        # Running jobs stop after their current batch and stay "running" in
+        # the store, so the next start() picks them up again
+        self._stopping.set()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        if self.store:
+            self.store.close()
+
+    def create(self, fmt, output_format="jsonl", text_field="text"):
+        if fmt not in OUTPUT_TYPES or output_format not in OUTPUT_TYPES:
+            raise ValueError(f"format and output_format must be one of {list(OUTPUT_TYPES)}")
+        job_id = uuid.uuid4().hex
+        self.store.insert({
+            "id": job_id, "status": "uploading", "format": fmt, "output_format": output_format,
+            "text_field": text_field, "created_at": time.time(),
+        })
+        return job_id
+
+    async def receive(self, job_id, chunks):
+        # Writes an async stream of body chunks to the job's input file, then
+        # queues the job. Raises UploadTooLarge past max_upload_bytes.
+        size = 0
+        try:
+            with open(self.input_path(job_id), "wb", buffering=UPLOAD_CHUNK) as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_upload_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {self.max_upload_bytes} bytes")
+                    f.write(chunk)
+        except BaseException:
+            self.discard(job_id)
+            raise
+        self.store.update(job_id, status="queued", input_bytes=size)
+        self._executor.submit(self._run, job_id)
+
+    def discard(self, job_id):
+        self.store.delete(job_id)
+        for path in (self.input_path(job_id), self.output_path(job_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def status(self, job_id):
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == "done":
+            progress = 1.0
+        else:
+            # Offsets are in uncompressed bytes, so gzip uploads overshoot
+            progress = min(1.0, job["input_offset"] / job["input_bytes"]) if job["input_bytes"] else 0.0
+        elapsed = (job["finished_at"] or time.time()) - job["started_at"] if job["started_at"] else 0.0
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "rows": job["rows"],
+            "progress": round(progress, 4),
+            "rows_per_sec": round(job["rows"] / elapsed, 1) if elapsed else 0.0,
+            "input_bytes": job["input_bytes"],
+            "format": job["format"],
+            "output_format": job["output_format"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    def iter_result(self, job_id, chunk_size=UPLOAD_CHUNK):
+        with open(self.output_path(job_id), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _yield_to_interactive(self):
+        if self.busy is None:
+            return
+        deadline = time.monotonic() + JOB_YIELD_MAX_SECONDS
+        while self.busy() and time.monotonic() < deadline and not self._stopping.is_set():
+            time.sleep(0.005)
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or self._stopping.is_set():
+            return
+        self.store.update(job_id, status="running", started_at=job["started_at"] or time.time())
+        engine = self.engine or get_engine()
+        # Don't label a month of complaints with the keyword fallback just
+        # because the model is still loading
+        engine.wait()
+        try:
+            with open(self.output_path(job_id), "r+" if job["output_offset"] else "w",
+                      encoding="utf-8", newline="") as out:
+                out.seek(job["output_offset"])
+                out.truncate()
+                writer = Writer(out, job["output_format"], write_header=job["output_offset"] == 0)
+                records = normalize(
+                    read_records(self.input_path(job_id), job["format"], job["text_field"], job["input_offset"]),
+                    job["text_field"],
+                )
+                rows = job["rows"]
+                for batch in batched(records, self.batch_size):
+                    if self._stopping.is_set():
+                        return
+                    self._yield_to_interactive()
+                    results = engine.predict_batch([text for _, text, _ in batch])
+                    for (record, _, _), result in zip(batch, results):
+                        writer.write(record, result)
+                    out.flush()
+                    rows += len(batch)
+                    self.store.update(job_id, input_offset=batch[-1][2], output_offset=out.tell(), rows=rows)
+            self.store.update(job_id, status="done", finished_at=time.time())
+        except Exception as e:
+            self.store.update(job_id, status="failed", error=str(e), finished_at=time.time())
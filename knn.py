@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+import argparse
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process per index directory
+    fcntl = None
+
+from bulk_classify import read_records
+from classifier import LABEL2ID, LABELS, normalize_text
+from dataset import DATA_PATH
+from padding import pad_batch, plan_buckets, truncate_ids
+
+# Nearest-neighbour classifier over the labelled corpus. Every row of
+# data/textdata.csv is embedded once into a row-normalised float32 matrix
+# saved as .npy and memory-mapped at load; a query is classified by top-k
+# cosine similarity (one matrix product) and a majority vote, and the
+# neighbours it voted with are returned as evidence.
+#
+# Embeddings are DistilBERT's mean-pooled last hidden state when the weights
+# and torch are available, otherwise hashed character n-gram TF-IDF. The index
+# remembers how far into the CSV it has read, so rows appended later are
+# embedded and added without redoing the rest.
+#
+#   python knn.py            # build or update the index
+#   python knn.py --rebuild  # start from scratch
+
+KNN_INDEX_DIR = os.environ.get(
+    "KNN_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "knn_index"),
+)
+KNN_K = int(os.environ.get("KNN_K", 5))
+# How often classify_batch checks the CSV for appended rows (0 = only at load)
+KNN_REFRESH_SECONDS = float(os.environ.get("KNN_REFRESH_SECONDS", 60))
+# Every query reads the whole N x HASH_DIM matrix; wider vectors cost latency
+# without helping held-out accuracy (benchmarks/bench_knn.py)
+HASH_DIM = 2 ** 10
+NGRAM_RANGE = (3, 5)
+# Hashed IDF weights are fitted at build time; refit once the corpus has
+# grown by more than this fraction since
+REFIT_GROWTH = 0.25
+
+
+def _l2_normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class HashedNgramEmbedder:
+    name = "hashed-ngram"
+    refits = True
+
+    def __init__(self, dim=HASH_DIM, ngram_range=NGRAM_RANGE):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    @property
+    def config(self):
+        return {"name": self.name, "dim": self.dim, "ngram_range": list(self.ngram_range)}
+
+    def _buckets(self, text):
+        # crc32 rather than hash(): str hashes change between processes
+        text = f" {normalize_text(text)} "
+        low, high = self.ngram_range
+        return Counter(
+            zlib.crc32(text[i:i + n].encode("utf-8")) % self.dim
+            for n in range(low, high + 1)
+            for i in range(len(text) - n + 1)
+        )
+
+    def fit(self, texts):
+        df = np.zeros(self.dim, dtype=np.float64)
+        for text in texts:
+            df[list(self._buckets(text))] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+    def state(self):
+        return {"idf": self.idf.tolist()}
+
+    def load_state(self, state):
+        self.idf = np.asarray(state["idf"], dtype=np.float32)
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = self._buckets(text)
+            if counts:
+                columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                matrix[row, columns] = (1 + np.log(tf)) * self.idf[columns]
+        return _l2_normalize(matrix)
+
+
+class DistilBertEmbedder:
+    name = "distilbert-mean"
+    refits = False
+
+    def __init__(self, tokenizer, model, weights_mtime=0):
+        from inference import INFERENCE_BATCH_SIZE, INFERENCE_MAX_TOKENS, MAX_LENGTH
+
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.weights_mtime = weights_mtime
+        self.max_length = MAX_LENGTH
+        self.batch_size = INFERENCE_BATCH_SIZE
+        self.max_tokens = INFERENCE_MAX_TOKENS
+
+    @property
+    def config(self):
+        # New weights mean new embeddings; the index is rebuilt
+        return {"name": self.name, "dim": self.model.config.dim, "weights_mtime": self.weights_mtime}
+
+    def fit(self, texts):
+        pass
+
+    def state(self):
+        return {}
+
+    def load_state(self, state):
+        pass
+
+    def embed(self, texts):
+        import torch
+
+        id_lists = [truncate_ids(ids, self.max_length)[0]
+                    for ids in self.tokenizer(list(texts), truncation=False)["input_ids"]]
+        matrix = np.zeros((len(id_lists), self.model.config.dim), dtype=np.float32)
+        pad_id = self.tokenizer.pad_token_id or 0
+        for bucket in plan_buckets([len(ids) for ids in id_lists], self.batch_size, self.max_tokens):
+            input_ids, attention_mask = pad_batch([id_lists[i] for i in bucket], pad_id, max_length=self.max_length)
+            mask = torch.tensor(attention_mask)
+            with torch.inference_mode():
+                hidden = self.model(input_ids=torch.tensor(input_ids), attention_mask=mask).last_hidden_state
+                mask = mask.unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            matrix[bucket] = pooled.numpy()
+        return _l2_normalize(matrix)
+
+
+class KnnIndex:
+    # Everything a query reads - meta, (embeddings, label ids, texts) and the
+    # embedder they were made with - is published as one tuple, so a query
+    # served while rows are added or the index is rebuilt sees either the old
+    # index or the new one, never a mix. Builds and writes also hold a lock
+    # file, so prefork workers sharing the directory take turns, and a worker
+    # that finds the index already brought up to date by another just opens it.
+    def __init__(self, embedder, directory=None, data_path=DATA_PATH, k=KNN_K,
+                 refresh_seconds=KNN_REFRESH_SECONDS):
+        self.directory = directory or KNN_INDEX_DIR
+        self.data_path = data_path
+        self.k = k
+        self.refresh_seconds = refresh_seconds
+        self._state = (None, None, embedder)
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._csv_stat = None
+        self._refresher = None
+
+    @property
+    def meta(self):
+        return self._state[0]
+
+    @property
+    def embedder(self):
+        return self._state[2]
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @property
+    def version(self):
+        meta, _, embedder = self._state
+        return f"knn-{embedder.name}-{meta['rows']}"
+
+    def __len__(self):
+        meta = self.meta
+        return meta["rows"] if meta else 0
+
+    def _prefix_hash(self, length):
+        digest = hashlib.blake2b(digest_size=16)
+        with open(self.data_path, "rb") as f:
+            while length > 0:
+                chunk = f.read(min(length, 1 << 20))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                length -= len(chunk)
+        return digest.hexdigest()
+
+    def _read_rows(self, offset):
+        # Returns ([(text, label)], offset after the last complete row)
+        rows = []
+        for record, text, end in read_records(self.data_path, "csv", "text", offset):
+            label = record.get("label")
+            if text and label and label != "label":
+                rows.append((text, label))
+            offset = end
+        return rows, offset
+
+    def _stat(self):
+        stat = os.stat(self.data_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(".lock"), "a") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def load(self, rebuild=False):
+        with self._lock, self._file_lock():
+            csv_stat = self._stat()
+            meta = None
+            if not rebuild and os.path.exists(self._path("meta.json")):
+                with open(self._path("meta.json")) as f:
+                    meta = json.load(f)
+            # Reusable only if built by the same embedder from a CSV that has
+            # only been appended to since
+            if meta is None or meta["embedder"] != self.embedder.config or not self._only_appended(meta):
+                self._build()
+            else:
+                if meta != self.meta:
+                    # Written by another process (or not opened yet)
+                    embedder = copy.copy(self.embedder)
+                    embedder.load_state(meta["embedder_state"])
+                    self._open(meta, embedder)
+                self._append_new_rows()
+            self._csv_stat = csv_stat
+            self._checked_at = time.monotonic()
+        return self
+
+    def _only_appended(self, meta):
+        return (os.path.getsize(self.data_path) >= meta["csv_offset"]
+                and self._prefix_hash(meta["csv_offset"]) == meta["csv_prefix_hash"])
+
+    def _build(self):
+        start = time.perf_counter()
+        rows, offset = self._read_rows(0)
+        texts = [text for text, _ in rows]
+        # Fitted on a copy: queries keep embedding with the old weights until
+        # the new index is published
+        embedder = copy.copy(self.embedder)
+        embedder.fit(texts)
+        labels = sorted({label for _, label in rows}, key=lambda label: LABEL2ID.get(label, len(LABELS)))
+        label_ids = np.array([labels.index(label) for _, label in rows], dtype=np.int16)
+        meta = {"labels": labels, "fitted_rows": len(rows)}
+        self._write(meta, embedder, embedder.embed(texts), label_ids, texts, offset)
+        print(f"🧭 kNN index built: {len(rows)} rows in {time.perf_counter() - start:.1f}s ({embedder.name})")
+
+    def _append_new_rows(self):
+        meta, (embeddings, label_ids, texts), embedder = self._state
+        rows, offset = self._read_rows(meta["csv_offset"])
+        if not rows:
+            return
+        total = meta["rows"] + len(rows)
+        if embedder.refits and total > meta["fitted_rows"] * (1 + REFIT_GROWTH):
+            self._build()
+            return
+        meta = dict(meta, labels=list(meta["labels"]))
+        labels = meta["labels"]
+        for _, label in rows:
+            if label not in labels:
+                labels.append(label)
+        new_texts = [text for text, _ in rows]
+        self._write(
+            meta,
+            embedder,
+            np.concatenate([embeddings, embedder.embed(new_texts)]),
+            np.concatenate([label_ids, np.array([labels.index(label) for _, label in rows], dtype=np.int16)]),
+            texts + new_texts,
+            offset,
+        )
+        print(f"🧭 kNN index: appended {len(rows)} rows ({total} total)")
+
+    def _write(self, meta, embedder, embeddings, label_ids, texts, csv_offset):
+        for name, array in (("embeddings.npy", embeddings), ("labels.npy", label_ids)):
+            with open(self._path(name + ".tmp"), "wb") as f:
+                np.save(f, array)
+            os.replace(self._path(name + ".tmp"), self._path(name))
+        with open(self._path("texts.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+        os.replace(self._path("texts.json.tmp"), self._path("texts.json"))
+        # meta.json last: it's what marks the other files as complete
+        meta.update(
+            embedder=embedder.config,
+            embedder_state=embedder.state(),
+            csv_offset=csv_offset,
+            csv_prefix_hash=self._prefix_hash(csv_offset),
+            rows=len(texts),
+        )
+        with open(self._path("meta.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(self._path("meta.json.tmp"), self._path("meta.json"))
+        self._open(meta, embedder)
+
+    def _open(self, meta, embedder):
+        embeddings = np.load(self._path("embeddings.npy"), mmap_mode="r")
+        label_ids = np.load(self._path("labels.npy"))
+        with open(self._path("texts.json"), encoding="utf-8") as f:
+            texts = json.load(f)
+        self._state = (meta, (embeddings, label_ids, texts), embedder)
+
+    def refresh(self):
+        # Cheap unless the CSV's size or mtime has changed since the last
+        # check. Rows appended since are added; a CSV rewritten, truncated or
+        # changed in place is rebuilt
+        if self._stat() == self._csv_stat:
+            return False
+        state = self._state
+        self.load()
+        return self._state is not state
+
+    def _refresh_in_background(self):
+        # Embedding new rows (or a rebuild) never holds up a request: queries
+        # keep using the current index until the new one is published
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._refresher = threading.Thread(target=self._run_refresh, name="knn-refresh", daemon=True)
+        self._refresher.start()
+
+    def _run_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"⚠️ kNN index refresh failed: {e}")
+
+    def search(self, texts, k=None):
+        return self._search(self._state, texts, k)
+
+    def _search(self, state, texts, k=None):
+        # Returns (indices, similarities), each (len(texts), k), best first
+        _, (embeddings, _, _), embedder = state
+        k = min(k or self.k, len(embeddings))
+        similarities = embedder.embed(texts) @ embeddings.T
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_similarities, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_similarities, order, axis=1)
+
+    def classify_batch(self, texts):
+        if self.refresh_seconds and time.monotonic() - self._checked_at > self.refresh_seconds:
+            self._checked_at = time.monotonic()
+            self._refresh_in_background()
+        if not texts:
+            return []
+        state = self._state
+        meta, (_, label_ids, corpus), _ = state
+        labels = meta["labels"]
+        indices, similarities = self._search(state, texts)
+        results = []
+        for row, row_similarities in zip(indices, similarities):
+            votes = Counter()
+            weight = Counter()
+            for index, similarity in zip(row, row_similarities):
+                votes[label_ids[index]] += 1
+                weight[label_ids[index]] += similarity
+            # Majority vote; ties go to the label with the closer neighbours
+            winner = max(votes, key=lambda label_id: (votes[label_id], weight[label_id]))
+            label = labels[winner]
+            results.append({
+                "predicted_class": LABEL2ID.get(label, len(LABELS)),
+                "predicted_label": label,
+                "confidence": round(votes[winner] / len(row), 4),
+                "model_type": "knn",
+                "neighbors": [
+                    {"text": corpus[index], "label": labels[label_ids[index]], "similarity": round(float(similarity), 4)}
+                    for index, similarity in zip(row, row_similarities)
+                ],
+            })
+        return results
+
+    def classify(self, text):
+        return self.classify_batch([text])[0]
+
+
+def make_embedder(model_path, num_threads, hashed=False):
+    from inference import has_weights, weights_mtime
+    from snapshot import load_tokenizer
+
+    if not hashed and has_weights(model_path):
+        try:
+            import torch
+            from transformers import AutoModel
+        except ImportError as e:
+            print(f"⚠️ DistilBERT embeddings unavailable ({e}), using hashed n-grams")
+        else:
+            torch.set_num_threads(num_threads)
+            # The base model only: the classification head isn't needed here
+            return DistilBertEmbedder(
+                load_tokenizer(model_path), AutoModel.from_pretrained(model_path),
+                weights_mtime(model_path),
+            )
+    return HashedNgramEmbedder()
+
+
+def main(argv=None):
+    from inference import MODEL_PATH, TORCH_THREADS
+
+    parser = argparse.ArgumentParser(description="Build or update the kNN index over the labelled corpus")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--index-dir", default=KNN_INDEX_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="ignore any existing index")
+    parser.add_argument("--hashed", action="store_true", help="use hashed n-grams even if DistilBERT is available")
+    args = parser.parse_args(argv)
+
+    embedder = make_embedder(MODEL_PATH, TORCH_THREADS, args.hashed)
+    index = KnnIndex(embedder, args.index_dir, args.data).load(rebuild=args.rebuild)
+    print(f"📊 {len(index)} rows, embedder {embedder.name}, index in {args.index_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from dataset import load_texts
+
+# Offline load test and regression check. Starts one of the servers on a free
+# local port, replays data/textdata.csv against it and reports throughput,
+# latency percentiles, error rate and the server's RSS/CPU.
+#
+#   python loadtest.py --server main --concurrency 16 --duration 10
+#   python loadtest.py --server fastapi --rate 500 --output run.json
+#   python loadtest.py --server main --save-baseline baseline.json
+#   python loadtest.py --server main --baseline baseline.json   # exit 1 on regression
+#
+# --concurrency runs a closed loop: that many keep-alive clients, each sending
+# its next request as soon as the last one is answered. --rate runs an open
+# loop: Poisson arrivals at that rate whether or not the server keeps up, with
+# latency measured from the scheduled arrival so queueing delay is counted.
+# Server RSS/PSS/CPU are read from /proc (Linux), summed over worker
+# processes. PSS splits every shared page between the processes that map it,
+# so unlike RSS its sum doesn't count weights shared by prefork workers once
+# per worker. --wait-ready holds the run until /ready answers 200 (the model
+# is loaded) on several fresh connections in a row, so every worker is.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SERVERS = {
+    "main": [sys.executable, "main.py"],
+    "app": [sys.executable, "app.py"],
+    "fastapi": [sys.executable, "-m", "uvicorn", "main_fastapi:app", "--host", "127.0.0.1",
+                "--port", "{port}", "--no-access-log"],
+}
+# Metric -> direction that counts as worse
+CHECKS = {
+    "throughput_rps": "lower",
+    "latency_ms.p50": "higher",
+    "latency_ms.p95": "higher",
+    "latency_ms.p99": "higher",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class ProcessSampler:
+    # Peak RSS/PSS and CPU seconds of a process and its children, from /proc
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_pss = 0
+        self.processes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK")
+
+    def _pids(self):
+        children = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        pids, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(children.get(pid, []))
+        return pids
+
+    def sample(self):
+        # Returns (rss bytes, cpu seconds) summed over the process tree
+        rss = pss = cpu = 0
+        pids = self._pids()
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, IndexError, ValueError):
+                continue
+            cpu += (int(fields[11]) + int(fields[12])) / self._ticks
+            pss += self._pss(pid)
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_pss = max(self.peak_pss, pss)
+        self.processes = len(pids)
+        return rss, cpu
+
+    @staticmethod
+    def _pss(pid):
+        # Bytes; 0 where smaps_rollup is missing (Linux < 4.14) or unreadable
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class Connection:
+    # Minimal keep-alive HTTP/1.1 client; enough for Content-Length responses
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, payload):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(payload)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = 0
+        close = False
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection" and value.strip().lower() == b"close":
+                close = True
+        await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def build_requests(texts, path, batch_size, count, seed=0):
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        if batch_size:
+            body = json.dumps(rng.sample(texts, batch_size)).encode()
+        else:
+            body = json.dumps({"text": rng.choice(texts)}).encode()
+        payloads.append(
+            f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+    return payloads
+
+
+async def send(conn, payload, timeout):
+    # Returns the status code, or 0 for a failed or timed-out request
+    try:
+        return await asyncio.wait_for(conn.request(payload), timeout)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+        conn.close()
+        return 0
+
+
+async def closed_loop(port, payloads, concurrency, duration, timeout):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        nonlocal errors
+        conn = Connection("127.0.0.1", port)
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await send(conn, payloads[i % len(payloads)], timeout)
+            latencies.append(time.perf_counter() - start)
+            errors += status == 0 or status >= 500
+            i += concurrency
+        conn.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+async def open_loop(port, payloads, rate, duration, max_connections, timeout, seed=0):
+    latencies, errors = [], 0
+    # Most recently used connection first, so no more connections are opened
+    # than the arrival rate needs (a threaded server holds a worker per
+    # keep-alive connection)
+    idle = []
+    slots = asyncio.Semaphore(max_connections)
+
+    async def arrival(scheduled, payload):
+        nonlocal errors
+        async with slots:
+            conn = idle.pop() if idle else Connection("127.0.0.1", port)
+            status = await send(conn, payload, timeout)
+            idle.append(conn)
+        latencies.append(time.perf_counter() - scheduled)
+        errors += status == 0 or status >= 500
+
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    i = 0
+    while scheduled < start + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(arrival(scheduled, payloads[i % len(payloads)])))
+        i += 1
+        scheduled += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    for conn in idle:
+        conn.close()
+    return latencies, errors
+
+
+def wait_for_server(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(b"GET /health HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n")
+                if sock.recv(64).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server did not answer /health within {timeout}s")
+
+
+def wait_for_ready(port, process, timeout=300, streak=20):
+    # Each check is a new connection, so with several workers it lands on any
+    # one of them; a streak of 200s means they are all most likely done
+    deadline = time.monotonic() + timeout
+    ready = 0
+    while ready < streak:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"server not ready within {timeout}s")
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(b"GET /ready HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n")
+                ready = ready + 1 if sock.recv(64).startswith(b"HTTP/1.1 200") else 0
+        except OSError:
+            ready = 0
+        if ready < streak:
+            time.sleep(0.01 if ready else 0.2)
+
+
+def run(args):
+    port = free_port()
+    command = [part.format(port=port) for part in SERVERS[args.server]]
+    env = dict(os.environ, PORT=str(port), ACCESS_LOG_SAMPLE="0")
+    env.update(item.split("=", 1) for item in args.env)
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                               stderr=None if args.verbose else subprocess.DEVNULL)
+    try:
+        wait_for_server(port, process)
+        if args.wait_ready:
+            wait_for_ready(port, process)
+        texts = load_texts()
+        payloads = build_requests(texts, args.path, args.batch_size, 1000)
+        if args.warmup:
+            asyncio.run(closed_loop(port, payloads, args.concurrency, args.warmup, args.timeout))
+
+        sampler = ProcessSampler(process.pid).start()
+        _, cpu_before = sampler.sample()
+        start = time.perf_counter()
+        if args.rate:
+            latencies, errors = asyncio.run(
+                open_loop(port, payloads, args.rate, args.duration, args.max_connections, args.timeout)
+            )
+        else:
+            latencies, errors = asyncio.run(
+                closed_loop(port, payloads, args.concurrency, args.duration, args.timeout)
+            )
+        elapsed = time.perf_counter() - start
+        _, cpu_after = sampler.sample()
+        sampler.stop()
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    latencies_ms = [latency * 1000 for latency in latencies]
+    texts_per_request = args.batch_size or 1
+    return {
+        "server": args.server,
+        "config": {
+            "path": args.path,
+            "mode": "open" if args.rate else "closed",
+            "concurrency": None if args.rate else args.concurrency,
+            "rate": args.rate,
+            "batch_size": args.batch_size,
+            "duration": args.duration,
+            "env": dict(item.split("=", 1) for item in args.env),
+        },
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "throughput_rps": len(latencies) / elapsed,
+        "texts_per_sec": len(latencies) * texts_per_request / elapsed,
+        "latency_ms": {
+            "mean": sum(latencies_ms) / len(latencies_ms) if latencies_ms else 0.0,
+            "p50": percentile(latencies_ms, 0.50),
+            "p95": percentile(latencies_ms, 0.95),
+            "p99": percentile(latencies_ms, 0.99),
+            "max": max(latencies_ms, default=0.0),
+        },
+        "server_rss_mb_peak": sampler.peak_rss / 2 ** 20,
+        "server_pss_mb_peak": sampler.peak_pss / 2 ** 20,
+        "server_processes": sampler.processes,
+        "server_cpu_percent": (cpu_after - cpu_before) / elapsed * 100,
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine()},
+        "timestamp": time.time(),
+    }
+
+
+def _metric(result, name):
+    for part in name.split("."):
+        result = result[part]
+    return result
+
+
+def compare(result, baseline, threshold, max_error_rate=0.01):
+    # Returns a list of human-readable regressions (empty when within limits)
+    regressions = []
+    for name, worse in CHECKS.items():
+        old, new = _metric(baseline, name), _metric(result, name)
+        if not old:
+            continue
+        change = (new - old) / old
+        if (worse == "higher" and change > threshold) or (worse == "lower" and -change > threshold):
+            regressions.append(f"{name}: {old:.2f} -> {new:.2f} ({change:+.1%}, limit {threshold:.0%})")
+    if result["error_rate"] > max(baseline["error_rate"], max_error_rate):
+        regressions.append(f"error_rate: {baseline['error_rate']:.2%} -> {result['error_rate']:.2%}")
+    return regressions
+
+
+def report(result):
+    latency = result["latency_ms"]
+    print(f"📊 {result['server']} {result['config']['path']} ({result['config']['mode']} loop): "
+          f"{result['requests']} requests, {result['throughput_rps']:.0f} req/s, "
+          f"{result['error_rate']:.2%} errors")
+    print(f"   latency p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms, "
+          f"max {latency['max']:.2f} ms")
+    print(f"   server RSS peak {result['server_rss_mb_peak']:.0f} MB, PSS peak {result['server_pss_mb_peak']:.0f} MB "
+          f"({result['server_processes']} processes), CPU {result['server_cpu_percent']:.0f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test / regression check for the classifier servers")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="main")
+    parser.add_argument("--path", default="/predict")
+    parser.add_argument("--batch-size", type=int, default=0, help="texts per request (use with /predict/batch)")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop clients")
+    parser.add_argument("--rate", type=float, help="open-loop arrivals per second (overrides --concurrency)")
+    parser.add_argument("--max-connections", type=int, default=256, help="connection pool for --rate")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a request counts as an error")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="server environment")
+    parser.add_argument("--output", help="write the result JSON here")
+    parser.add_argument("--baseline", help="fail if worse than this result JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="write the result JSON as the new baseline")
+    parser.add_argument("--wait-ready", action="store_true", help="wait for the model to load before starting")
+    parser.add_argument("--verbose", action="store_true", help="show server stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(args)
+    report(result)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print("❌ Regressions against " + args.baseline)
+            for line in regressions:
+                print("   " + line)
+            return 1
+        print(f"✅ Within {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,95 +1,19 @@
 import os
-import json
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
-class RailwayHandler(BaseHTTPRequestHandler):
-    def log_message(self, format, *args):
-        print(f"📝 {format % args}")
-    
-    def do_GET(self):
-        parsed_path = urlparse(self.path)
-        
-        if parsed_path.path == '/':
-            response = {
-                "status": "healthy",
-                "message": "Civic Text Classifier API - Railway Deployment",
-                "version": "1.0",
-                "endpoints": ["/", "/health", "/predict", "/docs"],
-                "documentation": "https://new-civic-text-production.up.railway.app/docs",
-                "swagger_ui": "Visit /docs for interactive API testing"
-            }
-            self.send_json(response)
-            
-        elif parsed_path.path == '/health':
-            print("🏥 HEALTH CHECK CALLED!")
-            response = {"status": "healthy", "message": "OK"}
-            self.send_json(response)
-            
-        elif parsed_path.path == '/docs':
-            # Swagger-like documentation interface
-            html_docs = self.get_docs_html()
-            self.send_html(html_docs)
-            
-        elif parsed_path.path == '/predict':
-            # Show usage instructions when accessed via GET (browser)
-            response = {
-                "message": "Prediction endpoint - Use POST method",
-                "method": "POST",
-                "url": "https://new-civic-text-production.up.railway.app/predict",
-                "example": {
-                    "input": {"text": "The street light is broken"},
-                    "curl_example": 'curl -X POST "https://new-civic-text-production.up.railway.app/predict" -H "Content-Type: application/json" -d \'{"text": "The street light is broken"}\''
-                },
-                "supported_categories": ["streetlight", "garbage", "potholes"],
-                "docs_url": "https://new-civic-text-production.up.railway.app/docs"
-            }
-            self.send_json(response)
-            
-        else:
-            self.send_json({"error": "Not found"}, 404)
-    
-    def do_POST(self):
-        if self.path == '/predict':
-            try:
-                content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length).decode('utf-8')
-                data = json.loads(post_data)
-                text = data.get('text', '').lower()
-                
-                # Classification logic
-                if any(word in text for word in ['light', 'lamp', 'bulb', 'streetlight']):
-                    result = {"predicted_class": 0, "predicted_label": "streetlight", "confidence": 0.85}
-                elif any(word in text for word in ['garbage', 'trash', 'waste']):
-                    result = {"predicted_class": 1, "predicted_label": "garbage", "confidence": 0.88}
-                else:
-                    result = {"predicted_class": 2, "predicted_label": "potholes", "confidence": 0.82}
-                
-                result['text'] = data.get('text', '')
-                result['model_type'] = 'rule_based'
-                self.send_json(result)
-                
-            except Exception as e:
-                self.send_json({"error": str(e)}, 500)
-        else:
-            self.send_json({"error": "Not found"}, 404)
-    
-    def send_json(self, data, status=200):
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
-    
-    def send_html(self, html_content, status=200):
-        self.send_response(status)
-        self.send_header('Content-Type', 'text/html')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    def get_docs_html(self):
-        return '''
+import admin
+from batch import BatchError, parse_batch, predict_batch, predict_one
+from cache import get_cache
+from inference import get_engine
+from metrics import StageTimer, access_log, metrics
+from responses import StaticResponse, dumps, encode_batch, encode_prediction, loads, response_head
+from server import KEEPALIVE_TIMEOUT, PREFORK_PRELOAD, BodyError, read_body, serve
+
+ROUTES = {'/', '/health', '/ready', '/stats', '/metrics', '/docs', '/predict', '/predict/batch',
+          '/admin/models', '/admin/routing'}
+
+DOCS_HTML = '''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -135,6 +59,20 @@ class RailwayHandler(BaseHTTPRequestHandler):
                 <div id="response-health" class="response" style="display:none;"></div>
             </div>
             
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /ready</h3>
+                <p>Readiness check: 503 while the model is still loading</p>
+                <button onclick="testEndpoint('/ready', 'GET')">Test</button>
+                <div id="response-ready" class="response" style="display:none;"></div>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /stats</h3>
+                <p>Prediction cache hit, miss and eviction counters</p>
+                <button onclick="testEndpoint('/stats', 'GET')">Test</button>
+                <div id="response-stats" class="response" style="display:none;"></div>
+            </div>
+            
             <div class="endpoint">
                 <h3><span class="method post">POST</span> /predict</h3>
                 <p>Classify civic text into categories: streetlight, garbage, or potholes</p>
@@ -161,6 +99,12 @@ class RailwayHandler(BaseHTTPRequestHandler):
   "model_type": "rule_based"
 }</div>
             </div>
+            
+            <div class="endpoint">
+                <h3><span class="method post">POST</span> /predict/batch</h3>
+                <p>Classify many texts in one call. Send a JSON array (or NDJSON, one text per line); results come back in input order.</p>
+                <div class="example">["The street light is broken", {"text": "Kachra pada hai"}]</div>
+            </div>
         </div>
     </div>
     
@@ -214,16 +158,200 @@ class RailwayHandler(BaseHTTPRequestHandler):
 </body>
 </html>'''
 
+STATIC_RESPONSES = {
+    '/': StaticResponse(dumps({
+        "status": "healthy",
+        "message": "Civic Text Classifier API - Railway Deployment",
+        "version": "1.0",
+        "endpoints": ["/", "/health", "/ready", "/stats", "/metrics", "/predict", "/predict/batch", "/docs"],
+        "documentation": "https://new-civic-text-production.up.railway.app/docs",
+        "swagger_ui": "Visit /docs for interactive API testing"
+    }), 'application/json'),
+    '/health': StaticResponse(dumps({"status": "healthy", "message": "OK"}), 'application/json'),
+    '/docs': StaticResponse(DOCS_HTML.encode('utf-8'), 'text/html; charset=utf-8'),
+    # Usage instructions when /predict is opened in a browser
+    '/predict': StaticResponse(dumps({
+        "message": "Prediction endpoint - Use POST method",
+        "method": "POST",
+        "url": "https://new-civic-text-production.up.railway.app/predict",
+        "example": {
+            "input": {"text": "The street light is broken"},
+            "curl_example": 'curl -X POST "https://new-civic-text-production.up.railway.app/predict" -H "Content-Type: application/json" -d \'{"text": "The street light is broken"}\''
+        },
+        "supported_categories": ["streetlight", "garbage", "potholes"],
+        "docs_url": "https://new-civic-text-production.up.railway.app/docs"
+    }), 'application/json'),
+}
+
+class RailwayHandler(BaseHTTPRequestHandler):
+    # Keep-alive: every response below carries Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    
+    def log_message(self, format, *args):
+        print(f"📝 {format % args}")
+    
+    def log_request(self, code='-', size='-'):
+        # Per-request lines go to the sampled, buffered access log in send_body
+        pass
+    
+    def handle_one_request(self):
+        # The in-flight gauge and route counters are settled here, so a
+        # client that resets mid-request or a handler that raises is still
+        # counted (as a 500 unless a status was already sent)
+        self.timer = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.timer is not None:
+                self.finish_request()
+    
+    def start_request(self):
+        self.timer = StageTimer()
+        self.status = 500
+        self.predicted_labels = ()
+        self.model_versions = ()
+        metrics.request_started()
+    
+    def finish_request(self):
+        elapsed = self.timer.elapsed()
+        path = urlparse(self.path).path
+        route = path if path in ROUTES else 'other'
+        metrics.request_finished(route, self.status, elapsed, self.timer.stages, self.predicted_labels, self.model_versions)
+        access_log.record(self.command, path, self.status, elapsed, self.client_address[0])
+    
+    def do_GET(self):
+        self.start_request()
+        parsed_path = urlparse(self.path)
+        
+        if parsed_path.path in STATIC_RESPONSES:
+            # Encoded once at import; ETag revalidation and gzip come for free
+            self.send_static(STATIC_RESPONSES[parsed_path.path])
+            
+        elif parsed_path.path == '/ready':
+            # 503 until the model has loaded and warmed up (or fallen back)
+            engine = get_engine()
+            self.send_json(engine.status(), 200 if engine.is_ready else 503)
+            
+        elif parsed_path.path == '/stats':
+            self.send_json({"cache": get_cache().stats()})
+            
+        elif parsed_path.path == '/metrics':
+            cache = get_cache().stats()
+            text = metrics.render({
+                "civic_model_ready": int(get_engine().state == "ready"),
+                "civic_cache_entries": cache["entries"],
+                "civic_cache_hits_total": cache["hits"],
+                "civic_cache_misses_total": cache["misses"],
+                "civic_access_log_dropped_total": access_log.dropped,
+            })
+            self.send_body(text.encode('utf-8'), 'text/plain; version=0.0.4')
+            
+        elif parsed_path.path.startswith('/admin/'):
+            self.send_admin()
+            
+        else:
+            self.send_json({"error": "Not found"}, 404)
+    
+    def do_POST(self):
+        self.start_request()
+        # Always consume the body so a keep-alive connection stays in sync
+        try:
+            post_data = read_body(self)
+        except BodyError as e:
+            self.send_json({"error": str(e)}, e.status)
+            return
+        self.timer.mark('body_read')
+        
+        if self.path == '/predict':
+            try:
+                data = loads(post_data)
+            except ValueError as e:
+                self.send_json({"error": f"Invalid JSON: {e}"}, 400)
+                return
+            self.timer.mark('json_decode')
+            text = data.get('text', '') if isinstance(data, dict) else None
+            if not isinstance(text, str):
+                self.send_json({"error": "Expected a JSON object with a string 'text' field"}, 400)
+                return
+            try:
+                # DistilBERT once loaded, keyword rules until then; repeats come from the cache
+                result = predict_one(text, self.timer)
+                self.predicted_labels = (result['predicted_label'],)
+                self.model_versions = (result['model_version'],)
+                self.send_encoded(encode_prediction(result))
+                
+            except Exception as e:
+                self.send_json({"error": str(e)}, 500)
+        elif self.path == '/predict/batch':
+            try:
+                texts = parse_batch(post_data, self.headers.get('Content-Type', ''))
+                self.timer.mark('json_decode')
+                results = predict_batch(texts, self.timer)
+                self.predicted_labels = [r['predicted_label'] for r in results]
+                self.model_versions = [r['model_version'] for r in results]
+                self.send_encoded(encode_batch(results))
+                
+            except BatchError as e:
+                self.send_json({"error": str(e)}, e.status)
+            except Exception as e:
+                self.send_json({"error": str(e)}, 500)
+        elif self.path.startswith('/admin/'):
+            self.send_admin(post_data)
+        else:
+            self.send_json({"error": "Not found"}, 404)
+    
+    def do_DELETE(self):
+        self.start_request()
+        try:
+            read_body(self)
+        except BodyError as e:
+            self.send_json({"error": str(e)}, e.status)
+            return
+        if self.path.startswith('/admin/'):
+            self.send_admin()
+        else:
+            self.send_json({"error": "Not found"}, 404)
+    
+    def send_admin(self, body=b''):
+        # Checkpoint loads return 202 straight away; promotions and unloads
+        # wait here for the old model's batches to drain
+        try:
+            status, payload = admin.handle(self.command, urlparse(self.path).path, body,
+                                           self.headers.get('Authorization'))
+        except admin.AdminError as e:
+            status, payload = e.status, {"error": str(e)}
+        self.send_json(payload, status)
+    
+    def send_json(self, data, status=200):
+        self.send_encoded(dumps(data), status)
+    
+    def send_encoded(self, body, status=200):
+        self.timer.mark('serialize')
+        self.send_body(body, 'application/json', status)
+    
+    def send_static(self, response):
+        status, headers, body = response.select(
+            self.headers.get('Accept-Encoding', ''), self.headers.get('If-None-Match', '')
+        )
+        self.send_body(body, response.content_type, status, headers)
+    
+    def send_body(self, body, content_type, status=200, headers=b''):
+        if self.close_connection or getattr(self.server, 'draining', False):
+            # Shutting down (or an unreadable body): finish this request, then
+            # let the client reconnect
+            headers += b'Connection: close\r\n'
+            self.close_connection = True
+        # Status line, headers and body in one write
+        self.status = status
+        self.wfile.write(response_head(status, content_type, None if status == 304 else len(body), headers) + body)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     print(f"🚀 RAILWAY DEPLOYMENT - Starting server on port {port}")
     print(f"🌐 Health endpoint: http://0.0.0.0:{port}/health")
     
-    server = HTTPServer(('0.0.0.0', port), RailwayHandler)
-    print(f"✅ Server ready for Railway healthcheck!")
-    
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("🛑 Server stopped")
-        server.server_close()
\ No newline at end of file
+    engine = get_engine()
+    serve(RailwayHandler, port, on_start=engine.start,
+          before_fork=lambda workers: engine.preload(workers, load=PREFORK_PRELOAD))
+    print("🛑 Server stopped")
@@ -1,13 +1,52 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import gc
 import os
 import uvicorn
 
+import admin
+from batch import BatchError, parse_batch, predict_batch as classify_batch
+from cache import get_cache, normalize_key
+from inference import get_engine
+from jobs import OUTPUT_TYPES, JobManager, UploadTooLarge
+from metrics import MetricsMiddleware, access_log, metrics, startup
+from microbatch import MicroBatcher, QueueFullError
+from server import WORKERS
+
 app = FastAPI(title="Civic Text Classifier API", version="1.0.0")
 
+# Several workers sharing one copy of the weights:
+#   PRELOAD_MODEL=1 WORKERS=4 gunicorn --preload -w 4 -k uvicorn.workers.UvicornWorker main_fastapi:app
+# --preload imports this module once in the master, before it forks, so the
+# model is loaded here and the workers share its pages (see
+# InferenceEngine.preload). uvicorn --workers starts fresh interpreters
+# instead, each loading its own copy.
+if os.environ.get("PRELOAD_MODEL") == "1":
+    get_engine().preload(WORKERS)
+    gc.freeze()
+
+# Groups concurrent /predict calls into one forward pass once the model is up
+batcher = MicroBatcher(lambda texts: get_engine().predict_batch(texts))
+
+# Large uploads run as background jobs that step aside while /predict or
+# /predict/batch is waiting for the model
+jobs = JobManager(busy=batcher.busy)
+
+ROUTES = {"/", "/health", "/ready", "/stats", "/metrics", "/predict", "/predict/batch", "/jobs",
+          "/admin/models", "/admin/routing"}
+
 class TextRequest(BaseModel):
     text: str
 
+def metrics_route(path):
+    return path if path in ROUTES else "/jobs/{id}" if path.startswith("/jobs/") else "other"
+
+# Replaces per-request prints: counts, latency and a sampled access log (run
+# uvicorn with --no-access-log to drop its own per-request line)
+app.add_middleware(MetricsMiddleware, route=metrics_route)
+
 @app.get("/")
 def root():
     return {
@@ -19,41 +58,153 @@ def root():
 
 @app.get("/health")
 def health():
-    print("🏥 Health check endpoint called!")
     return {
         "status": "healthy",
         "message": "Railway healthcheck SUCCESS",
         "port": os.environ.get("PORT", "8000")
     }
 
+@app.on_event("startup")
+def load_model():
+    # Loads in the background; uvicorn binds the port without waiting for it,
+    # right after the startup hooks
+    startup.mark("app_started")
+    get_engine().start()
+
+@app.on_event("startup")
+def start_jobs():
+    # Also resumes jobs left queued or running by the previous process
+    jobs.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+
+@app.on_event("shutdown")
+def stop_jobs():
+    jobs.stop()
+
+@app.get("/ready")
+def ready():
+    engine = get_engine()
+    return JSONResponse(engine.status(), status_code=200 if engine.is_ready else 503)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    cache = get_cache().stats()
+    batching = batcher.stats()
+    return PlainTextResponse(metrics.render({
+        "civic_model_ready": int(get_engine().state == "ready"),
+        "civic_cache_entries": cache["entries"],
+        "civic_cache_hits_total": cache["hits"],
+        "civic_cache_misses_total": cache["misses"],
+        "civic_batcher_queue_depth": batching["queue_depth"],
+        "civic_batcher_mean_batch_size": batching["mean_batch_size"],
+        "civic_access_log_dropped_total": access_log.dropped,
+    }), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+def stats():
+    return {"batcher": batcher.stats(), "cache": get_cache().stats()}
+
 @app.post("/predict")
-def predict(request: TextRequest):
-    text = request.text.lower()
-    
-    # Simple rule-based classification
-    if any(word in text for word in ['light', 'lamp', 'bulb', 'lighting', 'streetlight', 'street light']):
-        result = {
-            "predicted_class": 0, 
-            "predicted_label": "streetlight", 
-            "confidence": 0.85
-        }
-    elif any(word in text for word in ['garbage', 'trash', 'waste', 'litter', 'bin']):
-        result = {
-            "predicted_class": 1, 
-            "predicted_label": "garbage", 
-            "confidence": 0.88
-        }
-    else:
-        result = {
-            "predicted_class": 2, 
-            "predicted_label": "potholes", 
-            "confidence": 0.82
-        }
+async def predict(request: TextRequest, http_request: Request):
+    timer = http_request.state.timer
+    timer.mark("json_decode")
+    engine = get_engine()
+    cache = get_cache()
+    version = engine.version
+    key = normalize_key(request.text)
+    timer.mark("normalize")
+    result = cache.get(request.text, version, key)
+    if result is None:
+        if engine.state == "ready":
+            try:
+                result = dict(await batcher.submit(request.text))
+            except QueueFullError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail="Prediction timed out")
+        else:
+            # Keyword fallback is microseconds; queueing it would only add latency
+            result = engine.predict(request.text)
+        cache.put(request.text, version, result, key)
+    timer.mark("classify")
+    http_request.state.labels = (result['predicted_label'],)
+    http_request.state.versions = (result['model_version'],)
     
     result['text'] = request.text
-    result['model_type'] = 'rule_based'
     
     return result
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    # Raw body so both JSON arrays and NDJSON uploads are accepted
+    timer = request.state.timer
+    body = await request.body()
+    timer.mark("body_read")
+    try:
+        texts = parse_batch(body, request.headers.get("content-type", ""))
+    except BatchError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Off the event loop so a large model batch doesn't stall other requests,
+    # and on the batcher's thread so it doesn't compete with /predict for cores
+    timer.mark("json_decode")
+    results = await batcher.run(classify_batch, texts, timer)
+    request.state.labels = [r['predicted_label'] for r in results]
+    request.state.versions = [r['model_version'] for r in results]
+    return {"results": results, "count": len(results)}
+
+@app.api_route("/admin/{rest:path}", methods=["GET", "POST", "DELETE"])
+async def admin_endpoint(request: Request):
+    # See admin.py; promotions and unloads block while the old model drains,
+    # so they run off the event loop
+    body = await request.body()
+    try:
+        status, payload = await asyncio.get_running_loop().run_in_executor(
+            None, admin.handle, request.method, request.url.path, body, request.headers.get("authorization")
+        )
+    except admin.AdminError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    return JSONResponse(payload, status_code=status)
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request, format: str = None, output_format: str = "jsonl", text_field: str = "text"):
+    # Raw CSV or JSONL body (optionally gzipped), streamed to disk as it arrives
+    if format is None:
+        format = "jsonl" if "json" in request.headers.get("content-type", "") else "csv"
+    try:
+        job_id = jobs.create(format, output_format, text_field)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        await jobs.receive(job_id, request.stream())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return JSONResponse(jobs.status(job_id), status_code=202, headers={"Location": f"/jobs/{job_id}"})
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    fmt = status["output_format"]
+    return StreamingResponse(
+        jobs.iter_result(job_id),
+        media_type=OUTPUT_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.{fmt}"'},
+    )
+
 # Railway will use: uvicorn main:app --host 0.0.0.0 --port $PORT
-# So we don't need the if __name__ == "__main__" block
\ No newline at end of file
+# So we don't need the if __name__ == "__main__" block
@@ -0,0 +1,242 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# Prometheus-style metrics and a buffered access log for the prediction path.
+# Recording a request is a handful of dict updates under one lock, so the whole
+# layer stays in the low microseconds per request; rendering /metrics and
+# writing log lines happen off the request path.
+
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+STAGE_BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.05, 0.25]
+
+ACCESS_LOG_SAMPLE = float(os.environ.get("ACCESS_LOG_SAMPLE", 0.01))
+ACCESS_LOG_FLUSH_SECONDS = float(os.environ.get("ACCESS_LOG_FLUSH_SECONDS", 1.0))
+ACCESS_LOG_BUFFER = int(os.environ.get("ACCESS_LOG_BUFFER", 1000))
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class StageTimer:
+    # Marks elapsed time between successive points of a request
+    __slots__ = ("start", "last", "stages")
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def process_start_time():
+    # Wall-clock time this process was created, so startup phases include
+    # interpreter start and imports; Linux only, else the time of this import.
+    # Forked workers inherit the parent's value along with the module.
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class StartupTimer:
+    # Seconds from process start to each startup milestone: port bound,
+    # tokenizer ready, model ready. Only the first mark of a phase counts.
+    def __init__(self, start=None):
+        self.start = process_start_time() if start is None else start
+        self.phases = {}
+
+    def mark(self, phase):
+        if phase not in self.phases:
+            self.phases[phase] = round(time.time() - self.start, 3)
+            print(f"⏱️ Startup: {phase} at {self.phases[phase]:.3f}s")
+
+
+def _escape(value):
+    # Prometheus label values: backslash, double quote and newline are escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (route, status) -> count
+        self.latency = {}         # route -> Histogram
+        self.stages = {}          # stage -> Histogram
+        self.labels = {}          # predicted label -> count
+        self.versions = {}        # model version that answered -> count
+        self.in_flight = 0
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, route, status, seconds, stages=(), labels=(), versions=()):
+        with self._lock:
+            self.in_flight -= 1
+            key = (route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get(route)
+            if histogram is None:
+                histogram = self.latency[route] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            for stage, value in stages:
+                histogram = self.stages.get(stage)
+                if histogram is None:
+                    histogram = self.stages[stage] = Histogram(STAGE_BUCKETS)
+                histogram.observe(value)
+            for label in labels:
+                self.labels[label] = self.labels.get(label, 0) + 1
+            for version in versions:
+                self.versions[version] = self.versions.get(version, 0) + 1
+
+    def _histogram_lines(self, name, label_name, histograms):
+        lines = [f"# TYPE {name} histogram"]
+        for key, histogram in sorted(histograms.items()):
+            key = _escape(key)
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_name}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_name}="{key}"}} {histogram.total}')
+            lines.append(f'{name}_count{{{label_name}="{key}"}} {histogram.count}')
+        return lines
+
+    def render(self, extra=None):
+        with self._lock:
+            lines = ["# TYPE civic_requests_total counter"]
+            for (route, status), count in sorted(self.requests.items()):
+                lines.append(f'civic_requests_total{{route="{_escape(route)}",status="{status}"}} {count}')
+            lines += self._histogram_lines("civic_request_duration_seconds", "route", self.latency)
+            lines += self._histogram_lines("civic_stage_duration_seconds", "stage", self.stages)
+            lines.append("# TYPE civic_predictions_total counter")
+            for label, count in sorted(self.labels.items()):
+                lines.append(f'civic_predictions_total{{label="{_escape(label)}"}} {count}')
+            lines.append("# TYPE civic_model_predictions_total counter")
+            for version, count in sorted(self.versions.items()):
+                lines.append(f'civic_model_predictions_total{{model_version="{_escape(version)}"}} {count}')
+            lines.append("# TYPE civic_requests_in_flight gauge")
+            lines.append(f"civic_requests_in_flight {self.in_flight}")
+        for name, value in sorted((extra or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class AccessLog:
+    # Sampled, structured (JSON lines) access log. Records are buffered and
+    # written by a background thread in one write per flush; server errors
+    # are always kept regardless of the sample rate.
+    def __init__(self, stream=None, sample=ACCESS_LOG_SAMPLE, flush_seconds=ACCESS_LOG_FLUSH_SECONDS,
+                 max_buffer=ACCESS_LOG_BUFFER):
+        self.stream = stream or sys.stdout
+        self.sample = sample
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, method, path, status, seconds, client=None):
+        if status < 500 and (self.sample <= 0 or random.random() >= self.sample):
+            return
+        entry = (time.time(), method, path, status, seconds, client)
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if not entries:
+            return
+        lines = [
+            json.dumps({"ts": round(ts, 3), "method": method, "path": path, "status": status,
+                        "ms": round(seconds * 1000, 3), "client": client})
+            for ts, method, path, status, seconds, client in entries
+        ]
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+class MetricsMiddleware:
+    # ASGI middleware doing for FastAPI what the stdlib handler does per
+    # request: counts, latency, stage times and a sampled access log. Plain
+    # ASGI because Starlette's @app.middleware("http") runs every request
+    # through an extra task and stream pair, tens of microseconds. Endpoints
+    # reach the timer and report labels/versions via request.state, which
+    # Starlette keeps in scope["state"].
+    def __init__(self, app, route, registry=None, log=None):
+        self.app = app
+        self.route = route  # path -> metrics label
+        self.registry = registry or metrics
+        self.log = log or access_log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timer = StageTimer()
+        state = scope.setdefault("state", {})
+        state["timer"] = timer
+        state["labels"] = state["versions"] = ()
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.request_started()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            path = scope["path"]
+            elapsed = timer.elapsed()
+            self.registry.request_finished(self.route(path), status, elapsed, timer.stages, state["labels"],
+                                           state["versions"])
+            client = scope.get("client")
+            self.log.record(scope["method"], path, status, elapsed, client[0] if client else None)
+
+
+startup = StartupTimer()
+metrics = Metrics()
+access_log = AccessLog()
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Dynamic micro-batching for concurrent /predict calls in main_fastapi.py.
+# Requests arriving within BATCH_WINDOW_MS of each other (up to BATCH_MAX_SIZE)
+# share one padded forward pass instead of each running a batch of one.
+
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", 5))
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 32))
+BATCH_QUEUE_SIZE = int(os.environ.get("BATCH_QUEUE_SIZE", 1024))
+PREDICT_TIMEOUT = float(os.environ.get("PREDICT_TIMEOUT", 10))
+
+# Upper bounds (ms) for the queueing-delay histogram
+DELAY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, predict_batch, window_ms=BATCH_WINDOW_MS, max_batch_size=BATCH_MAX_SIZE,
+                 max_queue=BATCH_QUEUE_SIZE, timeout=PREDICT_TIMEOUT):
+        self.predict_batch = predict_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.queue = None
+        self._task = None
+        self._running = 0
+        # One thread so forward passes never compete with each other for cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microbatch")
+
+        self.batch_sizes = {}
+        self.delay_counts = [0] * (len(DELAY_BUCKETS_MS) + 1)
+        self.delay_total_ms = 0.0
+        self.requests = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, text, timeout=None):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((text, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"Prediction queue is full ({self.max_queue} pending)")
+        self.requests += 1
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def run(self, fn, *args):
+        # Runs fn (a whole /predict/batch request) on the batcher's thread, so
+        # it takes turns with the micro-batches instead of running beside them
+        self._running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._running -= 1
+
+    def busy(self):
+        # Anything waiting for, or using, the model's thread
+        return self._running > 0 or (self.queue is not None and not self.queue.empty())
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            # Whatever is already queued joins the batch even with a zero window
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that already timed out are dropped rather than computed
+        return [item for item in batch if not item[1].done()]
+
+    def _record(self, batch, started):
+        size = len(batch)
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+        for _, _, enqueued in batch:
+            delay_ms = (started - enqueued) * 1000
+            self.delay_total_ms += delay_ms
+            bucket = 0
+            while bucket < len(DELAY_BUCKETS_MS) and delay_ms > DELAY_BUCKETS_MS[bucket]:
+                bucket += 1
+            self.delay_counts[bucket] += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            self._record(batch, time.perf_counter())
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        batches = sum(self.batch_sizes.values())
+        batched = sum(size * count for size, count in self.batch_sizes.items())
+        labels = [f"le_{bound}ms" for bound in DELAY_BUCKETS_MS] + ["inf"]
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue": self.max_queue,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "batches": batches,
+            "mean_batch_size": batched / batches if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "queue_delay_ms_mean": self.delay_total_ms / batched if batched else 0.0,
+            "queue_delay_ms_histogram": dict(zip(labels, self.delay_counts)),
+        }
@@ -0,0 +1,45 @@
+# Length-bucketed dynamic padding for the DistilBERT path. Inputs are sorted by
+# token length and grouped, each group is padded only to its own longest item
+# (rounded up to a multiple of 8), and results are put back in input order by
+# the caller using the index lists returned from plan_buckets().
+
+PAD_MULTIPLE = 8
+
+
+def round_up(length, multiple=PAD_MULTIPLE):
+    return -(-length // multiple) * multiple
+
+
+def truncate_ids(ids, max_length):
+    # Keep the leading tokens and the trailing [SEP]; returns (ids, was_truncated)
+    if len(ids) <= max_length:
+        return ids, False
+    return ids[:max_length - 1] + ids[-1:], True
+
+
+def plan_buckets(lengths, max_batch_size, max_tokens=None, multiple=PAD_MULTIPLE):
+    # Returns lists of original indices. A bucket closes when it reaches
+    # max_batch_size or when its padded size would exceed max_tokens, so a few
+    # long complaints run in a small batch of their own.
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    buckets = []
+    current = []
+    for index in order:
+        padded = round_up(lengths[index], multiple)
+        too_many_tokens = max_tokens and current and padded * (len(current) + 1) > max_tokens
+        if len(current) >= max_batch_size or too_many_tokens:
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def pad_batch(id_lists, pad_id=0, multiple=PAD_MULTIPLE, max_length=None):
+    width = round_up(max(len(ids) for ids in id_lists), multiple)
+    if max_length:
+        width = min(width, max_length)
+    input_ids = [ids + [pad_id] * (width - len(ids)) for ids in id_lists]
+    attention_mask = [[1] * len(ids) + [0] * (width - len(ids)) for ids in id_lists]
+    return input_ids, attention_mask
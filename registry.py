@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+import zlib
+
+from cache import normalize_key
+
+# Checkpoints resident in the inference engine and how traffic is spread
+# across them. The engine keeps every loaded checkpoint in a dict and serves
+# through one immutable Routing object:
+#   primary - answers everything not split off
+#   split   - a fraction of texts (picked by a hash of the normalized text,
+#             so a given text always lands on the same checkpoint) goes to
+#             another checkpoint instead
+#   shadow  - checkpoints that also see a sample of the traffic in the
+#             background; their answers are only compared, never returned
+# Changing any of it builds a new Routing and swaps the engine's reference,
+# so a request reads it once and never sees half an update. A checkpoint
+# that leaves the routing keeps serving the batches already running on it;
+# drain() waits for those.
+
+WEIGHT_FILES = ["model.safetensors", "pytorch_model.bin"]
+# Resident checkpoints are kept within this budget (weights size on disk,
+# 0 = unlimited); idle ones are dropped, least recently used first
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", 1024))
+# Load and promote the newest checkpoint appearing here (the directory itself
+# or any subdirectory with weights), checked every MODEL_WATCH_SECONDS
+MODEL_WATCH_DIR = os.environ.get("MODEL_WATCH_DIR")
+MODEL_WATCH_SECONDS = float(os.environ.get("MODEL_WATCH_SECONDS", 10))
+MODEL_DRAIN_TIMEOUT = float(os.environ.get("MODEL_DRAIN_TIMEOUT", 30))
+# Fraction of model calls copied to shadow checkpoints, and how many copies
+# may wait before new ones are dropped rather than slow the primary down
+SHADOW_SAMPLE = float(os.environ.get("SHADOW_SAMPLE", 1.0))
+SHADOW_QUEUE = int(os.environ.get("SHADOW_QUEUE", 64))
+
+
+class BudgetExceeded(MemoryError):
+    pass
+
+
+def has_weights(model_path):
+    return any(os.path.exists(os.path.join(model_path, name)) for name in WEIGHT_FILES)
+
+
+def weights_mtime(model_path):
+    paths = [os.path.join(model_path, name) for name in WEIGHT_FILES]
+    return max((os.path.getmtime(path) for path in paths if os.path.exists(path)), default=0)
+
+
+def weights_bytes(model_path):
+    paths = [os.path.join(model_path, name) for name in WEIGHT_FILES]
+    return max((os.path.getsize(path) for path in paths if os.path.exists(path)), default=0)
+
+
+def checkpoint_name(model_path):
+    return os.path.basename(os.path.normpath(model_path))
+
+
+def latest_checkpoint(directory):
+    # (weights mtime, path) of the newest checkpoint in or under directory.
+    # Hidden entries are skipped: writers (train.py) build a checkpoint under
+    # a dot-name and rename it once it is complete.
+    if not os.path.isdir(directory):
+        return None
+    candidates = [directory] + [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                                if not name.startswith(".")]
+    found = [(weights_mtime(path), os.path.realpath(path))
+             for path in candidates if os.path.isdir(path) and has_weights(path)]
+    return max(found, default=None)
+
+
+class LoadedModel:
+    # One checkpoint ready to serve: its forward-pass backend, tokenizer and
+    # labels. Forward passes run inside `with model.use():` so drain() can
+    # tell when the last one has finished.
+    def __init__(self, name, path, backend, tokenizer, id2label, version, nbytes=0, source=None):
+        self.name = name
+        self.path = path
+        self.backend = backend
+        self.tokenizer = tokenizer
+        self.id2label = id2label
+        self.version = version
+        self.nbytes = nbytes
+        self.source = source
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.texts = 0
+        self.in_flight = 0
+        self._idle = threading.Condition()
+
+    def use(self, texts=0):
+        return _InUse(self, texts)
+
+    def drain(self, timeout=MODEL_DRAIN_TIMEOUT):
+        # Returns the number of forward passes still running at the timeout
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self.in_flight and time.monotonic() < deadline:
+                self._idle.wait(deadline - time.monotonic())
+            return self.in_flight
+
+    def status(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "backend": self.backend.name,
+            "source": self.source,
+            "mb": round(self.nbytes / 2 ** 20, 1),
+            "loaded_at": round(self.loaded_at, 3),
+            "texts": self.texts,
+            "in_flight": self.in_flight,
+        }
+
+
+class _InUse:
+    __slots__ = ("model", "texts")
+
+    def __init__(self, model, texts):
+        self.model = model
+        self.texts = texts
+
+    def __enter__(self):
+        with self.model._idle:
+            self.model.in_flight += 1
+        return self.model
+
+    def __exit__(self, *exc):
+        model = self.model
+        with model._idle:
+            model.in_flight -= 1
+            model.texts += self.texts
+            model.last_used = time.monotonic()
+            model._idle.notify_all()
+
+
+class Routing:
+    def __init__(self, primary, split=(), shadow=(), shadow_sample=SHADOW_SAMPLE):
+        self.primary = primary
+        self.split = tuple((model, float(fraction)) for model, fraction in split if model is not primary)
+        self.shadow = tuple(model for model in shadow if model is not primary)
+        self.shadow_sample = shadow_sample
+        # Every checkpoint this routing sends texts to
+        self.members = frozenset([primary, *self.shadow, *(model for model, _ in self.split)])
+        if any(fraction <= 0 for _, fraction in self.split) or sum(f for _, f in self.split) > 1:
+            raise ValueError("Split fractions must be positive and add up to at most 1")
+        self._bounds = []
+        upper = 0.0
+        for model, fraction in self.split:
+            upper += fraction
+            self._bounds.append((upper, model))
+
+    def route(self, text):
+        if not self._bounds:
+            return self.primary
+        point = zlib.crc32(normalize_key(text).encode("utf-8")) / 2 ** 32
+        for upper, model in self._bounds:
+            if point < upper:
+                return model
+        return self.primary
+
+    @property
+    def version(self):
+        # A text always goes to the same checkpoint under one routing, so
+        # this is a sound cache key for every answer given under it
+        if not self.split:
+            return self.primary.version
+        return "+".join([self.primary.version] + [f"{model.version}@{fraction:g}" for model, fraction in self.split])
+
+    def status(self):
+        return {
+            "primary": self.primary.name,
+            "split": {model.name: fraction for model, fraction in self.split},
+            "shadow": [model.name for model in self.shadow],
+            "shadow_sample": self.shadow_sample,
+        }
+
+
+class CheckpointWatcher:
+    # Polls a directory and calls on_change(path) with the newest checkpoint
+    # once it has been seen unchanged on two polls in a row, so one that is
+    # still being written isn't loaded half-way
+    def __init__(self, directory, on_change, interval=MODEL_WATCH_SECONDS, current=None):
+        self.directory = directory
+        self.on_change = on_change
+        self.interval = interval
+        self.current = current
+        self.pending = None
+        self._thread = None
+
+    def poll(self):
+        latest = latest_checkpoint(self.directory)
+        # Only something newer than what is serving; rewriting the served
+        # checkpoint's weights in place counts as newer
+        if latest is None or (self.current and latest[0] <= self.current[0]):
+            self.pending = None
+            return False
+        if latest != self.pending:
+            self.pending = latest
+            return False
+        # Recorded before loading so a checkpoint that fails isn't retried on
+        # every poll; a newer one still is
+        self.current, self.pending = latest, None
+        self.on_change(latest[1])
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="checkpoint-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Checkpoint watcher: {e}")
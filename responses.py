@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import json
+import math
+import numbers
+import os
+import time
+from functools import lru_cache
+from http import HTTPStatus
+
+# Response encoding for the stdlib handler. Static bodies are encoded once at
+# import (with an ETag and a gzip variant), /predict bodies are assembled from
+# pre-encoded per-label fragments, and status line plus constant headers are
+# cached per (status, content type) so a response goes out in a single write.
+#
+# JSON_BACKEND picks the encoder: auto (orjson, then ujson, then json), or one
+# of orjson / ujson / json explicitly.
+
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+JSON_BACKENDS = ["orjson", "ujson", "json"]
+
+# Key order of a /predict result; anything else goes through the generic encoder
+PREDICTION_KEYS = ("predicted_class", "predicted_label", "confidence", "model_type", "model_version", "text")
+
+
+def _load_json_backend(name):
+    # Returns (name, dumps, loads); dumps produces bytes and loads accepts bytes
+    if name == "orjson":
+        import orjson
+
+        return "orjson", orjson.dumps, orjson.loads
+    if name == "ujson":
+        import ujson
+
+        return "ujson", lambda obj: ujson.dumps(obj, ensure_ascii=False).encode("utf-8"), ujson.loads
+    if name == "json":
+        return "json", lambda obj: json.dumps(obj).encode("utf-8"), json.loads
+    if name == "auto":
+        for candidate in JSON_BACKENDS:
+            try:
+                return _load_json_backend(candidate)
+            except ImportError:
+                continue
+    raise ValueError(f"Unknown JSON backend '{name}', expected auto or one of {JSON_BACKENDS}")
+
+
+json_backend, dumps, loads = _load_json_backend(JSON_BACKEND)
+
+
+@lru_cache(maxsize=64)
+def _prediction_fragments(predicted_class, predicted_label, model_type, model_version):
+    head = b"".join((
+        b'{"predicted_class": ', dumps(predicted_class),
+        b', "predicted_label": ', dumps(predicted_label),
+        b', "confidence": ',
+    ))
+    middle = b"".join((
+        b', "model_type": ', dumps(model_type), b', "model_version": ', dumps(model_version), b', "text": ',
+    ))
+    return head, middle
+
+
+def encode_prediction(result):
+    if tuple(result) != PREDICTION_KEYS:
+        return dumps(result)
+    confidence = result["confidence"]
+    if type(confidence) is not float:
+        # repr() of a numpy scalar isn't JSON; anything non-numeric goes to the generic encoder
+        if not isinstance(confidence, numbers.Real):
+            return dumps(result)
+        confidence = float(confidence)
+    if not math.isfinite(confidence):
+        # JSON has no NaN/Infinity
+        return dumps(dict(result, confidence=None))
+    head, middle = _prediction_fragments(result["predicted_class"], result["predicted_label"], result["model_type"],
+                                         result["model_version"])
+    return b"".join((head, repr(confidence).encode("ascii"), middle, dumps(result["text"]), b"}"))
+
+
+def encode_batch(results):
+    return b"".join((
+        b'{"results": [', b", ".join(encode_prediction(result) for result in results),
+        b'], "count": ', str(len(results)).encode("ascii"), b"}",
+    ))
+
+
+_date = [0, b""]
+
+
+def http_date():
+    # Date header, formatted at most once a second
+    now = int(time.time())
+    if now != _date[0]:
+        _date[1] = b"Date: " + time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(now)).encode("ascii") + b"\r\n"
+        _date[0] = now
+    return _date[1]
+
+
+@lru_cache(maxsize=None)
+def _status_head(status, content_type):
+    phrase = HTTPStatus(status).phrase
+    head = f"HTTP/1.1 {status} {phrase}\r\n"
+    if content_type:
+        head += f"Content-Type: {content_type}\r\nAccess-Control-Allow-Origin: *\r\n"
+    return head.encode("latin-1")
+
+
+def response_head(status, content_type, length, headers=b""):
+    # length=None omits Content-Length (304 responses carry no body)
+    parts = [_status_head(status, content_type), http_date()]
+    if length is not None:
+        parts += [b"Content-Length: ", str(length).encode("ascii"), b"\r\n"]
+    parts += [headers, b"\r\n"]
+    return b"".join(parts)
+
+
+class StaticResponse:
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        compressed = gzip.compress(body, 9, mtime=0)
+        self.gzipped = compressed if len(compressed) < len(body) else None
+        self.gzip_etag = self.etag[:-1] + '-gz"'
+
+    def select(self, accept_encoding="", if_none_match=""):
+        # Returns (status, extra header bytes, body) for the request's headers
+        use_gzip = self.gzipped is not None and "gzip" in accept_encoding
+        etag = self.gzip_etag if use_gzip else self.etag
+        headers = f"ETag: {etag}\r\nVary: Accept-Encoding\r\n"
+        if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+            return 304, headers.encode("latin-1"), b""
+        if use_gzip:
+            return 200, (headers + "Content-Encoding: gzip\r\n").encode("latin-1"), self.gzipped
+        return 200, headers.encode("latin-1"), self.body
@@ -0,0 +1,201 @@
+import gc
+import os
+import re
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+from metrics import startup
+
+# Server mode for the stdlib servers (main.py, app.py):
+#   single   - the original one-connection-at-a-time HTTPServer
+#   threaded - one process, bounded pool of handler threads (default)
+#   prefork  - WORKERS processes, each with its own thread pool, sharing the
+#              port through SO_REUSEPORT so CPU-bound inference uses every core
+SERVER_MODE = os.environ.get("SERVER_MODE", "threaded")
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", 32))
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+# prefork, opt-in: load the model once in the parent before forking, so every
+# worker shares its weights copy-on-write instead of loading a copy of its
+# own. The port is bound only after that load, so /health doesn't answer
+# until then: raise the platform's healthcheck timeout to cover it.
+PREFORK_PRELOAD = os.environ.get("PREFORK_PRELOAD", "0") == "1"
+# Idle keep-alive connections are dropped after this many seconds so they do
+# not pin a worker thread (or hold up shutdown) forever.
+KEEPALIVE_TIMEOUT = float(os.environ.get("KEEPALIVE_TIMEOUT", 5))
+SHUTDOWN_TIMEOUT = float(os.environ.get("SHUTDOWN_TIMEOUT", 10))
+
+
+class BodyError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def read_body(handler):
+    # The request body, framed by Content-Length. A chunked body or a length
+    # that isn't a non-negative integer leaves the rest of the stream
+    # unreadable, so those raise BodyError and the connection is closed
+    # after the error reply.
+    if "chunked" in handler.headers.get("Transfer-Encoding", "").lower():
+        handler.close_connection = True
+        raise BodyError("Chunked request bodies are not supported; send Content-Length", 411)
+    length = handler.headers.get("Content-Length", "0").strip()
+    if not re.fullmatch(r"[0-9]+", length):
+        handler.close_connection = True
+        raise BodyError("Invalid Content-Length")
+    return handler.rfile.read(int(length))
+
+
+class PooledHTTPServer(HTTPServer):
+    # socketserver's default listen backlog of 5 drops SYNs under a burst of
+    # new connections, costing those clients a 1s retransmit
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers=WORKER_THREADS, reuse_port=False):
+        self.reuse_port = reuse_port
+        self.draining = False
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http")
+        self._active = 0
+        self._idle = threading.Condition()
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        # Once every worker is busy the accept loop waits here and new
+        # connections queue in the listen backlog instead of spawning threads.
+        self._slots.acquire()
+        with self._idle:
+            self._active += 1
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+            with self._idle:
+                self._active -= 1
+                self._idle.notify_all()
+
+    def drain(self, timeout=SHUTDOWN_TIMEOUT):
+        # Called after serve_forever() has returned: no new connections are
+        # accepted, responses now carry "Connection: close", and we wait for
+        # in-flight requests to finish.
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._active and time.monotonic() < deadline:
+                self._idle.wait(deadline - time.monotonic())
+            remaining = self._active
+        self._executor.shutdown(wait=False)
+        self.server_close()
+        return remaining
+
+
+def _run_until_stopped(server):
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so it cannot run on
+        # the thread that is inside serve_forever()
+        if not stop.is_set():
+            stop.set()
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    if isinstance(server, PooledHTTPServer):
+        remaining = server.drain()
+        if remaining:
+            print(f"⚠️ {remaining} request(s) still running after {SHUTDOWN_TIMEOUT}s")
+    else:
+        server.server_close()
+
+
+def _serve_prefork(handler_class, host, port, workers, on_start, before_fork=None):
+    children = set()
+    stopping = False
+
+    if before_fork:
+        before_fork(workers)
+    # Everything allocated so far is left alone by the workers' garbage
+    # collectors, whose bookkeeping writes would otherwise un-share its pages
+    gc.freeze()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            server = PooledHTTPServer((host, port), handler_class, reuse_port=True)
+            startup.mark("port_bound")
+            if on_start:
+                on_start()
+            _run_until_stopped(server)
+            os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"✅ Pre-forked {workers} workers: {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited ({status}), restarting")
+            spawn()
+
+
+def serve(handler_class, port, host="0.0.0.0", mode=None, workers=None, on_start=None, before_fork=None):
+    # on_start runs once the port is bound (in every worker for prefork), which
+    # is where background model loading is kicked off; before_fork(workers)
+    # runs once in the prefork parent
+    mode = mode or SERVER_MODE
+    if mode == "prefork" and not (hasattr(socket, "SO_REUSEPORT") and hasattr(os, "fork")):
+        print("⚠️ SO_REUSEPORT/fork not available, falling back to threaded mode")
+        mode = "threaded"
+
+    print(f"🧵 Server mode: {mode}")
+    if mode == "prefork":
+        _serve_prefork(handler_class, host, port, workers or WORKERS, on_start, before_fork)
+        return
+
+    if mode == "single":
+        server = HTTPServer((host, port), handler_class)
+    else:
+        server = PooledHTTPServer((host, port), handler_class)
+    startup.mark("port_bound")
+    print(f"✅ Server ready for Railway healthcheck!")
+    if on_start:
+        on_start()
+    _run_until_stopped(server)
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import time
+from types import SimpleNamespace
+
+# Startup-optimised loading for the DistilBERT path. Two things dominate a
+# cold start there: importing transformers and from_pretrained rebuilding the
+# model from config.json before the weights are copied in. Instead:
+#   - the tokenizer is read straight from tokenizer.json with the `tokenizers`
+#     library (what transformers' fast tokenizer wraps anyway)
+#   - the model is served from a TorchScript snapshot next to the weights,
+#     traced once from the full model; torch.jit.load restores the graph and
+#     weights without importing transformers or constructing any modules
+# The snapshot is written the first time the model is loaded the slow way
+# (or ahead of time with `python snapshot.py`) and is ignored whenever the
+# weights are newer than it.
+
+SNAPSHOT_FILE = "model.torchscript.pt"
+STARTUP_SNAPSHOT = os.environ.get("STARTUP_SNAPSHOT", "1") == "1"
+# Shapes the traced graph is checked against before a snapshot is written,
+# so one that only works for the tracing input never gets saved
+CHECK_SHAPES = [(1, 40), (3, 7)]
+
+
+class FastTokenizer:
+    # The slice of the transformers tokenizer API used by the engine and the
+    # kNN embedder: tokenizer(texts)["input_ids"] and pad_token_id
+    def __init__(self, tokenizer, pad_token_id):
+        self.tokenizer = tokenizer
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, texts, add_special_tokens=True, truncation=False):
+        if truncation:
+            raise ValueError("FastTokenizer does not truncate; cut ids with padding.truncate_ids")
+        encodings = self.tokenizer.encode_batch(list(texts), add_special_tokens=add_special_tokens)
+        return {"input_ids": [encoding.ids for encoding in encodings]}
+
+
+def load_tokenizer(model_path):
+    path = os.path.join(model_path, "tokenizer.json")
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        Tokenizer = None
+    if Tokenizer is None or not os.path.exists(path):
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(model_path)
+
+    tokenizer = Tokenizer.from_file(path)
+    # tokenizer.json was saved truncating and padding everything to 128
+    # tokens; the engine truncates and pads per length bucket itself
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    pad_token = "[PAD]"
+    config_path = os.path.join(model_path, "tokenizer_config.json")
+    if os.path.exists(config_path):
+        with open(config_path, encoding="utf-8") as f:
+            pad_token = json.load(f).get("pad_token") or pad_token
+    return FastTokenizer(tokenizer, tokenizer.token_to_id(pad_token))
+
+
+class SnapshotModel:
+    # Stands in for the transformers model in TorchBackend: called with
+    # input_ids and attention_mask, returns an object with .logits
+    def __init__(self, module, id2label):
+        self.module = module
+        self.config = SimpleNamespace(id2label=id2label)
+
+    def eval(self):
+        self.module.eval()
+        return self
+
+    def __call__(self, input_ids, attention_mask):
+        return SimpleNamespace(logits=self.module(input_ids, attention_mask))
+
+
+def _example_inputs(model, batch, length):
+    import torch
+
+    input_ids = torch.randint(1000, model.config.vocab_size, (batch, length))
+    attention_mask = torch.ones((batch, length), dtype=torch.long)
+    # Padding in the last row, so masking is part of what gets checked
+    attention_mask[-1, length // 2:] = 0
+    return input_ids, attention_mask
+
+
+def save_snapshot(model, path):
+    import warnings
+
+    import torch
+
+    from backends import logits_module
+
+    wrapper = logits_module(model).eval()
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", torch.jit.TracerWarning)
+        traced = torch.jit.trace(wrapper, _example_inputs(model, 2, 16))
+        for batch, length in CHECK_SHAPES:
+            inputs = _example_inputs(model, batch, length)
+            if not torch.allclose(traced(*inputs), wrapper(*inputs), atol=1e-4):
+                raise RuntimeError(f"traced model disagrees with the original at shape {(batch, length)}")
+
+    id2label = {str(class_id): label for class_id, label in model.config.id2label.items()}
+    tmp = path + ".tmp"
+    torch.jit.save(traced, tmp, _extra_files={"id2label.json": json.dumps(id2label)})
+    os.replace(tmp, path)
+
+
+def load_snapshot(path, source_mtime=0):
+    # None when there is no snapshot or the weights have changed since
+    if not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+        return None
+    import torch
+
+    extra_files = {"id2label.json": ""}
+    module = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+    id2label = {int(class_id): label for class_id, label in json.loads(extra_files["id2label.json"]).items()}
+    return SnapshotModel(module.eval(), id2label)
+
+
+def main(argv=None):
+    from inference import MODEL_PATH, has_weights
+
+    parser = argparse.ArgumentParser(description="Write the TorchScript startup snapshot next to the weights")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    if not has_weights(args.model_path):
+        parser.error(f"no model weights in {args.model_path}")
+    from transformers import AutoModelForSequenceClassification
+
+    start = time.perf_counter()
+    model = AutoModelForSequenceClassification.from_pretrained(args.model_path).eval()
+    loaded = time.perf_counter()
+    path = os.path.join(args.model_path, SNAPSHOT_FILE)
+    save_snapshot(model, path)
+    saved = time.perf_counter()
+    load_snapshot(path)
+    print(f"📦 {path}: from_pretrained {loaded - start:.2f}s, trace and save {saved - loaded:.2f}s, "
+          f"snapshot load {time.perf_counter() - saved:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import pytest
+
+from batch import BatchError, parse_batch, predict_batch
+
+
+def test_parse_json_array_and_ndjson():
+    assert parse_batch(b'["a", {"text": "b"}]') == ["a", "b"]
+    assert parse_batch(b'{"texts": ["a"]}') == ["a"]
+    assert parse_batch(b'{"text": "a"}\n"b"\n', "application/x-ndjson") == ["a", "b"]
+
+
+def test_parse_rejects_oversized_and_bad_items():
+    with pytest.raises(BatchError) as exc:
+        parse_batch(b'["a", "b", "c"]', max_size=2)
+    assert exc.value.status == 413
+    with pytest.raises(BatchError):
+        parse_batch(b'[1, 2]')
+    for body, content_type in [(b'[1,', "application/json"), (b'{"text": "a"}\n{oops', "application/x-ndjson")]:
+        with pytest.raises(BatchError) as exc:
+            parse_batch(body, content_type)
+        assert exc.value.status == 400
+
+
+def test_predict_batch_keeps_input_order():
+    texts = ["There is garbage everywhere", "Streetlight broken", "Big pothole"]
+    results = predict_batch(texts)
+    assert [r["text"] for r in results] == texts
+    assert [r["predicted_label"] for r in results] == ["garbage", "streetlight", "potholes"]
@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import pytest
+
+import bulk_classify
+
+
+def write_csv(path, rows):
+    lines = ["text,label"] + [f'"{text}",{label}' for text, label in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+ROWS = [("Batti gul hai", "streetlight"), ("Kachra pada hai", "garbage"), ("Road me gaddha", "potholes")] * 10
+
+
+def test_csv_to_jsonl(tmp_path):
+    src, out = tmp_path / "in.csv", tmp_path / "out.jsonl"
+    write_csv(src, ROWS)
+    bulk_classify.main([str(src), "-o", str(out), "--batch-size", "4"])
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(records) == len(ROWS)
+    assert [r["predicted_label"] for r in records] == [label for _, label in ROWS]
+    assert not (tmp_path / "out.jsonl.ckpt").exists()
+
+
+def test_gzip_jsonl_input(tmp_path):
+    src, out = tmp_path / "in.jsonl.gz", tmp_path / "out.csv"
+    with gzip.open(src, "wt") as f:
+        for text, _ in ROWS:
+            f.write(json.dumps({"body": text}) + "\n")
+    bulk_classify.main([str(src), "-o", str(out), "--text-field", "body"])
+    lines = out.read_text().splitlines()
+    assert lines[0].startswith("body,predicted_class")
+    assert len(lines) == len(ROWS) + 1
+
+
+def test_resume_after_interruption(tmp_path, monkeypatch):
+    src, out = tmp_path / "in.csv", tmp_path / "out.jsonl"
+    write_csv(src, ROWS)
+    real_classify = bulk_classify.classify
+
+    def interrupted(batches, workers):
+        for i, item in enumerate(real_classify(batches, workers)):
+            if i == 3:
+                raise KeyboardInterrupt
+            yield item
+
+    monkeypatch.setattr(bulk_classify, "classify", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        bulk_classify.main([str(src), "-o", str(out), "--batch-size", "4"])
+    assert json.loads((tmp_path / "out.jsonl.ckpt").read_text())["rows"] == 12
+
+    monkeypatch.setattr(bulk_classify, "classify", real_classify)
+    bulk_classify.main([str(src), "-o", str(out), "--batch-size", "4", "--resume"])
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["text"] for r in records] == [text for text, _ in ROWS]
@@ -0,0 +1,54 @@
+import time
+
+from cache import PredictionCache, normalize_key
+
+
+def test_key_normalization():
+    assert normalize_key("  Street   LIGHT\tnot working ") == "street light not working"
+    assert normalize_key("ｋａｃｈｒａ") == "kachra"  # NFKC folds full-width forms
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = PredictionCache(max_entries=2, max_bytes=10**6)
+    cache.put("a", "v1", {"predicted_label": "garbage"})
+    cache.put("b", "v1", {"predicted_label": "potholes"})
+    assert cache.get("A", "v1") == {"predicted_label": "garbage"}
+    cache.put("c", "v1", {"predicted_label": "streetlight"})  # evicts "b", the least recently used
+    assert cache.get("b", "v1") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+
+
+def test_byte_limit():
+    cache = PredictionCache(max_entries=100, max_bytes=1)
+    cache.put("a", "v1", {"predicted_label": "garbage"})
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_ttl_expiry():
+    cache = PredictionCache(ttl=0.01)
+    cache.put("a", "v1", {"predicted_label": "garbage"})
+    time.sleep(0.02)
+    assert cache.get("a", "v1") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_new_model_version_invalidates():
+    cache = PredictionCache()
+    cache.put("a", "v1", {"predicted_label": "garbage"})
+    assert cache.get("a", "v2") is None
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+
+
+def test_predict_batch_only_computes_misses():
+    cache = PredictionCache()
+    cache.put("a", "v1", {"predicted_label": "garbage", "text": "a"})
+    seen = []
+
+    def predict_batch(texts):
+        seen.extend(texts)
+        return [{"predicted_label": "potholes"} for _ in texts]
+
+    results = cache.predict_batch(["a", "b", "B "], "v1", predict_batch)
+    assert seen == ["b", "B "]
+    assert [r["predicted_label"] for r in results] == ["garbage", "potholes", "potholes"]
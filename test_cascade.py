@@ -0,0 +1,23 @@
+import pytest
+
+from cascade import KeywordStage, make_stage
+from dataset import holdout_split, load_rows
+
+
+def test_keyword_confidence_follows_match_strength():
+    stage = KeywordStage().fit(load_rows())
+    strong, weak = stage.classify_batch(["Streetlight not working, light band hai", "kuch to gadbad hai"])
+    assert strong["predicted_label"] == "streetlight"
+    assert weak["predicted_label"] == "potholes"  # no match -> default label
+    assert strong["confidence"] > weak["confidence"]
+    assert all(0.0 < confidence < 1.0 for confidence in stage.bin_accuracy)
+
+
+def test_logreg_stage_is_accurate_and_calibrated():
+    pytest.importorskip("sklearn")
+    train, test = holdout_split(load_rows())
+    stage = make_stage("logreg").fit(train)
+    results = stage.classify_batch([text for text, _ in test])
+    accuracy = sum(r["predicted_label"] == label for r, (_, label) in zip(results, test)) / len(test)
+    assert accuracy > 0.9
+    assert all(r["model_type"] == "logreg" and 0.0 <= r["confidence"] <= 1.0 for r in results)
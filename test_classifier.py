@@ -0,0 +1,41 @@
+from classifier import KeywordClassifier, classify
+
+
+def test_english_keywords():
+    assert classify("The street light is not working")["predicted_label"] == "streetlight"
+    assert classify("There is garbage everywhere")["predicted_label"] == "garbage"
+    assert classify("The road has many potholes")["predicted_label"] == "potholes"
+
+
+def test_hinglish_synonyms():
+    assert classify("kachra faila hai road pr")["predicted_label"] == "garbage"
+    assert classify("road me gadhha hai")["predicted_label"] == "potholes"
+    assert classify("Gali ki light kharab hai")["predicted_label"] == "streetlight"
+
+
+def test_word_boundaries():
+    # 'bin' used to match inside 'cabinet' with the substring scan
+    assert KeywordClassifier().scores("the cabinet is broken") == {}
+    assert "light kharab" in KeywordClassifier().matches("Light   KHARAB hai")
+
+
+def test_weights_and_default():
+    lexicon = {
+        "streetlight": {"weight": 1.0, "terms": {"pole": 1.0}},
+        "garbage": {"weight": 3.0, "terms": {"bin": 1.0}},
+    }
+    matcher = KeywordClassifier(lexicon)
+    assert matcher.classify("bin next to the pole")["predicted_label"] == "garbage"
+    assert matcher.classify("pole and pole")["predicted_label"] == "streetlight"
+    assert matcher.classify("nothing here")["predicted_label"] == "potholes"
+
+
+def test_result_shape():
+    result = classify("Broken streetlight")
+    assert result == {"predicted_class": 0, "predicted_label": "streetlight", "confidence": 0.85}
+
+
+def test_classify_batch_matches_single():
+    texts = ["Batti gul hai", "", "kachra\nlight kharab", "road me gadhha hai", "nothing"]
+    matcher = KeywordClassifier()
+    assert matcher.classify_batch(texts) == [matcher.classify(text) for text in texts]
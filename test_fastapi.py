@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import main_fastapi
+from metrics import metrics
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # One app lifetime for the module: shutdown stops the batcher for good
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(main_fastapi.jobs, "directory", str(tmp_path_factory.mktemp("jobs")))
+        patch.setattr(main_fastapi.jobs, "max_upload_bytes", 1024)
+        with TestClient(main_fastapi.app) as client:
+            yield client
+
+
+def test_job_lifecycle(client):
+    response = client.post("/jobs", content=b"text\nBatti gul hai\nKachra pada hai\n",
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 202
+    location = response.headers["Location"]
+    assert location == f"/jobs/{response.json()['id']}"
+
+    for _ in range(100):
+        status = client.get(location).json()
+        if status["status"] == "done":
+            break
+        time.sleep(0.05)
+    assert status["status"] == "done"
+    lines = client.get(location + "/result").text.splitlines()
+    assert len(lines) == 2
+
+    assert client.get("/jobs/missing").status_code == 404
+    # Still uploading: no result yet
+    pending = main_fastapi.jobs.create("csv")
+    assert client.get(f"/jobs/{pending}/result").status_code == 409
+
+
+def test_oversized_upload_is_rejected_and_discarded(client):
+    store = main_fastapi.jobs.store
+    before = store.with_status("uploading", "queued", "running", "done", "failed")
+    response = client.post("/jobs", content=b"text\n" + b"x" * 2048, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 413
+    assert store.with_status("uploading", "queued", "running", "done", "failed") == before
+
+
+def test_batch_accepts_ndjson_and_rejects_malformed_bodies(client):
+    response = client.post("/predict/batch", content=b'{"text": "Kachra pada hai"}\n"Batti gul hai"\n',
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert [r["predicted_label"] for r in response.json()["results"]] == ["garbage", "streetlight"]
+
+    for body, content_type in [(b'{"text": "a"}\n{oops', "application/x-ndjson"), (b"[1,", "application/json")]:
+        response = client.post("/predict/batch", content=body, headers={"Content-Type": content_type})
+        assert response.status_code == 400
+
+
+def test_middleware_records_what_endpoints_report(client):
+    before = metrics.requests.get(("/predict", 200), 0)
+    labels = metrics.labels.get("garbage", 0)
+    response = client.post("/predict", json={"text": "Kachra pada hai"})
+    assert response.json()["predicted_label"] == "garbage"
+    assert metrics.requests[("/predict", 200)] == before + 1
+    assert metrics.labels["garbage"] == labels + 1
+    assert metrics.stages["json_decode"].count > 0
+    # Job ids are folded into one route label
+    missing = metrics.requests.get(("/jobs/{id}", 404), 0)
+    client.get("/jobs/missing")
+    assert metrics.requests[("/jobs/{id}", 404)] == missing + 1
@@ -0,0 +1,146 @@
+import os
+import sys
+
+import pytest
+
+from inference import InferenceEngine, MODEL_PATH
+
+
+def test_falls_back_to_keywords_without_weights(tmp_path):
+    engine = InferenceEngine(model_path=str(tmp_path)).start()
+    assert engine.wait(5)
+    assert engine.is_ready
+    assert engine.status()["status"] == "fallback"
+    result = engine.predict("Kachra pada hai")
+    assert result["predicted_label"] == "garbage"
+    assert result["model_type"] == "rule_based"
+
+
+def test_not_ready_before_start(tmp_path):
+    engine = InferenceEngine(model_path=str(tmp_path))
+    assert not engine.is_ready
+    assert engine.predict("Batti gul hai")["model_type"] == "rule_based"
+
+
+def test_preload_loads_once_before_fork_and_splits_cores(tmp_path, monkeypatch):
+    monkeypatch.delenv("TORCH_THREADS", raising=False)
+    engine = InferenceEngine(model_path=str(tmp_path))
+    monkeypatch.setattr(engine, "write_snapshot", lambda loaded: pytest.fail("snapshot traced in preload"))
+    engine.preload(workers=2)
+    assert engine.preloaded and engine.is_ready
+    assert engine.num_threads == max(1, (os.cpu_count() or 1) // 2)
+    # A forked worker starts serving what the parent loaded: no loader thread
+    assert engine.start()._thread is None
+    assert engine.predict("Kachra pada hai")["predicted_label"] == "garbage"
+
+
+def tiny_distilbert():
+    # Same config as model/saved_model, shrunk and randomly initialised, so no
+    # downloaded weights are needed.
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    config = transformers.DistilBertConfig.from_pretrained(MODEL_PATH)
+    config.update({"dim": 32, "hidden_dim": 64, "n_layers": 2, "n_heads": 2})
+    model = transformers.DistilBertForSequenceClassification(config)
+    tokenizer = transformers.AutoTokenizer.from_pretrained(MODEL_PATH)
+    return model, tokenizer
+
+
+def test_tiny_model_predictions():
+    model, tokenizer = tiny_distilbert()
+    engine = InferenceEngine(model_path=MODEL_PATH)
+    engine.set_model(model, tokenizer)
+    assert engine.is_ready and engine.state == "ready"
+
+    texts = ["The street light is not working", "kachra", "road me gadhha hai " * 200]
+    results = engine.predict_batch(texts)
+    assert len(results) == 3
+    for result in results:
+        assert result["model_type"] == "distilbert"
+        assert result["predicted_label"] in {"streetlight", "garbage", "potholes"}
+        assert 0.0 <= result["confidence"] <= 1.0
+    assert engine.predict(texts[0]) == results[0]
+    # The long text is cut to max_position_embeddings and the order survives bucketing
+    assert engine.status()["truncated_inputs"] >= 1
+    singles = [engine.predict(text)["predicted_label"] for text in texts]
+    assert singles == [result["predicted_label"] for result in results]
+
+
+@pytest.mark.parametrize("backend", ["int8", "onnx"])
+def test_backends_agree_with_fp32(backend, tmp_path):
+    if backend == "onnx":
+        pytest.importorskip("onnxruntime")
+    model, tokenizer = tiny_distilbert()
+    texts = ["The street light is not working", "kachra pada hai", "Big pothole on Station Road"]
+
+    reference = InferenceEngine(model_path=MODEL_PATH, backend="pytorch")
+    reference.set_model(model, tokenizer)
+    expected = reference.predict_batch(texts)
+
+    model, _ = tiny_distilbert()
+    model.load_state_dict(reference.model.state_dict())
+    engine = InferenceEngine(model_path=MODEL_PATH, backend=backend, onnx_path=str(tmp_path / "model.onnx"))
+    engine.set_model(model, tokenizer)
+    assert engine.status()["backend"] == backend
+    results = engine.predict_batch(texts)
+    for got, want in zip(results, expected):
+        assert got["confidence"] == pytest.approx(want["confidence"], abs=0.05)
+
+
+def test_failed_onnx_export_falls_back_to_pytorch(tmp_path, monkeypatch):
+    import backends
+
+    def failing_export(*args):
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(backends, "OnnxBackend", failing_export)
+    model, tokenizer = tiny_distilbert()
+    engine = InferenceEngine(model_path=MODEL_PATH, backend="onnx", onnx_path=str(tmp_path / "model.onnx"))
+    engine.set_model(model, tokenizer)
+    assert engine.status()["backend"] == "pytorch"
+    assert engine.predict("street light")["model_type"] == "distilbert"
+
+
+def test_knn_mode_without_weights_uses_hashed_index(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    import knn
+
+    monkeypatch.setattr(knn, "KNN_INDEX_DIR", str(tmp_path / "index"))
+    engine = InferenceEngine(model_path=str(tmp_path), mode="knn").start()
+    assert engine.wait(30)
+    assert engine.status()["status"] == "ready"
+    result = engine.predict("Kachra pada hai")
+    assert result["predicted_label"] == "garbage"
+    assert result["model_type"] == "knn" and result["neighbors"]
+    assert engine.version.startswith("knn-hashed-ngram-")
+
+
+def test_cascade_without_weights_answers_from_stage1(tmp_path):
+    engine = InferenceEngine(model_path=str(tmp_path), mode="cascade", stage1="keyword").start()
+    assert engine.wait(5)
+    result = engine.predict("Kachra pada hai")
+    assert (result["predicted_label"], result["stage"], result["model_type"]) == ("garbage", 1, "rule_based")
+    assert engine.status()["cascade"]["escalated"] == 0
+
+
+def test_cascade_without_training_rows_serves_without_stage1(tmp_path, monkeypatch):
+    # As in an image without dataset.py: only the cascade is lost
+    monkeypatch.setitem(sys.modules, "dataset", None)
+    engine = InferenceEngine(model_path=str(tmp_path), mode="cascade", stage1="keyword")
+    engine.load_stage1()
+    assert engine.stage1 is None
+
+
+def test_cascade_escalates_only_below_threshold():
+    model, tokenizer = tiny_distilbert()
+    engine = InferenceEngine(model_path=MODEL_PATH, mode="cascade", stage1="keyword")
+    engine.load_stage1()
+    engine.set_model(model, tokenizer)
+    texts = ["Streetlight not working", "kuch to gadbad hai"]
+
+    engine.cascade_threshold = 0.0
+    assert [r["stage"] for r in engine.predict_batch(texts)] == [1, 1]
+    engine.cascade_threshold = 1.01
+    results = engine.predict_batch(texts)
+    assert [(r["stage"], r["model_type"]) for r in results] == [(2, "distilbert")] * 2
+    assert engine.cascade_status()["escalated"] == 2
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from inference import InferenceEngine
+from jobs import JobManager, JobStore, UploadTooLarge
+
+ROWS = [("Batti gul hai", "streetlight"), ("Kachra pada hai", "garbage"), ("Road me gaddha", "potholes")] * 10
+CSV = ("text,label\n" + "".join(f'"{text}",{label}\n' for text, label in ROWS)).encode()
+
+
+async def chunks(data, size=50):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def make_manager(tmp_path, **kwargs):
+    engine = InferenceEngine(model_path=str(tmp_path)).start()
+    return JobManager(directory=str(tmp_path / "jobs"), batch_size=4, engine=engine, **kwargs).start()
+
+
+def wait_done(manager, job_id):
+    for _ in range(500):
+        status = manager.status(job_id)
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(status)
+
+
+def read_result(manager, job_id):
+    data = b"".join(manager.iter_result(job_id))
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+def test_upload_classify_and_stream_result(tmp_path):
+    manager = make_manager(tmp_path)
+    job_id = manager.create("csv")
+    asyncio.run(manager.receive(job_id, chunks(CSV)))
+    status = wait_done(manager, job_id)
+    assert (status["status"], status["rows"], status["progress"]) == ("done", len(ROWS), 1.0)
+    records = read_result(manager, job_id)
+    assert [r["predicted_label"] for r in records] == [label for _, label in ROWS]
+    manager.stop()
+
+
+def test_oversized_upload_is_discarded(tmp_path):
+    manager = make_manager(tmp_path, max_upload_bytes=100)
+    job_id = manager.create("csv")
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(manager.receive(job_id, chunks(CSV)))
+    assert manager.status(job_id) is None
+    manager.stop()
+
+
+def test_restart_resumes_from_committed_offsets(tmp_path):
+    manager = make_manager(tmp_path)
+    job_id = manager.create("csv")
+    asyncio.run(manager.receive(job_id, chunks(CSV)))
+    wait_done(manager, job_id)
+    first = read_result(manager, job_id)[:4]
+    manager.stop()
+
+    # Rewind the job to just after its first batch, as if the process died there
+    input_offset = CSV.index(b"\n") + 1
+    for _ in range(4):
+        input_offset = CSV.index(b"\n", input_offset) + 1
+    output = "".join(json.dumps(record) + "\n" for record in first)
+    (tmp_path / "jobs" / f"{job_id}.output").write_text(output)
+    store = JobStore(str(tmp_path / "jobs" / "jobs.sqlite3"))
+    store.update(job_id, status="running", input_offset=input_offset, output_offset=len(output), rows=4)
+    store.close()
+
+    manager = make_manager(tmp_path)
+    status = wait_done(manager, job_id)
+    assert status["rows"] == len(ROWS)
+    assert [r["text"] for r in read_result(manager, job_id)] == [text for text, _ in ROWS]
+    manager.stop()
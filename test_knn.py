@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from knn import HashedNgramEmbedder, KnnIndex
+
+ROWS = [
+    ("Batti gul hai", "streetlight"), ("Street light not working", "streetlight"),
+    ("Kachra pada hai", "garbage"), ("Garbage not collected", "garbage"),
+    ("Road me gaddha", "potholes"), ("Big pothole on the road", "potholes"),
+]
+
+
+def write_csv(path, rows, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        if mode == "w":
+            f.write("text,label\n")
+        f.writelines(f'"{text}",{label}\n' for text, label in rows)
+
+
+def make_index(tmp_path, k=3):
+    return KnnIndex(HashedNgramEmbedder(dim=512), str(tmp_path / "index"), str(tmp_path / "data.csv"),
+                    k=k, refresh_seconds=0).load()
+
+
+def test_classifies_with_neighbour_evidence(tmp_path):
+    write_csv(tmp_path / "data.csv", ROWS)
+    index = make_index(tmp_path, k=1)
+    result = index.classify("garbage collected nahi hua")
+    assert result["predicted_label"] == "garbage" and result["model_type"] == "knn"
+    assert result["neighbors"][0]["text"] == "Garbage not collected"
+    assert isinstance(np.load(tmp_path / "index" / "embeddings.npy", mmap_mode="r"), np.memmap)
+
+
+def test_appended_rows_are_added_without_rebuild(tmp_path):
+    write_csv(tmp_path / "data.csv", ROWS)
+    index = make_index(tmp_path)
+    version = index.version
+    # A header copy, as in the concatenated exports, is skipped
+    write_csv(tmp_path / "data.csv", [("text", "label"), ("Naali jam hai", "garbage")], "a")
+    assert index.refresh()
+    assert len(index) == len(ROWS) + 1 and index.version != version
+    assert index.meta["fitted_rows"] == len(ROWS)  # IDF not refitted for a small append
+    assert index.search(["Naali jam hai"], k=1)[0][0][0] == len(ROWS)
+
+    reopened = make_index(tmp_path)
+    assert len(reopened) == len(ROWS) + 1
+
+
+def test_rewritten_csv_triggers_full_rebuild(tmp_path):
+    write_csv(tmp_path / "data.csv", ROWS)
+    make_index(tmp_path)
+    write_csv(tmp_path / "data.csv", ROWS[:2])
+    assert len(make_index(tmp_path)) == 2
+
+
+def test_refresh_rebuilds_a_rewritten_csv_off_the_request_path(tmp_path):
+    write_csv(tmp_path / "data.csv", ROWS)
+    index = make_index(tmp_path)
+    # Shorter, and the old offset would land mid-row: not an append
+    write_csv(tmp_path / "data.csv", [("Naali jam hai", "garbage")] + ROWS[:2])
+    assert index.refresh()
+    assert len(index) == 3 and index.search(["Naali jam hai"], k=1)[0][0][0] == 0
+
+    write_csv(tmp_path / "data.csv", ROWS[2:], "a")
+    index.refresh_seconds = 0.001
+    time.sleep(0.01)
+    assert index.classify("kachra")["model_type"] == "knn"
+    index._refresher.join(5)
+    assert len(index) == len(ROWS) + 1
+
+
+def test_classify_during_rebuilds_sees_a_whole_index(tmp_path):
+    write_csv(tmp_path / "data.csv", ROWS)
+    index = make_index(tmp_path)
+    errors = []
+    done = threading.Event()
+
+    def classify():
+        while not done.is_set():
+            try:
+                result = index.classify("Batti gul")
+                assert result["predicted_label"] in {"streetlight", "garbage", "potholes"}
+                assert index.version.startswith("knn-")
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=classify)
+    thread.start()
+    for i in range(20):
+        rows = ROWS[i % 3:] if i % 2 else ROWS + ROWS[:i % 4]
+        write_csv(tmp_path / "data.csv", rows)
+        index.load(rebuild=i % 2 == 0)
+    done.set()
+    thread.join(5)
+    assert errors == []
+
+
+def test_same_size_rewrite_is_noticed_and_shared_by_other_processes(tmp_path):
+    write_csv(tmp_path / "data.csv", ROWS)
+    index = make_index(tmp_path)
+    other = make_index(tmp_path)
+    # Same length, different text: only the mtime gives it away
+    write_csv(tmp_path / "data.csv", ROWS[:5] + [("Big garbage on the road", "potholes")])
+    stat = os.stat(tmp_path / "data.csv")
+    os.utime(tmp_path / "data.csv", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.refresh()
+    assert index.classify("Big garbage on the road")["neighbors"][0]["similarity"] == pytest.approx(1)
+    # The other one opens what the first wrote instead of rebuilding it
+    assert other.refresh() and other.meta == index.meta
@@ -0,0 +1,42 @@
+import json
+
+import loadtest
+
+
+def result(rps, p99, error_rate=0.0):
+    return {"throughput_rps": rps, "error_rate": error_rate,
+            "latency_ms": {"p50": 1.0, "p95": 2.0, "p99": p99}}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = result(1000, 5.0)
+    assert loadtest.compare(result(950, 5.5), baseline, 0.15) == []
+    regressions = loadtest.compare(result(800, 7.0, error_rate=0.05), baseline, 0.15)
+    assert [line.split(":")[0] for line in regressions] == ["throughput_rps", "latency_ms.p99", "error_rate"]
+
+
+def test_percentile():
+    assert loadtest.percentile(list(range(100)), 0.5) == 50
+    assert loadtest.percentile(list(range(100)), 0.99) == 99
+    assert loadtest.percentile([], 0.5) == 0.0
+
+
+def test_end_to_end_against_main(tmp_path):
+    output = tmp_path / "run.json"
+    argv = ["--server", "main", "--duration", "0.5", "--warmup", "0", "--concurrency", "2", "--output", str(output)]
+    assert loadtest.main(argv) == 0
+    run = json.loads(output.read_text())
+    assert run["requests"] > 0 and run["errors"] == 0
+    assert run["server_rss_mb_peak"] > 0
+    # The same run is its own baseline: no regression within a wide margin
+    assert loadtest.main(argv + ["--baseline", str(output), "--threshold", "10"]) == 0
+
+
+def test_prefork_run_samples_every_worker(tmp_path):
+    output = tmp_path / "run.json"
+    argv = ["--server", "main", "--duration", "0.5", "--warmup", "0", "--wait-ready", "--output", str(output),
+            "--env", "SERVER_MODE=prefork", "--env", "WORKERS=2"]
+    assert loadtest.main(argv) == 0
+    run = json.loads(output.read_text())
+    assert run["errors"] == 0 and run["server_processes"] == 3
+    assert 0 < run["server_pss_mb_peak"] <= run["server_rss_mb_peak"]
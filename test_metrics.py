@@ -0,0 +1,90 @@
+import asyncio
+import io
+import time
+
+from metrics import AccessLog, Metrics, MetricsMiddleware, StageTimer, StartupTimer, process_start_time
+
+
+def test_render_counts_histograms_and_labels():
+    metrics = Metrics()
+    metrics.request_started()
+    metrics.request_finished("/predict", 200, 0.003, [("classify", 0.0002)], ["garbage"], ["saved_model-17"])
+    text = metrics.render({"civic_model_ready": 1})
+    assert 'civic_requests_total{route="/predict",status="200"} 1' in text
+    assert 'civic_request_duration_seconds_bucket{route="/predict",le="0.005"} 1' in text
+    assert 'civic_request_duration_seconds_bucket{route="/predict",le="0.0025"} 0' in text
+    assert 'civic_stage_duration_seconds_count{stage="classify"} 1' in text
+    assert 'civic_predictions_total{label="garbage"} 1' in text
+    assert 'civic_model_predictions_total{model_version="saved_model-17"} 1' in text
+    assert "civic_requests_in_flight 0" in text
+    assert "civic_model_ready 1" in text
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.request_started()
+    metrics.request_finished("/predict", 200, 0.001, versions=['ck"pt\\1\n'])
+    assert 'civic_model_predictions_total{model_version="ck\\"pt\\\\1\\n"} 1' in metrics.render()
+
+
+def test_stage_timer_marks_in_order():
+    timer = StageTimer()
+    timer.mark("decode")
+    timer.mark("classify")
+    assert [stage for stage, _ in timer.stages] == ["decode", "classify"]
+    assert sum(seconds for _, seconds in timer.stages) <= timer.elapsed()
+
+
+def test_startup_phases_measured_from_process_start():
+    # The test process started before this test and not long before the epoch
+    assert 0 < process_start_time() <= time.time()
+    startup = StartupTimer(start=time.time() - 2)
+    startup.mark("port_bound")
+    startup.mark("port_bound")
+    startup.mark("model_ready")
+    assert list(startup.phases) == ["port_bound", "model_ready"]
+    assert 2 <= startup.phases["port_bound"] <= startup.phases["model_ready"] < 3
+
+
+def test_access_log_samples_but_keeps_errors():
+    stream = io.StringIO()
+    log = AccessLog(stream, sample=0, flush_seconds=60)
+    log.record("POST", "/predict", 200, 0.001)
+    log.record("POST", "/predict", 503, 0.002, "10.0.0.1")
+    log.flush()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1 and '"status": 503' in lines[0]
+
+
+def test_access_log_drops_when_buffer_full():
+    log = AccessLog(io.StringIO(), sample=1, flush_seconds=60, max_buffer=2)
+    for _ in range(5):
+        log.record("GET", "/health", 200, 0.0001)
+    assert log.dropped == 3
+
+
+def test_asgi_middleware_records_status_stages_and_labels():
+    async def app(scope, receive, send):
+        state = scope["state"]
+        state["timer"].mark("json_decode")
+        state["labels"], state["versions"] = ("garbage",), ("saved_model-17",)
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    metrics, stream = Metrics(), io.StringIO()
+    log = AccessLog(stream, sample=1, flush_seconds=60)
+    middleware = MetricsMiddleware(app, route=lambda path: "other", registry=metrics, log=log)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/x", "client": ("10.0.0.1", 5000)}
+    asyncio.run(middleware(scope, None, send))
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.body"]
+    text = metrics.render({})
+    assert 'civic_requests_total{route="other",status="201"} 1' in text
+    assert 'civic_stage_duration_seconds_count{stage="json_decode"} 1' in text
+    assert 'civic_model_predictions_total{model_version="saved_model-17"} 1' in text
+    log.flush()
+    assert '"client": "10.0.0.1"' in stream.getvalue()
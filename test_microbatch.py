@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from microbatch import MicroBatcher, QueueFullError
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    def predict_batch(texts):
+        calls.append(list(texts))
+        return [{"text": text.upper()} for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_batch, window_ms=20, max_batch_size=8)
+        results = await asyncio.gather(*(batcher.submit(f"t{i}") for i in range(5)))
+        stats = batcher.stats()
+        await batcher.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert [r["text"] for r in results] == ["T0", "T1", "T2", "T3", "T4"]
+    assert calls == [["t0", "t1", "t2", "t3", "t4"]]
+    assert stats["batch_size_histogram"] == {5: 1}
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        batcher = MicroBatcher(lambda texts: texts, window_ms=50, max_queue=1)
+        first = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await asyncio.gather(batcher.submit("b"), batcher.submit("c"))
+        await first
+        await batcher.stop()
+        return batcher.stats()
+
+    assert asyncio.run(scenario())["rejected"] == 1
+
+
+def test_timeout():
+    def slow(texts):
+        import time
+        time.sleep(0.2)
+        return texts
+
+    async def scenario():
+        batcher = MicroBatcher(slow, window_ms=0, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await batcher.submit("a")
+        await batcher.stop()
+        return batcher.stats()
+
+    assert asyncio.run(scenario())["timeouts"] == 1
+
+
+def test_run_shares_the_model_thread_and_counts_as_busy():
+    threads = []
+    busy_inside = []
+
+    def predict_batch(texts):
+        threads.append(threading.current_thread().name)
+        return texts
+
+    def whole_request(texts):
+        threads.append(threading.current_thread().name)
+        busy_inside.append(batcher.busy())
+        return texts
+
+    batcher = MicroBatcher(predict_batch, window_ms=0)
+
+    async def scenario():
+        results = await asyncio.gather(batcher.run(whole_request, ["x", "y"]), batcher.submit("a"))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [["x", "y"], "a"]
+    assert len(threads) == 2 and len(set(threads)) == 1
+    assert busy_inside == [True] and not batcher.busy()
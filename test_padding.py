@@ -0,0 +1,32 @@
+from padding import pad_batch, plan_buckets, round_up, truncate_ids
+
+
+def test_round_up_to_multiple_of_8():
+    assert [round_up(n) for n in (1, 8, 9, 17)] == [8, 8, 16, 24]
+
+
+def test_truncate_keeps_trailing_sep():
+    ids = [101] + list(range(1000, 1600)) + [102]
+    truncated, cut = truncate_ids(ids, 512)
+    assert cut and len(truncated) == 512 and truncated[0] == 101 and truncated[-1] == 102
+    assert truncate_ids([101, 5, 102], 512) == ([101, 5, 102], False)
+
+
+def test_buckets_group_similar_lengths_and_cover_every_index():
+    lengths = [40, 3, 38, 5, 4, 41]
+    buckets = plan_buckets(lengths, max_batch_size=3)
+    assert buckets == [[1, 4, 3], [2, 0, 5]]
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+
+
+def test_token_budget_splits_long_inputs():
+    buckets = plan_buckets([500, 500, 10, 10], max_batch_size=32, max_tokens=1024)
+    assert buckets == [[2, 3], [0, 1]]
+    assert plan_buckets([500, 500, 500], max_batch_size=32, max_tokens=600) == [[0], [1], [2]]
+
+
+def test_pad_batch_pads_to_bucket_max():
+    input_ids, attention_mask = pad_batch([[101, 7, 102], [101, 102]])
+    assert input_ids == [[101, 7, 102, 0, 0, 0, 0, 0], [101, 102, 0, 0, 0, 0, 0, 0]]
+    assert attention_mask[1] == [1, 1, 0, 0, 0, 0, 0, 0]
+    assert len(pad_batch([[1] * 510], max_length=512)[0][0]) == 512
@@ -0,0 +1,203 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+import admin
+from inference import MODEL_PATH, InferenceEngine
+from registry import BudgetExceeded, CheckpointWatcher, LoadedModel, Routing, latest_checkpoint
+
+ID2LABEL = {0: "streetlight", 1: "garbage", 2: "potholes"}
+TEXTS = [f"complaint number {i} about the ward" for i in range(200)]
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, texts, add_special_tokens=True, truncation=False):
+        return {"input_ids": [[101] + [1000] * len(text.split()) + [102] for text in texts]}
+
+
+class FakeBackend:
+    # Answers every text with one class; `gate` holds forward passes open
+    name = "fake"
+
+    def __init__(self, class_id, gate=None):
+        self.class_id = class_id
+        self.gate = gate
+
+    def predict(self, input_ids, attention_mask):
+        if self.gate:
+            self.gate.wait(5)
+        return [self.class_id] * len(input_ids), [0.9] * len(input_ids)
+
+
+def checkpoint(name, class_id, nbytes=0, gate=None):
+    return LoadedModel(name, f"/models/{name}", FakeBackend(class_id, gate), FakeTokenizer(), ID2LABEL,
+                       f"{name}-1", nbytes, "test")
+
+
+def serving_engine(tmp_path, *models, **kwargs):
+    engine = InferenceEngine(model_path=str(tmp_path), **kwargs)
+    for model in models:
+        engine.install(model)
+    return engine
+
+
+def test_split_is_deterministic_per_text():
+    a, b = checkpoint("a", 0), checkpoint("b", 1)
+    routing = Routing(a, [(b, 0.25)])
+    routed = [routing.route(text) for text in TEXTS]
+    assert routed == [routing.route(text.upper() + "  ") for text in TEXTS]
+    assert 0.1 < sum(model is b for model in routed) / len(TEXTS) < 0.4
+    assert routing.version == "a-1+b-1@0.25"
+    assert routing.members == {a, b}
+    with pytest.raises(ValueError):
+        Routing(a, [(b, 0.8), (checkpoint("c", 2), 0.3)])
+
+
+def test_results_carry_the_version_of_the_checkpoint_that_answered(tmp_path):
+    engine = serving_engine(tmp_path, checkpoint("a", 0), checkpoint("b", 1))
+    assert engine.primary.name == "a" and engine.version == "a-1"
+    assert {r["model_version"] for r in engine.predict_batch(TEXTS)} == {"a-1"}
+
+    engine.route(split={"b": 0.5})
+    results = engine.predict_batch(TEXTS)
+    assert {(r["model_version"], r["predicted_label"]) for r in results} == {("a-1", "streetlight"),
+                                                                             ("b-1", "garbage")}
+    assert engine.version == "a-1+b-1@0.5"
+
+    engine.promote("b")
+    assert engine.version == "b-1" and engine.routing.split == ()
+    assert engine.predict("Batti gul hai")["model_version"] == "b-1"
+
+
+def test_swap_leaves_running_batches_on_the_old_checkpoint(tmp_path):
+    gate = threading.Event()
+    old = checkpoint("old", 0, gate=gate)
+    engine = serving_engine(tmp_path, old, checkpoint("new", 1))
+    running = []
+    worker = threading.Thread(target=lambda: running.append(engine.predict("street light")))
+    worker.start()
+    time.sleep(0.05)
+    assert old.in_flight == 1
+
+    # The swap happens at once; promote returns after the old batch drains
+    promoter = threading.Thread(target=engine.promote, args=("new",))
+    promoter.start()
+    time.sleep(0.05)
+    assert engine.predict("street light")["model_version"] == "new-1"
+    assert promoter.is_alive()
+    gate.set()
+    promoter.join(5)
+    worker.join(5)
+    assert running[0]["model_version"] == "old-1" and old.in_flight == 0
+
+
+def test_unload_only_idle_checkpoints(tmp_path):
+    engine = serving_engine(tmp_path, checkpoint("a", 0), checkpoint("b", 1))
+    engine.route(shadow=["b"])
+    with pytest.raises(ValueError):
+        engine.unload("b")
+    engine.route(shadow=[])
+    assert engine.unload("b") == 0
+    assert list(engine.models) == ["a"]
+
+
+def test_shadow_answers_are_compared_not_returned(tmp_path):
+    engine = serving_engine(tmp_path, checkpoint("a", 0), checkpoint("b", 1))
+    engine.route(shadow=["b"])
+    assert {r["model_version"] for r in engine.predict_batch(TEXTS[:10])} == {"a-1"}
+    deadline = time.monotonic() + 5
+    while not engine.shadow_stats.get("b-1", {}).get("texts") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.models_status()["shadow"]["b-1"] == {
+        "name": "b", "texts": 10, "agreed": 0, "errors": 0, "agreement": 0.0,
+    }
+
+
+def test_budget_evicts_idle_checkpoints_least_recently_used_first(tmp_path):
+    mb = 2 ** 20
+    engine = serving_engine(tmp_path, checkpoint("a", 0, 40 * mb), checkpoint("b", 1, 30 * mb),
+                            checkpoint("c", 2, 20 * mb), memory_budget_mb=100)
+    engine.models["b"].last_used = 0
+    engine._make_room(35 * mb)
+    assert sorted(engine.models) == ["a", "c"]
+    # Everything left takes traffic: nothing more can be dropped
+    engine.route(split={"c": 0.1})
+    with pytest.raises(BudgetExceeded):
+        engine._make_room(50 * mb)
+    assert sorted(engine.models) == ["a", "c"]
+
+
+def test_watcher_loads_newest_checkpoint_once_settled(tmp_path):
+    def write_weights(name, mtime):
+        os.makedirs(tmp_path / name, exist_ok=True)
+        path = tmp_path / name / "model.safetensors"
+        path.write_bytes(b"0")
+        os.utime(path, (mtime, mtime))
+
+    write_weights("checkpoint-254", 1000)
+    loaded = []
+    watcher = CheckpointWatcher(str(tmp_path), loaded.append, current=latest_checkpoint(str(tmp_path)))
+    assert not watcher.poll()
+    write_weights("checkpoint-381", 2000)
+    assert not watcher.poll() and watcher.poll()
+    assert loaded == [os.path.realpath(tmp_path / "checkpoint-381")]
+    assert not watcher.poll()
+    # Older than what is serving: ignored
+    write_weights("checkpoint-100", 500)
+    assert not watcher.poll() and not watcher.poll()
+    # Still being written under a temporary name: ignored
+    write_weights(".checkpoint-400.tmp", 3000)
+    assert not watcher.poll() and not watcher.poll()
+
+
+def test_admin_requires_token_and_stays_inside_model_root(tmp_path):
+    engine = serving_engine(tmp_path, checkpoint("a", 0), checkpoint("b", 1))
+    call = dict(engine=engine, token="s3cret", root=str(tmp_path))
+    with pytest.raises(admin.AdminError) as e:
+        admin.handle("GET", "/admin/models", b"", "Bearer s3cret", engine=engine, token="")
+    assert e.value.status == 404
+    with pytest.raises(admin.AdminError) as e:
+        admin.handle("GET", "/admin/models", b"", "Bearer wrong", **call)
+    assert e.value.status == 401
+
+    status, payload = admin.handle("GET", "/admin/models", b"", "Bearer s3cret", **call)
+    assert status == 200 and [m["name"] for m in payload["resident"]] == ["a", "b"]
+    status, payload = admin.handle("POST", "/admin/routing", b'{"split": {"b": 0.2}}', "Bearer s3cret", **call)
+    assert status == 200 and payload["split"] == {"b": 0.2}
+    for body, expected in [(b'{"path": "../../etc"}', 400), (b'{"path": "missing"}', 404),
+                           (b'{"path": "missing", "name": "a/b\\n"}', 400),
+                           (b'{"primary": "nope"}', 400)]:
+        path = "/admin/models" if b"path" in body else "/admin/routing"
+        with pytest.raises(admin.AdminError) as e:
+            admin.handle("POST", path, body, "Bearer s3cret", **call)
+        assert e.value.status == expected
+    with pytest.raises(admin.AdminError):
+        admin.handle("DELETE", "/admin/models/b", b"", "Bearer s3cret", **call)
+
+
+def test_load_checkpoint_in_background_then_promote(tmp_path):
+    from test_inference import tiny_distilbert
+
+    for name in ["checkpoint-254", "checkpoint-381"]:
+        model, _ = tiny_distilbert()
+        model.save_pretrained(tmp_path / name)
+        for tokenizer_file in ["tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt"]:
+            shutil.copy(os.path.join(MODEL_PATH, tokenizer_file), tmp_path / name)
+
+    engine = InferenceEngine(model_path=str(tmp_path / "checkpoint-254"))
+    engine.load()
+    assert engine.primary.name == "checkpoint-254"
+    name = engine.load_checkpoint_async(str(tmp_path / "checkpoint-381"))
+    deadline = time.monotonic() + 60
+    while name not in engine.models and time.monotonic() < deadline:
+        assert engine.predict("street light")["model_version"].startswith("checkpoint-254-")
+        time.sleep(0.01)
+    assert engine.primary.name == "checkpoint-254"
+    engine.promote(name)
+    assert engine.predict("street light")["model_version"].startswith("checkpoint-381-")
+    assert sorted(engine.models) == ["checkpoint-254", "checkpoint-381"]
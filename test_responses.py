@@ -0,0 +1,122 @@
+import gzip
+import http.client
+import json
+import socket
+import threading
+import time
+from http.server import HTTPServer
+
+import pytest
+
+import main
+
+from main import STATIC_RESPONSES, RailwayHandler
+from responses import StaticResponse, encode_batch, encode_prediction, response_head
+
+
+def test_prediction_fragments_match_generic_encoding():
+    result = {"predicted_class": 1, "predicted_label": "garbage", "confidence": 0.8812,
+              "model_type": "distilbert", "model_version": "saved_model-1700000000",
+              "text": 'Kachra "pada" hai कचरा'}
+    assert json.loads(encode_prediction(result)) == result
+    # Extra or reordered keys fall back to the generic encoder
+    assert json.loads(encode_prediction({"error": "x"})) == {"error": "x"}
+    assert json.loads(encode_batch([result, result])) == {"results": [result, result], "count": 2}
+
+
+def test_prediction_confidence_is_always_valid_json():
+    np = pytest.importorskip("numpy")
+    result = {"predicted_class": 1, "predicted_label": "garbage", "confidence": np.float32(0.5),
+              "model_type": "knn", "model_version": "v", "text": "x"}
+    assert json.loads(encode_prediction(result))["confidence"] == 0.5
+    for value in [float("nan"), float("inf")]:
+        assert json.loads(encode_prediction(dict(result, confidence=value)))["confidence"] is None
+    assert json.loads(encode_prediction(dict(result, confidence=1)))["confidence"] == 1.0
+
+
+def test_static_response_gzip_and_etag():
+    response = StaticResponse(b"x" * 1000, "text/plain")
+    status, headers, body = response.select()
+    assert status == 200 and body == response.body and response.etag.encode() in headers
+    status, headers, body = response.select("gzip, deflate")
+    assert b"Content-Encoding: gzip" in headers and gzip.decompress(body) == response.body
+    assert response.select("", response.etag)[0] == 304
+    # Bodies that don't shrink are never served gzipped
+    assert StaticResponse(b"{}", "application/json").gzipped is None
+
+
+def test_response_head():
+    head = response_head(200, "application/json", 2, b"ETag: \"a\"\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n")
+    assert b"Content-Length: 2\r\n" in head and head.endswith(b"ETag: \"a\"\r\n\r\n")
+    assert b"Content-Length" not in response_head(304, "application/json", None)
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(("127.0.0.1", 0), RailwayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_handler_serves_static_and_predictions(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.request("GET", "/docs", headers={"Accept-Encoding": "gzip"})
+    response = conn.getresponse()
+    body = response.read()
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(body) == STATIC_RESPONSES["/docs"].body
+
+    assert response.getheader("ETag") == STATIC_RESPONSES["/docs"].gzip_etag
+
+    conn.request("GET", "/health", headers={"If-None-Match": STATIC_RESPONSES["/health"].etag})
+    response = conn.getresponse()
+    assert response.status == 304 and response.read() == b""
+
+    conn.request("POST", "/predict", body=b'{"text": "Streetlight broken"}')
+    response = conn.getresponse()
+    assert json.loads(response.read())["predicted_label"] == "streetlight"
+    conn.close()
+
+
+def test_request_that_raises_is_still_counted(server, monkeypatch):
+    def broken():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(main, "get_cache", broken)
+    before = main.metrics.requests.get(("/stats", 500), 0)
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.request("GET", "/stats")
+    with pytest.raises(http.client.RemoteDisconnected):
+        conn.getresponse()
+    conn.close()
+    for _ in range(50):
+        if main.metrics.requests.get(("/stats", 500), 0) > before:
+            break
+        time.sleep(0.02)
+    assert main.metrics.requests[("/stats", 500)] == before + 1
+    assert main.metrics.in_flight == 0
+
+
+@pytest.mark.parametrize("header, status", [
+    (b"Content-Length: abc", 400), (b"Content-Length: -1", 400), (b"Transfer-Encoding: chunked", 411),
+])
+def test_unframeable_body_is_rejected_and_the_connection_closed(server, header, status):
+    with socket.create_connection(("127.0.0.1", server.server_address[1]), timeout=5) as sock:
+        sock.sendall(b"POST /predict HTTP/1.1\r\nHost: x\r\n" + header + b"\r\n\r\n")
+        reply = b""
+        while chunk := sock.recv(4096):
+            reply += chunk
+    assert reply.startswith(f"HTTP/1.1 {status} ".encode())
+    assert b"Connection: close\r\n" in reply
+
+
+@pytest.mark.parametrize("body", [b'{"text": ', b'["Batti gul hai"]', b'{"text": 5}', b"\xff"])
+def test_malformed_predict_body_is_a_client_error(server, body):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.request("POST", "/predict", body=body)
+    response = conn.getresponse()
+    assert response.status == 400 and "error" in json.loads(response.read())
+    conn.close()
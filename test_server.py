@@ -0,0 +1,126 @@
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from loadtest import free_port, wait_for_server
+from server import PooledHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    # /slow holds its worker until the test opens the gate
+    protocol_version = "HTTP/1.1"
+    gate = threading.Event()
+    lock = threading.Lock()
+    running = 0
+    most_running = 0
+    clients = []
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.most_running = max(cls.most_running, cls.running)
+            cls.clients.append(self.client_address)
+        try:
+            if self.path == "/slow":
+                cls.gate.wait(5)
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            if self.server.draining:
+                self.send_header("Connection", "close")
+                self.close_connection = True
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.running -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(max_workers=4):
+    Handler.gate = threading.Event()
+    Handler.running = Handler.most_running = 0
+    Handler.clients = []
+    server = PooledHTTPServer(("127.0.0.1", 0), Handler, max_workers=max_workers)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def get(port, path, responses):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    responses.append((response.status, response.getheader("Connection"), response.read()))
+    conn.close()
+
+
+def test_pool_runs_at_most_max_workers_requests_at_once():
+    server, _ = start_server(max_workers=2)
+    port = server.server_address[1]
+    responses = []
+    clients = [threading.Thread(target=get, args=(port, "/slow", responses)) for _ in range(5)]
+    for client in clients:
+        client.start()
+    time.sleep(0.3)
+    # The rest wait in the listen backlog rather than getting threads
+    assert Handler.running == 2
+    Handler.gate.set()
+    for client in clients:
+        client.join(10)
+    assert Handler.most_running == 2
+    assert [status for status, _, _ in responses] == [200] * 5
+    server.shutdown()
+    assert server.drain(1) == 0
+
+
+def test_keep_alive_serves_two_requests_on_one_connection():
+    server, _ = start_server()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    for _ in range(2):
+        conn.request("GET", "/fast")
+        response = conn.getresponse()
+        assert response.status == 200 and response.read() == b"ok"
+    conn.close()
+    assert len(Handler.clients) == 2 and Handler.clients[0] == Handler.clients[1]
+    server.shutdown()
+    server.drain(1)
+
+
+def test_drain_finishes_the_request_in_flight():
+    server, thread = start_server()
+    responses = []
+    client = threading.Thread(target=get, args=(server.server_address[1], "/slow", responses))
+    client.start()
+    time.sleep(0.2)
+    server.shutdown()
+    thread.join(5)
+    threading.Timer(0.2, Handler.gate.set).start()
+    assert server.drain(5) == 0
+    client.join(5)
+    assert responses == [(200, "close", b"ok")]
+
+
+def test_prefork_stops_every_worker_on_sigterm():
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), SERVER_MODE="prefork", WORKERS="2", ACCESS_LOG_SAMPLE="0")
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(port, process)
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(15) == 0
+        with socket.socket() as sock:
+            assert sock.connect_ex(("127.0.0.1", port)) != 0
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,57 @@
+import os
+import shutil
+
+import pytest
+
+from inference import MODEL_PATH, InferenceEngine
+from snapshot import SNAPSHOT_FILE, load_snapshot, load_tokenizer, save_snapshot
+from test_inference import tiny_distilbert
+
+TEXTS = ["The street light is not working", "KACHRA pada hai!!", "road me gadhha hai " * 200, ""]
+
+
+def test_fast_tokenizer_matches_transformers():
+    pytest.importorskip("tokenizers")
+    transformers = pytest.importorskip("transformers")
+    fast = load_tokenizer(MODEL_PATH)
+    reference = transformers.AutoTokenizer.from_pretrained(MODEL_PATH)
+    assert type(fast).__name__ == "FastTokenizer"
+    assert fast.pad_token_id == reference.pad_token_id == 0
+    # No truncation or padding to 128 from the settings saved in tokenizer.json
+    assert fast(TEXTS)["input_ids"] == reference(TEXTS, add_special_tokens=True, truncation=False)["input_ids"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    model, tokenizer = tiny_distilbert()
+    path = str(tmp_path / SNAPSHOT_FILE)
+    save_snapshot(model.eval(), path)
+    assert load_snapshot(path, source_mtime=os.path.getmtime(path) + 1) is None
+
+    reference = InferenceEngine(model_path=MODEL_PATH)
+    reference.set_model(model, tokenizer)
+    engine = InferenceEngine(model_path=MODEL_PATH)
+    engine.set_model(load_snapshot(path), tokenizer)
+    assert engine.id2label == reference.id2label
+    for got, want in zip(engine.predict_batch(TEXTS), reference.predict_batch(TEXTS)):
+        assert got["predicted_label"] == want["predicted_label"]
+        assert got["confidence"] == pytest.approx(want["confidence"], abs=1e-3)
+
+
+def test_second_start_loads_from_snapshot(tmp_path):
+    model, _ = tiny_distilbert()
+    model.save_pretrained(tmp_path)
+    for name in ["tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt"]:
+        shutil.copy(os.path.join(MODEL_PATH, name), tmp_path)
+
+    first = InferenceEngine(model_path=str(tmp_path))
+    first.load()
+    assert (first.state, first.load_source) == ("ready", "pretrained")
+    assert os.path.exists(tmp_path / SNAPSHOT_FILE)
+
+    second = InferenceEngine(model_path=str(tmp_path))
+    second.load()
+    assert (second.state, second.load_source) == ("ready", "snapshot")
+    for got, want in zip(second.predict_batch(TEXTS), first.predict_batch(TEXTS)):
+        assert got["predicted_label"] == want["predicted_label"]
+        assert got["confidence"] == pytest.approx(want["confidence"], abs=1e-3)
+    assert "model_ready" in second.status()["startup"]
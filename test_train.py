@@ -0,0 +1,100 @@
+import os
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import train
+from inference import MODEL_PATH
+from padding import round_up
+
+ROWS = [(f"complaint {i} " + "word " * (i % 23), ["streetlight", "garbage", "potholes"][i % 3]) for i in range(300)]
+
+
+class CountingTokenizer:
+    pad_token_id = 0
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, add_special_tokens=True, truncation=False):
+        self.calls.append(list(texts))
+        return {"input_ids": [[101] + [1000 + len(word) for word in text.split()] + [102] for text in texts]}
+
+
+def write_csv(path, rows, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        if mode == "w":
+            f.write("text,label\n")
+        f.writelines(f'"{text}",{label}\n' for text, label in rows)
+
+
+def test_token_cache_only_tokenizes_texts_it_has_not_seen(tmp_path):
+    texts = [text for text, _ in ROWS]
+    tokenizer = CountingTokenizer()
+    cache = train.TokenCache(str(tmp_path), tokenizer, "test").load()
+    first = cache.encode(texts[:200])
+    cache.save()
+
+    tokenizer = CountingTokenizer()
+    cache = train.TokenCache(str(tmp_path), tokenizer, "test").load()
+    assert cache.encode(texts)[:200] == first
+    assert tokenizer.calls == [texts[200:]]
+    assert (cache.hits, cache.misses) == (200, 100)
+    # A different tokenizer gets a cache of its own
+    assert train.TokenCache(str(tmp_path), tokenizer, "other").load().ids == {}
+
+
+def test_keys_survive_the_round_trip_whatever_their_bytes():
+    keys = [bytes(16), b"\x01" + bytes(15), train.text_key("Batti gul hai")]
+    assert [row.tobytes() for row in train.pack_keys(keys)] == keys
+
+
+def test_length_grouped_batches_cover_every_row_once_with_little_padding():
+    lengths = [len(text.split()) + 2 for text, _ in ROWS]
+    batches = train.LengthGroupedBatches(lengths, batch_size=8, seed=1)
+    first = list(batches)
+    assert sorted(i for batch in first for i in batch) == list(range(len(lengths)))
+    assert max(len(batch) for batch in first) == 8
+    padded = sum(round_up(max(lengths[i] for i in batch)) * len(batch) for batch in first)
+    assert sum(lengths) / padded > 0.8
+    batches.set_epoch(1)
+    assert list(batches) != first
+    batches.set_epoch(0)
+    assert list(batches) == first
+
+
+def test_held_out_rows_stay_held_out_as_the_data_grows():
+    train_rows, held_out = train.select_rows(ROWS[:200], set(), new_only=False)
+    more_train, more_held_out = train.select_rows(ROWS + ROWS[:10], set(), new_only=False)
+    assert {key for key, _, _ in held_out} <= {key for key, _, _ in more_held_out}
+    assert len(more_train) == len({key for key, _, _ in more_train})
+    assert 0.1 < len(more_held_out) / 300 < 0.3
+
+    seen = {key for key, _, _ in train_rows}
+    new_rows, _ = train.select_rows(ROWS, seen, new_only=True)
+    assert {text for _, text, _ in new_rows} == {text for _, text, _ in more_train} - {text for _, text, _ in train_rows}
+
+
+def test_warm_start_trains_only_on_appended_rows(tmp_path):
+    from test_inference import tiny_distilbert
+
+    model, _ = tiny_distilbert()
+    model.save_pretrained(tmp_path / "base")
+    for name in train.TOKENIZER_FILES:
+        shutil.copy(os.path.join(MODEL_PATH, name), tmp_path / "base")
+    write_csv(tmp_path / "data.csv", ROWS[:60])
+    argv = ["--data", str(tmp_path / "data.csv"), "--output-dir", str(tmp_path / "results"),
+            "--cache-dir", str(tmp_path / "cache"), "--epochs", "1", "--workers", "0", "--threads", "1"]
+
+    first = train.train(train.parse_args(argv + ["--base", str(tmp_path / "base")]))
+    assert first["tokenized"] == 60 and os.path.isdir(first["checkpoint"])
+
+    write_csv(tmp_path / "data.csv", ROWS[60:90], mode="a")
+    second = train.train(train.parse_args(argv + ["--warm-start", "--new-only"]))
+    assert second["base"] == first["checkpoint"] and second["tokenized"] == 30
+    assert 0 < second["train_rows"] <= 30
+    assert second["epochs"][0]["examples_per_sec"] > 0
+    assert train.train(train.parse_args(argv + ["--warm-start", "--new-only"])) is None
+
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+import shutil
+import time
+
+import numpy as np
+
+from classifier import LABEL2ID, LABELS
+from dataset import DATA_PATH, load_rows
+from padding import pad_batch, plan_buckets, truncate_ids
+from registry import latest_checkpoint
+
+# Fine-tuning DistilBERT on data/textdata.csv; the scripted version of
+# notebook/text_classifier.ipynb (same labels, optimiser and learning rate).
+#
+#   python train.py                              # from distilbert-base-uncased
+#   python train.py --warm-start --new-only      # latest checkpoint, appended rows only
+#   python train.py --warm-start model/results/checkpoint-381 --epochs 1
+#
+# What makes reruns cheap as the dataset grows:
+#   - token ids are cached on disk (TOKEN_CACHE_DIR) keyed by a hash of the
+#     text and of the tokenizer, so only rows not seen before are tokenized
+#   - batches hold texts of similar length (sorted within shuffled groups of
+#     LENGTH_GROUP batches) padded only to their longest text, instead of
+#     every text padded to 128 tokens
+#   - --warm-start continues from a checkpoint, and --new-only trains just on
+#     the rows it hasn't been trained on (each checkpoint written here lists
+#     the hashes of every row that went into it)
+#   - batches are padded and turned into tensors by --workers DataLoader
+#     processes while the main process runs the forward/backward passes
+# Rows are held out for evaluation by their hash rather than a random split,
+# so a row stays on the same side however many rows are appended.
+# Checkpoints go to model/results/checkpoint-<step>, where the server can
+# pick them up (MODEL_WATCH_DIR, see registry.py), and every run appends its
+# timings (examples/sec, seconds per epoch, tokenization) to
+# model/results/training_runs.jsonl.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(ROOT, "model", "results")
+TOKEN_CACHE_DIR = os.environ.get("TOKEN_CACHE_DIR", os.path.join(ROOT, "model", "token_cache"))
+BASE_MODEL = "distilbert-base-uncased"
+EVAL_FRACTION = 0.2
+# Batches are formed from shuffled groups this many batches long, sorted by
+# length: padding stays low and batch order random
+LENGTH_GROUP = 50
+TRAINED_ROWS_FILE = "trained_rows.npy"
+TRAIN_STATE_FILE = "train_state.json"
+TOKENIZER_FILES = ["tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt"]
+ID2LABEL = dict(enumerate(LABELS))
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def is_eval(key, fraction=EVAL_FRACTION):
+    return key[0] < fraction * 256
+
+
+def pack_keys(keys):
+    # One 16-byte row per key: a bytes dtype ("S16") drops trailing NULs
+    return np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, 16)
+
+
+def tokenizer_fingerprint(path):
+    # Cached ids are only valid for the vocabulary that produced them
+    for name in ["tokenizer.json", "vocab.txt"]:
+        if os.path.exists(os.path.join(path, name)):
+            with open(os.path.join(path, name), "rb") as f:
+                return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    return hashlib.blake2b(path.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class TokenCache:
+    # Untruncated token ids by text hash, in one .npz per tokenizer. Texts
+    # missing from it are tokenized in one batch and added; truncating to
+    # --max-length happens per batch, so changing it keeps the cache valid.
+    def __init__(self, directory, tokenizer, fingerprint):
+        self.path = os.path.join(directory, f"tokens-{fingerprint}.npz")
+        self.tokenizer = tokenizer
+        self.ids = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+    def load(self):
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                keys, offsets, tokens = data["keys"], data["offsets"], data["tokens"].tolist()
+            self.ids = {key.tobytes(): tokens[start:end]
+                        for key, start, end in zip(keys, offsets[:-1].tolist(), offsets[1:].tolist())}
+        return self
+
+    def encode(self, texts):
+        keys = [text_key(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in self.ids}
+        if missing:
+            encoded = self.tokenizer(list(missing.values()), add_special_tokens=True, truncation=False)
+            self.ids.update(zip(missing, encoded["input_ids"]))
+            self._dirty = True
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [self.ids[key] for key in keys]
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        keys = list(self.ids)
+        lengths = [len(self.ids[key]) for key in keys]
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                keys=pack_keys(keys),
+                offsets=np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+                tokens=np.fromiter((i for key in keys for i in self.ids[key]), dtype=np.int32, count=sum(lengths)),
+            )
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+class LengthGroupedBatches:
+    # A batch_sampler for torch's DataLoader: lists of dataset indices,
+    # reshuffled for every epoch (set_epoch) but reproducible from the seed
+    def __init__(self, lengths, batch_size, max_tokens=None, seed=42):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.seed = seed
+        self.epoch = 0
+        self._batches = self._plan()
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+        self._batches = self._plan()
+
+    def _plan(self):
+        rng = random.Random(self.seed * 1000 + self.epoch)
+        order = list(range(len(self.lengths)))
+        rng.shuffle(order)
+        span = self.batch_size * LENGTH_GROUP
+        batches = []
+        for start in range(0, len(order), span):
+            group = order[start:start + span]
+            buckets = plan_buckets([self.lengths[i] for i in group], self.batch_size, self.max_tokens)
+            batches += [[group[i] for i in bucket] for bucket in buckets]
+        rng.shuffle(batches)
+        return batches
+
+    def __iter__(self):
+        return iter(self._batches)
+
+    def __len__(self):
+        return len(self._batches)
+
+
+def collate(examples, pad_id=0):
+    # Runs in the DataLoader worker processes
+    import torch
+
+    input_ids, attention_mask = pad_batch([ids for ids, _ in examples], pad_id)
+    return {
+        "input_ids": torch.tensor(input_ids),
+        "attention_mask": torch.tensor(attention_mask),
+        "labels": torch.tensor([label for _, label in examples]),
+    }
+
+
+def trained_keys(checkpoint):
+    path = os.path.join(checkpoint, TRAINED_ROWS_FILE) if checkpoint else None
+    if not path or not os.path.exists(path):
+        return set()
+    return {key.tobytes() for key in np.load(path)}
+
+
+def checkpoint_step(checkpoint):
+    # Ours record it in train_state.json, the notebook's Trainer in trainer_state.json
+    for name in [TRAIN_STATE_FILE, "trainer_state.json"]:
+        path = os.path.join(checkpoint, name) if checkpoint else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return json.load(f).get("global_step", 0)
+    return 0
+
+
+def select_rows(rows, seen, new_only):
+    # Returns (train, eval) as lists of (key, text, label)
+    train, held_out, picked = [], [], set()
+    for text, label in rows:
+        if label not in LABEL2ID:
+            continue
+        key = text_key(text)
+        if is_eval(key):
+            held_out.append((key, text, label))
+        # Appended duplicates of a row train once
+        elif key not in picked and not (new_only and key in seen):
+            picked.add(key)
+            train.append((key, text, label))
+    return train, held_out
+
+
+def _evaluate(model, examples, pad_id, torch, batch_size=64):
+    if not examples:
+        return None
+    correct = 0
+    model.eval()
+    with torch.inference_mode():
+        for bucket in plan_buckets([len(ids) for ids, _ in examples], batch_size):
+            batch = collate([examples[i] for i in bucket], pad_id)
+            logits = model(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]).logits
+            correct += int((logits.argmax(-1) == batch["labels"]).sum())
+    model.train()
+    return correct / len(examples)
+
+
+def _save_checkpoint(model, output_dir, step, tokenizer_path, keys, state):
+    path = os.path.join(output_dir, f"checkpoint-{step}")
+    if os.path.exists(path):
+        path = f"{path}-{int(time.time())}"
+    # Written under a temporary name and renamed, so a watching server never
+    # sees a half-written checkpoint under its final name
+    tmp = os.path.join(output_dir, f".{os.path.basename(path)}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    model.save_pretrained(tmp)
+    for name in TOKENIZER_FILES:
+        if os.path.exists(os.path.join(tokenizer_path, name)):
+            shutil.copy(os.path.join(tokenizer_path, name), tmp)
+    np.save(os.path.join(tmp, TRAINED_ROWS_FILE), pack_keys(sorted(keys)))
+    with open(os.path.join(tmp, TRAIN_STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2)
+    os.rename(tmp, path)
+    return path
+
+
+def train(args):
+    import torch
+    from torch.utils.data import DataLoader
+    from transformers import AutoModelForSequenceClassification, get_linear_schedule_with_warmup
+
+    from snapshot import load_tokenizer
+
+    started = time.perf_counter()
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+
+    start_from = None
+    if args.warm_start == "latest":
+        latest = latest_checkpoint(args.output_dir)
+        if latest is None:
+            print(f"⚠️ No checkpoint with weights in {args.output_dir}, starting from {args.base}")
+        else:
+            start_from = latest[1]
+    elif args.warm_start:
+        start_from = args.warm_start
+    seen = trained_keys(start_from)
+    if args.new_only and start_from and not seen:
+        print(f"⚠️ {start_from} has no {TRAINED_ROWS_FILE}; training on every row")
+
+    train_rows, eval_rows = select_rows(load_rows(args.data), seen, args.new_only)
+    if not train_rows:
+        print("✅ No new rows to train on")
+        return None
+
+    tokenizer_path = args.tokenizer or start_from or os.path.join(ROOT, "model", "saved_model")
+    tokenizer = load_tokenizer(tokenizer_path)
+    pad_id = tokenizer.pad_token_id or 0
+    tokenize_start = time.perf_counter()
+    cache = TokenCache(args.cache_dir, tokenizer, tokenizer_fingerprint(tokenizer_path))
+    if not args.rebuild_cache:
+        cache.load()
+    train_ids = cache.encode([text for _, text, _ in train_rows])
+    eval_ids = cache.encode([text for _, text, _ in eval_rows])
+    cache.save()
+    tokenize_seconds = time.perf_counter() - tokenize_start
+    print(f"🔤 Tokenized {cache.misses} new texts, {cache.hits} from cache ({tokenize_seconds:.2f}s)")
+
+    def examples(ids_lists, rows):
+        return [(truncate_ids(ids, args.max_length)[0], LABEL2ID[label]) for ids, (_, _, label) in zip(ids_lists, rows)]
+
+    train_examples, eval_examples = examples(train_ids, train_rows), examples(eval_ids, eval_rows)
+    batches = LengthGroupedBatches([len(ids) for ids, _ in train_examples], args.batch_size,
+                                   args.max_tokens or None, args.seed)
+    loader = DataLoader(train_examples, batch_sampler=batches, collate_fn=functools.partial(collate, pad_id=pad_id),
+                        num_workers=args.workers, persistent_workers=args.workers > 0)
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        start_from or args.base, num_labels=len(LABELS), id2label=ID2LABEL, label2id=LABEL2ID
+    )
+    model.train()
+    # As transformers' Trainer: no weight decay on biases and LayerNorm
+    decay = [p for n, p in model.named_parameters() if not n.endswith("bias") and "LayerNorm" not in n]
+    no_decay = [p for n, p in model.named_parameters() if n.endswith("bias") or "LayerNorm" in n]
+    optimizer = torch.optim.AdamW([{"params": decay, "weight_decay": args.weight_decay},
+                                   {"params": no_decay, "weight_decay": 0.0}], lr=args.lr)
+    scheduler = get_linear_schedule_with_warmup(optimizer, 0, len(batches) * args.epochs)
+
+    step = checkpoint_step(start_from)
+    real_tokens = sum(len(ids) for ids, _ in train_examples)
+    epochs = []
+    print(f"🏋️ Training on {len(train_examples)} rows ({len(eval_examples)} held out), "
+          f"{len(batches)} batches/epoch, from {start_from or args.base}")
+    for epoch in range(args.epochs):
+        batches.set_epoch(epoch)
+        epoch_start = time.perf_counter()
+        loss_sum = padded_tokens = 0.0
+        for batch in loader:
+            loss = model(**batch).loss
+            loss.backward()
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+            loss_sum += float(loss)
+            padded_tokens += batch["input_ids"].numel()
+            step += 1
+        seconds = time.perf_counter() - epoch_start
+        accuracy = _evaluate(model, eval_examples, pad_id, torch)
+        epochs.append({
+            "epoch": epoch + 1,
+            "seconds": round(seconds, 3),
+            "examples_per_sec": round(len(train_examples) / seconds, 2),
+            "loss": round(loss_sum / len(batches), 4),
+            "padding_efficiency": round(real_tokens / padded_tokens, 3),
+            "eval_accuracy": None if accuracy is None else round(accuracy, 4),
+            "eval_seconds": round(time.perf_counter() - epoch_start - seconds, 3),
+        })
+        print(f"   epoch {epoch + 1}: {seconds:.1f}s, {len(train_examples) / seconds:.1f} examples/s, "
+              f"loss {loss_sum / len(batches):.4f}, padding efficiency {real_tokens / padded_tokens:.0%}, "
+              f"eval accuracy {accuracy if accuracy is not None else float('nan'):.2%}")
+
+    run = {
+        "timestamp": time.time(),
+        "base": start_from or args.base,
+        "rows": len(train_rows) + len(eval_rows),
+        "train_rows": len(train_rows),
+        "eval_rows": len(eval_rows),
+        "new_only": bool(args.new_only and seen),
+        "tokenized": cache.misses,
+        "tokens_cached": cache.hits,
+        "tokenize_seconds": round(tokenize_seconds, 3),
+        "batch_size": args.batch_size,
+        "max_length": args.max_length,
+        "workers": args.workers,
+        "threads": args.threads,
+        "global_step": step,
+        "epochs": epochs,
+    }
+    path = _save_checkpoint(model, args.output_dir, step, tokenizer_path, seen | {key for key, _, _ in train_rows}, run)
+    run["checkpoint"] = path
+    run["total_seconds"] = round(time.perf_counter() - started, 3)
+    with open(args.log or os.path.join(args.output_dir, "training_runs.jsonl"), "a") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"💾 Saved {path} ({run['total_seconds']:.1f}s total)")
+    return run
+
+
+def parse_args(argv=None):
+    from inference import TORCH_THREADS
+
+    parser = argparse.ArgumentParser(description="Fine-tune the complaint classifier on the labelled corpus")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--base", default=BASE_MODEL, help="model to start from without --warm-start")
+    parser.add_argument("--warm-start", nargs="?", const="latest", metavar="CHECKPOINT",
+                        help="continue from this checkpoint (default: the newest in --output-dir)")
+    parser.add_argument("--new-only", action="store_true", help="with --warm-start: only rows it wasn't trained on")
+    parser.add_argument("--tokenizer", help="tokenizer directory (default: the checkpoint's, else model/saved_model)")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-tokens", type=int, default=0, help="cap on padded tokens per batch (0 = none)")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--weight-decay", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader processes (0 = main process)")
+    parser.add_argument("--threads", type=int, default=TORCH_THREADS, help="torch intra-op threads")
+    parser.add_argument("--cache-dir", default=TOKEN_CACHE_DIR)
+    parser.add_argument("--rebuild-cache", action="store_true", help="ignore cached token ids")
+    parser.add_argument("--log", help="append the run's timings here (default: OUTPUT_DIR/training_runs.jsonl)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    train(parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()